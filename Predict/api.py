@@ -3,15 +3,32 @@ Flask API for O/L Grade Prediction Service
 Provides REST API endpoints for grade predictions
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, make_response, g
 from flask_cors import CORS
+from functools import wraps
+import atexit
+import io
+import json
 import numpy as np
 import os
+import time
 from train_model import OLGradePredictor
-from config import API_CONFIG
+from rollup import rollup, rollup_student_predictions
+from forecast import forecast_students
+from scenarios import predict_scenarios
+from model_registry import ModelRegistry
+from ranking import OVERALL, RankingIndex, prediction_values
+from response_cache import ResponseCache, canonical_json, content_hash
+from shared_cache import SharedCache, serving_version
+from single_flight import SingleFlight
+from degradation import TIERS, LatencyGovernor, request_start_delay
+from audit_log import AuditLog
+from bulk_upload import BulkUpload, PayloadError
+from config import (API_CONFIG, RESPONSE_CACHE_CONFIG, BULK_UPLOAD_CONFIG, UNCERTAINTY_CONFIG,
+                    EXPLANATION_CONFIG)
 
 app = Flask(__name__)
-CORS(app)  # Enable CORS for Next.js frontend
+CORS(app, expose_headers=['ETag', 'X-Service-Tier'])  # Enable CORS for Next.js frontend
 
 # Initialize predictor
 predictor = OLGradePredictor()
@@ -25,6 +42,221 @@ if os.path.exists('models/lstm_model.h5'):
 else:
     print("⚠ No trained models found. Please train models first using train_model.py")
 
+# Specialized model sets (per school / grade / subject) next to the default models
+registry = ModelRegistry(predictor)
+if model_loaded:
+    registry.preload()
+
+# Serialized prediction responses keyed by request content + model version
+response_cache = ResponseCache()
+
+# The same bodies shared with the other server processes on this host
+shared_cache = SharedCache()
+
+# Serving code, settings and cascade calibrations behind the cached bodies;
+# part of every cache key, so bodies stored by other code or calibrations
+# (in the shared file, by earlier deploys) are never served
+serving = serving_version()
+
+# Identical requests being computed right now, keyed the same way
+inflight = SingleFlight()
+
+# Service tier of each prediction request under the latency budgets
+governor = LatencyGovernor()
+
+# Class and school rankings of the latest full-accuracy predictions
+ranking = RankingIndex()
+
+# Record of every prediction served, written by a background thread
+audit_log = AuditLog()
+atexit.register(audit_log.close)
+
+
+def service_tier():
+    """Service tier chosen for the current prediction request"""
+    return g.get('service_tier', TIERS[0])
+
+
+def streams_body():
+    """Whether the request body is too large (or chunked) to buffer for caching"""
+    length = request.content_length
+    return length is None or length > BULK_UPLOAD_CONFIG['stream_above_bytes']
+
+
+def sample_count(value, field, limit):
+    """
+    A true/false/count request option: None and booleans pass through, whole
+    numbers are clamped to limit (0 turns the option off) and anything else
+    raises ValueError
+    """
+    if value is None or isinstance(value, bool):
+        return value
+    if not isinstance(value, (int, float)) or not float(value).is_integer() or value < 0:
+        raise ValueError(f'"{field}" must be true, false or a whole number up to {limit}')
+    return min(int(value), limit) or False
+
+
+def prediction_options(data):
+    """(uncertainty, explain) options of a prediction request, validated and clamped"""
+    return (sample_count(data.get('uncertainty'), 'uncertainty', UNCERTAINTY_CONFIG['max_samples']),
+            sample_count(data.get('explain'), 'explain', EXPLANATION_CONFIG['max_steps']))
+
+
+def class_rankings(data, body):
+    """(student_id, values, class_key, school) of each student in a /api/predict/class exchange"""
+    for student, result in zip(data.get('students') or [], body['student_predictions']):
+        yield (student.get('student_id'), prediction_values(result['prediction']), data.get('class_id'),
+               student.get('school_id', data.get('school_id')))
+
+
+def bulk_rankings(data, body):
+    """(student_id, values, class_key, school) of each student in a /api/predict/bulk exchange"""
+    for class_data, result in zip(data.get('classes') or [], body['class_predictions']):
+        for student, row in zip(class_data.get('students') or [], result['students']):
+            yield (student.get('student_id'), {OVERALL: row['overall_average'], **row['subject_marks']},
+                   class_data.get('class_id'), student.get('school_id', data.get('school_id')))
+
+
+# Endpoints whose full-accuracy responses feed the ranking index
+RANKED_ENDPOINTS = {'/api/predict/class': class_rankings, '/api/predict/bulk': bulk_rankings}
+
+
+def update_rankings(body):
+    """
+    Feed the ranking index from the current request and its response body
+
+    Cached, shared, coalesced and 304 responses never run the view, so the
+    index is fed here for every response served rather than by the views.
+    Students without a class_id are ranked in their school only.
+    """
+    rankings = RANKED_ENDPOINTS.get(request.path)
+    data = request.get_json(silent=True)
+    if rankings is None or not body or not isinstance(data, dict):
+        return
+    try:
+        body = json.loads(body)
+        for student_id, values, class_key, school in rankings(data, body):
+            ranking.update(student_id, values, class_key, school)
+    except (ValueError, KeyError, TypeError) as e:
+        print(f"Ranking update failed for {request.path}: {e}")
+
+
+def conditional_prediction(view):
+    """
+    ETag / If-None-Match support, response body caching, in-flight
+    coalescing and load-based degradation for a prediction endpoint
+
+    The ETag is a hash of the endpoint, the canonical JSON body, the
+    loaded model version and the serving version, so identical requests against the same models
+    get 304 Not Modified, or the cached serialized body without inference.
+    Bodies missing from this process's cache are looked up in the shared
+    cache file other workers (and earlier runs) wrote.
+    Concurrent identical requests wait on a single computation.
+    Under load, computed responses come from a cheaper service tier; those
+    get their own weak ETag and are never cached, so a full-accuracy cached
+    body is still preferred and nothing degraded outlives the load.
+    Every response is queued for the audit log with its latency; parsing
+    and writing happen on the audit log's writer thread. Full-accuracy
+    responses of RANKED_ENDPOINTS update the ranking index however they
+    were served.
+    Large bodies (see streams_body) are left unread for the view to parse
+    incrementally, so they are neither cached nor coalesced.
+    """
+    def render():
+        queue_delay = request_start_delay(request.headers.get('X-Request-Start'))
+        g.service_tier = governor.choose(request.path, queue_delay)
+        start = time.perf_counter()
+        try:
+            response = make_response(view())
+        finally:
+            governor.record(request.path, time.perf_counter() - start, queue_delay)
+        response.headers['X-Service-Tier'] = g.service_tier
+        return response
+
+    def render_body():
+        response = render()
+        return response.status_code, response.get_data(), response.headers['X-Service-Tier']
+
+    @wraps(view)
+    def wrapper():
+        start = time.perf_counter()
+        response = make_response(serve())
+        if model_loaded and request.path in RANKED_ENDPOINTS and not streams_body():
+            if response.status_code == 200 and response.headers.get('X-Service-Tier') == TIERS[0]:
+                update_rankings(response.get_data())
+            elif response.status_code == 304:
+                etag = response.get_etag()[0]
+                update_rankings(response_cache.peek(etag) or shared_cache.get(etag))
+        if model_loaded:
+            audit_log.record({
+                'time': time.time(),
+                'endpoint': request.path,
+                'model_version': registry.model_version,
+                'status': response.status_code,
+                'service_tier': response.headers.get('X-Service-Tier', service_tier()),
+                'cache': response.headers.get('X-Cache', 'NOT_MODIFIED' if response.status_code == 304 else 'NONE'),
+                'latency_ms': round((time.perf_counter() - start) * 1000, 3),
+                'input_digest': g.get('input_digest'),
+                'request': b'' if streams_body() else request.get_data(cache=True),
+                'response': response.get_data()
+            })
+        return response
+
+    def serve():
+        caching = RESPONSE_CACHE_CONFIG['enabled']
+        coalescing = RESPONSE_CACHE_CONFIG['coalesce_inflight']
+        if not model_loaded:
+            return view()
+        if not (caching or coalescing) or streams_body():
+            return render()
+
+        version = content_hash(registry.model_version, serving)
+        raw = request.get_data(cache=True)
+        raw_key = content_hash(request.path, version, raw)
+        etag = response_cache.raw_key(raw_key)
+        if etag is None:
+            data = request.get_json(silent=True)
+            if data is None:
+                return render()
+            etag = content_hash(request.path, version, canonical_json(data))
+            response_cache.remember_raw(raw_key, etag)
+
+        if etag in request.if_none_match:
+            response_cache.record_not_modified()
+            response = make_response('', 304)
+            response.set_etag(etag)
+            return response
+
+        body = response_cache.get(etag) if caching else None
+        cache_status = 'HIT'
+        if body is None and caching:
+            body = shared_cache.get(etag)
+            if body is not None:
+                response_cache.put(etag, body)
+                cache_status = 'SHARED_HIT'
+        if body is not None:
+            status, tier = 200, TIERS[0]
+        else:
+            if coalescing:
+                # Followers share the leader's response whatever its tier
+                (status, body, tier), shared = inflight.do(etag, render_body)
+            else:
+                (status, body, tier), shared = render_body(), False
+            if status != 200:
+                return app.response_class(body, status=status, mimetype='application/json')
+            if caching and not shared and tier == TIERS[0]:
+                response_cache.put(etag, body)
+                shared_cache.put(etag, body)
+            cache_status = 'COALESCED' if shared else 'MISS'
+
+        response = app.response_class(body, status=status, mimetype='application/json')
+        response.headers['X-Cache'] = cache_status
+        response.headers['X-Service-Tier'] = tier
+        response.set_etag(etag if tier == TIERS[0] else content_hash(etag, tier), weak=tier != TIERS[0])
+        return response
+
+    return wrapper
+
 
 @app.route('/health', methods=['GET'])
 def health_check():
@@ -33,11 +265,22 @@ def health_check():
         'status': 'online',
         'model_loaded': model_loaded,
         'service': 'O/L Grade Prediction API',
-        'version': '1.0.0'
+        'version': '1.0.0',
+        'model_version': registry.model_version if model_loaded else None,
+        'serving_version': serving,
+        'response_cache': response_cache.info(),
+        'shared_cache': shared_cache.info(),
+        'single_flight': inflight.info(),
+        'degradation': governor.info(),
+        'models': registry.info(),
+        'audit_log': audit_log.info(),
+        'ranking': ranking.info(),
+        'cascade': predictor.cascade.info() if predictor.cascade else None
     })
 
 
 @app.route('/api/predict/student', methods=['POST'])
+@conditional_prediction
 def predict_student():
     """
     Predict O/L grades for a single student
@@ -48,7 +291,13 @@ def predict_student():
             {"name": "Mathematics", "marks": [75, 80, 78, 82, 85]},
             {"name": "Science", "marks": [65, 70, 72, 75]}
         ],
-        "attendance": 85.5
+        "attendance": 85.5,
+        "uncertainty": true,        // optional: intervals and grade probabilities,
+                                    // or the number of MC dropout samples
+        "explain": true,            // optional: contribution of each past mark and
+                                    // attendance, or the number of gradient steps
+        "grade": 11,                // optional: select specialized model sets
+        "school_id": "S01"          // (see MODEL_REGISTRY_CONFIG)
     }
     """
     if not model_loaded:
@@ -62,15 +311,24 @@ def predict_student():
         if not data or 'subjects' not in data:
             return jsonify({'error': 'Invalid request. "subjects" field is required.'}), 400
         
+        try:
+            uncertainty, explain = prediction_options(data)
+        except ValueError as e:
+            return jsonify({'error': str(e), 'success': False}), 400
+        
         # Set default attendance if not provided
         if 'attendance' not in data:
             data['attendance'] = 100
         
         # Perform prediction
-        predictions = predictor.predict_all_subjects(data)
+        predictions = registry.predict_students(
+            [data], grade=data.get('grade'), school=data.get('school_id'),
+            tier=service_tier(), uncertainty=uncertainty, explain=explain
+        )[0]
         
         return jsonify({
             'success': True,
+            'service_tier': service_tier(),
             'data': predictions
         })
     
@@ -82,12 +340,15 @@ def predict_student():
 
 
 @app.route('/api/predict/class', methods=['POST'])
+@conditional_prediction
 def predict_class():
     """
     Predict O/L grades for all students in a class
     
     Request body:
     {
+        "class_id": "C001",     // optional; without it students are only
+                                // ranked within their school
         "students": [
             {
                 "student_id": "S001",
@@ -96,7 +357,9 @@ def predict_class():
                 "attendance": 85.5
             },
             ...
-        ]
+        ],
+        "uncertainty": true,    // optional, see /api/predict/student
+        "explain": true         // optional, see /api/predict/student
     }
     """
     if not model_loaded:
@@ -110,52 +373,51 @@ def predict_class():
         if not data or 'students' not in data:
             return jsonify({'error': 'Invalid request. "students" field is required.'}), 400
         
+        try:
+            uncertainty, explain = prediction_options(data)
+        except ValueError as e:
+            return jsonify({'error': str(e), 'success': False}), 400
+        
         students = data['students']
         results = []
         
-        # Class-level statistics
-        total_high_risk = 0
-        total_medium_risk = 0
-        total_low_risk = 0
-        total_avg_predicted = 0
-        
-        for student in students:
-            student_data = {
+        # Predict every subject of every student in one batch per model set
+        predictions = registry.predict_students([
+            {
                 'subjects': student.get('subjects', []),
-                'attendance': student.get('attendance', 100)
+                'attendance': student.get('attendance', 100),
+                'grade': student.get('grade', data.get('grade')),
+                'school_id': student.get('school_id', data.get('school_id'))
             }
-            
-            prediction = predictor.predict_all_subjects(student_data)
-            
-            # Count risk levels
-            if prediction['risk_level'] == 'HIGH':
-                total_high_risk += 1
-            elif prediction['risk_level'] == 'MEDIUM':
-                total_medium_risk += 1
-            else:
-                total_low_risk += 1
-            
-            total_avg_predicted += prediction['overall_average']
-            
+            for student in students
+        ], tier=service_tier(), uncertainty=uncertainty, explain=explain)
+        
+        for student, prediction in zip(students, predictions):
             results.append({
                 'student_id': student.get('student_id'),
                 'name': student.get('name'),
                 'prediction': prediction
             })
         
-        # Calculate class statistics
+        # Class, subject and class x subject aggregates in one pass
+        class_key = str(data.get('class_id', 'class'))
+        aggregates = rollup_student_predictions([class_key] * len(students), predictions)
+        school = aggregates['school']
+        
         class_summary = {
-            'total_students': len(students),
-            'high_risk_count': total_high_risk,
-            'medium_risk_count': total_medium_risk,
-            'low_risk_count': total_low_risk,
-            'class_average': total_avg_predicted / len(students) if students else 0,
-            'high_risk_percentage': (total_high_risk / len(students) * 100) if students else 0
+            'total_students': school['total_students'],
+            'high_risk_count': school['high_risk_count'],
+            'medium_risk_count': school['medium_risk_count'],
+            'low_risk_count': school['low_risk_count'],
+            'class_average': school['average'],
+            'high_risk_percentage': school['high_risk_percentage']
         }
         
         return jsonify({
             'success': True,
+            'service_tier': service_tier(),
             'class_summary': class_summary,
+            'rollup': aggregates,
             'student_predictions': results
         })
     
@@ -166,7 +428,49 @@ def predict_class():
         }), 500
 
 
+@app.route('/api/predict/class/rank', methods=['GET'])
+def rank_student():
+    """
+    Class and school rank and percentile from the ranking index
+    
+    Rankings cover students predicted through /api/predict/class or
+    /api/predict/bulk since the models were loaded, including responses
+    served from the caches; no inference is run. Class rankings need the
+    request's class_id.
+    
+    Query parameters:
+        student_id: Student to rank on the overall average and every subject
+        subject:    Optional, "overall" or one subject name only
+    or, for where a predicted mark would place:
+        value:      Mark to place
+        class_id / school_id: Optional scope (default the whole school)
+    """
+    args = request.args
+    metric = args.get('subject')
+    
+    if 'value' in args:
+        try:
+            value = float(args['value'])
+        except ValueError:
+            return jsonify({'error': '"value" must be a number', 'success': False}), 400
+        position = ranking.position_of(value, metric or 'overall', args.get('class_id'), args.get('school_id'))
+        return jsonify({'success': True, 'subject': metric or 'overall', **position})
+    
+    if 'student_id' not in args:
+        return jsonify({'error': 'Invalid request. "student_id" or "value" is required.', 'success': False}), 400
+    
+    result = ranking.rank(args['student_id'], metric)
+    if result is None:
+        return jsonify({
+            'error': 'Student has no ranked prediction yet, predict their class first.',
+            'success': False
+        }), 404
+    
+    return jsonify({'success': True, 'student_id': args['student_id'], **result})
+
+
 @app.route('/api/predict/subject', methods=['POST'])
+@conditional_prediction
 def predict_subject():
     """
     Predict performance for specific subject across multiple students
@@ -182,7 +486,9 @@ def predict_subject():
                 "attendance": 85.5
             },
             ...
-        ]
+        ],
+        "uncertainty": true,    // optional, see /api/predict/student
+        "explain": true         // optional, see /api/predict/student
     }
     """
     if not model_loaded:
@@ -198,26 +504,28 @@ def predict_subject():
                 'error': 'Invalid request. "subject_name" and "students" fields are required.'
             }), 400
         
+        try:
+            uncertainty, explain = prediction_options(data)
+        except ValueError as e:
+            return jsonify({'error': str(e), 'success': False}), 400
+        
         subject_name = data['subject_name']
         students = data['students']
         results = []
         
-        # Subject-level statistics
-        total_predicted = 0
-        grade_distribution = {'A': 0, 'B': 0, 'C': 0, 'S': 0, 'W': 0}
+        students = [student for student in students if student.get('marks')]
+        batch_predictions = registry.predict_batch([
+            (student['marks'], student.get('attendance', 100)) for student in students
+        ], [
+            registry.resolve(subject_name, student.get('grade', data.get('grade')),
+                             student.get('school_id', data.get('school_id')))
+            for student in students
+        ], tier=service_tier(), uncertainty=uncertainty, explain=explain)
         
-        for student in students:
-            marks = student.get('marks', [])
+        for student, prediction in zip(students, batch_predictions):
+            marks = student['marks']
             attendance = student.get('attendance', 100)
             
-            if not marks:
-                continue
-            
-            prediction = predictor.predict_next_mark(marks, attendance)
-            
-            grade_distribution[prediction['predicted_grade']] += 1
-            total_predicted += prediction['predicted_mark']
-            
             results.append({
                 'student_id': student.get('student_id'),
                 'name': student.get('name'),
@@ -225,20 +533,32 @@ def predict_subject():
                 'predicted_mark': prediction['predicted_mark'],
                 'predicted_grade': prediction['predicted_grade'],
                 'confidence': prediction['confidence'],
+                'method': prediction['method'],
                 'attendance': attendance
             })
+            if 'uncertainty' in prediction:
+                results[-1]['uncertainty'] = prediction['uncertainty']
+            if 'explanation' in prediction:
+                results[-1]['explanation'] = prediction['explanation']
         
         # Calculate subject statistics
+        aggregates = rollup(
+            ['subject'] * len(results),
+            np.arange(len(results)),
+            [subject_name] * len(results),
+            [r['predicted_mark'] for r in results]
+        )['school']
         subject_summary = {
             'subject_name': subject_name,
             'total_students': len(results),
-            'average_predicted': total_predicted / len(results) if results else 0,
-            'grade_distribution': grade_distribution,
-            'pass_rate': ((len(results) - grade_distribution['W']) / len(results) * 100) if results else 0
+            'average_predicted': aggregates['average_predicted'],
+            'grade_distribution': aggregates['grade_distribution'],
+            'pass_rate': aggregates['pass_rate']
         }
         
         return jsonify({
             'success': True,
+            'service_tier': service_tier(),
             'subject_summary': subject_summary,
             'student_predictions': results
         })
@@ -250,13 +570,127 @@ def predict_subject():
         }), 500
 
 
+@app.route('/api/predict/scenarios', methods=['POST'])
+@conditional_prediction
+def predict_scenarios_endpoint():
+    """
+    What-if prediction surfaces for a student or a class
+    
+    Request body:
+    {
+        "student": {"subjects": [...], "attendance": 85.5},     // or
+        "students": [{"student_id": "S001", "name": "John Doe", "subjects": [...]}, ...],
+        "attendance": [70, 80, 90],          // or {"start": 60, "stop": 100, "steps": 21}
+        "future_marks": [[], [70, 70], [80]] // hypothetical next marks, [] = as is
+    }
+    """
+    if not model_loaded:
+        return jsonify({
+            'error': 'Models not loaded. Please train models first.'
+        }), 503
+    
+    try:
+        data = request.get_json()
+        
+        if not data or ('student' not in data and 'students' not in data):
+            return jsonify({'error': 'Invalid request. "student" or "students" field is required.'}), 400
+        
+        students = data['students'] if 'students' in data else [data['student']]
+        try:
+            surfaces = predict_scenarios(
+                predictor, students,
+                attendance=data.get('attendance'),
+                future_marks=data.get('future_marks'),
+                tier=service_tier(),
+                registry=registry,
+                grade=data.get('grade'),
+                school=data.get('school_id')
+            )
+        except (ValueError, TypeError) as e:
+            return jsonify({'error': f'Invalid scenario grid: {e}', 'success': False}), 400
+        
+        for student, result in zip(students, surfaces['students']):
+            result['student_id'] = student.get('student_id')
+            result['name'] = student.get('name')
+        
+        return jsonify({
+            'success': True,
+            'service_tier': service_tier(),
+            **surfaces
+        })
+    
+    except Exception as e:
+        return jsonify({
+            'error': str(e),
+            'success': False
+        }), 500
+
+
+@app.route('/api/predict/forecast', methods=['POST'])
+@conditional_prediction
+def predict_forecast():
+    """
+    Mark and grade trajectories over the next exams for a student or a class
+    
+    Request body:
+    {
+        "student": {"subjects": [...], "attendance": 85.5},     // or
+        "students": [{"student_id": "S001", "name": "John Doe", "subjects": [...]}, ...],
+        "horizon": 3            // optional: number of future exams (FORECAST_CONFIG)
+    }
+    """
+    if not model_loaded:
+        return jsonify({
+            'error': 'Models not loaded. Please train models first.'
+        }), 503
+    
+    try:
+        data = request.get_json()
+        
+        if not data or ('student' not in data and 'students' not in data):
+            return jsonify({'error': 'Invalid request. "student" or "students" field is required.'}), 400
+        
+        students = data['students'] if 'students' in data else [data['student']]
+        try:
+            forecast = forecast_students(
+                predictor, students,
+                horizon=data.get('horizon'),
+                tier=service_tier(),
+                registry=registry,
+                grade=data.get('grade'),
+                school=data.get('school_id')
+            )
+        except (ValueError, TypeError) as e:
+            return jsonify({'error': f'Invalid forecast: {e}', 'success': False}), 400
+        
+        for student, result in zip(students, forecast['students']):
+            result['student_id'] = student.get('student_id')
+            result['name'] = student.get('name')
+        
+        return jsonify({
+            'success': True,
+            'service_tier': service_tier(),
+            **forecast
+        })
+    
+    except Exception as e:
+        return jsonify({
+            'error': str(e),
+            'success': False
+        }), 500
+
+
 @app.route('/api/predict/bulk', methods=['POST'])
+@conditional_prediction
 def predict_bulk():
     """
     Bulk prediction endpoint for admin view (all classes)
     
     Request body:
     {
+        "school_id": "S01",     // optional; in bodies of more than
+        "grade": 11,            // predict_batch_students students, top-level
+        "uncertainty": false,   // options must come before "classes"
         "classes": [
             {
                 "class_id": "C001",
@@ -266,6 +700,9 @@ def predict_bulk():
             ...
         ]
     }
+    
+    The body is parsed and validated class by class (see bulk_upload.py and
+    BULK_UPLOAD_CONFIG for the size limits); oversized uploads get 413.
     """
     if not model_loaded:
         return jsonify({
@@ -273,88 +710,118 @@ def predict_bulk():
         }), 503
     
     try:
-        data = request.get_json()
-        
-        if not data or 'classes' not in data:
-            return jsonify({'error': 'Invalid request. "classes" field is required.'}), 400
-        
-        classes = data['classes']
+        body = request.stream if streams_body() else io.BytesIO(request.get_data(cache=True))
+        upload = BulkUpload(body, request.content_length)
+        options = upload.options
         results = []
         
-        # School-level statistics
-        total_students = 0
-        total_high_risk = 0
-        total_medium_risk = 0
-        total_low_risk = 0
-        overall_avg = 0
+        # Compact prediction rows for the rollup; students are predicted in
+        # batches of whole classes as they arrive
+        class_keys, row_students, row_subjects, row_marks = [], [], [], []
+        pending = []
+        # Ranking updates of a streamed body, applied once all of it is valid
+        ranking_updates = []
         
-        for class_data in classes:
-            class_students = class_data.get('students', [])
-            class_predictions = []
-            
-            class_high_risk = 0
-            class_medium_risk = 0
-            class_low_risk = 0
-            class_total_avg = 0
-            
-            for student in class_students:
-                student_data = {
-                    'subjects': student.get('subjects', []),
-                    'attendance': student.get('attendance', 100)
+        def predict_pending():
+            upload.freeze_options()
+            try:
+                uncertainty = sample_count(options.get('uncertainty'), 'uncertainty',
+                                           UNCERTAINTY_CONFIG['max_samples'])
+            except ValueError as e:
+                raise PayloadError(str(e))
+            predictions = registry.predict_students([
+                {
+                    'subjects': student.get('subjects') or [],
+                    'attendance': student.get('attendance', 100),
+                    'grade': student.get('grade', class_data.get('grade', options.get('grade'))),
+                    'school_id': student.get('school_id', options.get('school_id'))
                 }
-                
-                prediction = predictor.predict_all_subjects(student_data)
-                
-                # Count risk levels
-                if prediction['risk_level'] == 'HIGH':
-                    class_high_risk += 1
-                    total_high_risk += 1
-                elif prediction['risk_level'] == 'MEDIUM':
-                    class_medium_risk += 1
-                    total_medium_risk += 1
-                else:
-                    class_low_risk += 1
-                    total_low_risk += 1
-                
-                class_total_avg += prediction['overall_average']
-                overall_avg += prediction['overall_average']
-                total_students += 1
-                
-                class_predictions.append({
+                for student, class_data, _ in pending
+            ], tier=service_tier(), uncertainty=uncertainty)
+            # Buffered bodies feed the ranking index from the response (see update_rankings)
+            if streams_body() and service_tier() == TIERS[0]:
+                ranking_updates.extend(
+                    (student.get('student_id'), prediction_values(prediction), class_data.get('class_id'),
+                     student.get('school_id', options.get('school_id')))
+                    for (student, class_data, _), prediction in zip(pending, predictions)
+                )
+            for (student, _, result), prediction in zip(pending, predictions):
+                for subject in prediction['subject_predictions']:
+                    row_students.append(len(class_keys))
+                    row_subjects.append(subject['subject'])
+                    row_marks.append(subject['predicted_mark'])
+                class_keys.append(result['key'])
+                result['students'].append({
                     'student_id': student.get('student_id'),
                     'name': student.get('name'),
                     'overall_average': prediction['overall_average'],
-                    'risk_level': prediction['risk_level']
+                    'risk_level': prediction['risk_level'],
+                    'subject_marks': {subject['subject']: subject['predicted_mark']
+                                      for subject in prediction['subject_predictions']}
                 })
-            
-            results.append({
+            pending.clear()
+        
+        for index, class_data in enumerate(upload.classes()):
+            class_students = class_data.get('students') or []
+            result = {
+                'key': str(class_data.get('class_id') or class_data.get('class_name') or index),
                 'class_id': class_data.get('class_id'),
                 'class_name': class_data.get('class_name'),
                 'total_students': len(class_students),
-                'class_average': class_total_avg / len(class_students) if class_students else 0,
-                'high_risk_count': class_high_risk,
-                'medium_risk_count': class_medium_risk,
-                'low_risk_count': class_low_risk,
-                'students': class_predictions
+                'students': []
+            }
+            results.append(result)
+            pending.extend((student, class_data, result) for student in class_students)
+            if len(pending) >= BULK_UPLOAD_CONFIG['predict_batch_students']:
+                predict_pending()
+        predict_pending()
+        g.input_digest = upload.digest
+        for student_id, values, class_key, school in ranking_updates:
+            ranking.update(student_id, values, class_key, school)
+        
+        # School, class, subject and class x subject aggregates in one pass
+        aggregates = rollup(class_keys, row_students, row_subjects, row_marks)
+        
+        class_predictions = []
+        for result in results:
+            class_rollup = aggregates['classes'].get(result['key'])
+            class_predictions.append({
+                'class_id': result['class_id'],
+                'class_name': result['class_name'],
+                'total_students': result['total_students'],
+                'class_average': class_rollup['average'] if class_rollup else 0,
+                'high_risk_count': class_rollup['high_risk_count'] if class_rollup else 0,
+                'medium_risk_count': class_rollup['medium_risk_count'] if class_rollup else 0,
+                'low_risk_count': class_rollup['low_risk_count'] if class_rollup else 0,
+                'students': result['students']
             })
         
         # Overall school statistics
+        school = aggregates['school']
         school_summary = {
-            'total_students': total_students,
-            'total_classes': len(classes),
-            'school_average': overall_avg / total_students if total_students > 0 else 0,
-            'total_high_risk': total_high_risk,
-            'total_medium_risk': total_medium_risk,
-            'total_low_risk': total_low_risk,
-            'high_risk_percentage': (total_high_risk / total_students * 100) if total_students > 0 else 0
+            'total_students': school['total_students'],
+            'total_classes': len(results),
+            'school_average': school['average'],
+            'total_high_risk': school['high_risk_count'],
+            'total_medium_risk': school['medium_risk_count'],
+            'total_low_risk': school['low_risk_count'],
+            'high_risk_percentage': school['high_risk_percentage']
         }
         
         return jsonify({
             'success': True,
+            'service_tier': service_tier(),
             'school_summary': school_summary,
-            'class_predictions': results
+            'rollup': aggregates,
+            'class_predictions': class_predictions
         })
     
+    except PayloadError as e:
+        return jsonify({
+            'error': str(e),
+            'success': False
+        }), e.status
+    
     except Exception as e:
         return jsonify({
             'error': str(e),
@@ -362,21 +829,84 @@ def predict_bulk():
         }), 500
 
 
+def export_path(name):
+    """
+    Absolute path of an export named in a request, relative to
+    API_CONFIG['exports_dir']; anything that resolves outside it (absolute
+    paths elsewhere, '..', symlinks) or is not a file raises ValueError
+    """
+    if name is None:
+        return None
+    if not isinstance(name, str) or not name:
+        raise ValueError('export paths must be non-empty strings')
+    exports_dir = os.path.realpath(API_CONFIG['exports_dir'])
+    path = os.path.realpath(os.path.join(exports_dir, name))
+    if os.path.commonpath([exports_dir, path]) != exports_dir or not os.path.isfile(path):
+        raise ValueError(f'{name} is not a file in the exports directory')
+    return path
+
+
+def install_models(predictor_new):
+    """Serve freshly trained models and drop everything computed with the old ones"""
+    global predictor, model_loaded, serving
+    predictor = predictor_new
+    model_loaded = True
+    registry.default = predictor
+    registry.refresh()
+    response_cache.clear()
+    serving = serving_version()
+    ranking.clear()
+
+
 @app.route('/api/train', methods=['POST'])
 def train_models():
-    """Endpoint to trigger model training"""
+    """
+    Endpoint to trigger model training
+
+    Optional request body (train on real exports instead of synthetic data,
+    "incremental": true fine-tunes the current models instead of retraining).
+    Export paths are relative to API_CONFIG['exports_dir']; other paths get a 400:
+    {
+        "marks_path": "exam_results.csv",
+        "attendance_path": "attendance.csv",
+        "incremental": false
+    }
+    """
     try:
+        data = request.get_json(silent=True) or {}
+        try:
+            marks_path = export_path(data.get('marks_path'))
+            attendance_path = export_path(data.get('attendance_path'))
+        except ValueError as e:
+            return jsonify({'error': f'Invalid export path: {e}', 'success': False}), 400
+
         predictor_new = OLGradePredictor()
-        history, mae, r2 = predictor_new.train_models()
+        if data.get('incremental'):
+            stats = predictor_new.train_incremental(
+                marks_path=marks_path,
+                attendance_path=attendance_path
+            )
+            install_models(predictor_new)
+
+            return jsonify({
+                'success': True,
+                'message': 'Models fine-tuned successfully',
+                'metrics': stats
+            })
+
+        history, mae, r2 = predictor_new.train_models(
+            marks_path=marks_path,
+            attendance_path=attendance_path
+        )
         
         # Reload models
-        global predictor, model_loaded
-        predictor = predictor_new
-        model_loaded = True
+        install_models(predictor_new)
         
         return jsonify({
             'success': True,
             'message': 'Models trained successfully',
+            'cached': history is None,
+            'fingerprint': predictor_new.fingerprint,
             'metrics': {
                 'lstm_mae': float(mae),
                 'gb_r2_score': float(r2)
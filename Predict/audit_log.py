@@ -0,0 +1,213 @@
+"""
+Prediction Audit Log
+Append-only record of every prediction served, handed from the request
+path to a background writer thread through a bounded in-memory queue.
+The writer parses, digests and batches entries into newline-delimited
+JSON files that are rotated by size and gzipped.
+"""
+
+import gzip
+import json
+import os
+import queue
+import shutil
+import threading
+import time
+
+from config import AUDIT_LOG_CONFIG
+from response_cache import content_hash
+
+_STOP = object()
+
+
+def _parse(body):
+    if not body:
+        return None
+    try:
+        return json.loads(body)
+    except ValueError:
+        return None
+
+
+class AuditLog:
+    """
+    Non-blocking audit log
+
+    record() only enqueues; when the queue is filling up, 1 in sample_every
+    entries is kept (with a sample_weight for reweighting), and when it is
+    full entries are dropped. Both are counted in info().
+    """
+
+    def __init__(self, config=AUDIT_LOG_CONFIG, start=True):
+        self.config = config
+        self.enabled = config['enabled']
+        self._queue = queue.Queue(maxsize=config['queue_size'])
+        self._sample_above = int(config['queue_size'] * config['sample_above'])
+        self._sampled = 0
+        self._lock = threading.Lock()
+        self._thread = None
+        self._file = None
+        self._path = None
+        self._file_bytes = 0
+        self._files_opened = 0
+        self.stats = {'offered': 0, 'sampled_out': 0, 'dropped': 0, 'written': 0, 'batches': 0,
+                      'rotations': 0, 'write_errors': 0}
+        if self.enabled and start:
+            self.start()
+
+    def start(self):
+        if self._thread is None:
+            os.makedirs(self.config['log_dir'], exist_ok=True)
+            self._thread = threading.Thread(target=self._run, name='audit-log-writer', daemon=True)
+            self._thread.start()
+
+    def record(self, entry):
+        """
+        Queue an entry without blocking; 'request' and 'response' may be raw bytes
+
+        Returns:
+            bool: Whether the entry was queued
+        """
+        if not self.enabled:
+            return False
+        every = self.config['sample_every']
+        with self._lock:
+            self.stats['offered'] += 1
+            if self._queue.qsize() >= self._sample_above:
+                self._sampled += 1
+                if self._sampled % every:
+                    self.stats['sampled_out'] += 1
+                    return False
+                entry['sample_weight'] = every
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            with self._lock:
+                self.stats['dropped'] += 1
+            return False
+        return True
+
+    def flush(self, timeout=10.0):
+        """Wait until everything queued so far has been written"""
+        if self._thread is None or not self._thread.is_alive():
+            return False
+        done = threading.Event()
+        try:
+            self._queue.put(done, timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(timeout)
+
+    def close(self, timeout=10.0):
+        """Write what is queued, compress the current file and stop the writer"""
+        self.enabled = False
+        if self._thread is None:
+            return
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            print("Audit log queue did not drain on shutdown, unwritten entries are lost")
+            return
+        self._thread.join(timeout)
+        self._thread = None
+
+    # Writer thread
+
+    def _run(self):
+        batch = []
+        interval = self.config['flush_interval']
+        deadline = time.monotonic() + interval
+        while True:
+            try:
+                item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                item = None
+            if item is _STOP:
+                self._write(batch)
+                self._rotate()
+                return
+            if isinstance(item, threading.Event):
+                self._write(batch)
+                batch = []
+                item.set()
+            elif item is not None:
+                batch.append(item)
+            if len(batch) >= self.config['batch_size'] or time.monotonic() >= deadline:
+                self._write(batch)
+                batch = []
+                deadline = time.monotonic() + interval
+
+    def _format(self, entry):
+        request_body = entry.pop('request', b'')
+        outputs = _parse(entry.pop('response', b''))
+        # Streamed bodies are not kept; their view supplies the digest
+        if request_body:
+            entry['input_digest'] = content_hash(request_body)
+        entry.setdefault('input_digest', None)
+        if self.config['include_inputs']:
+            entry['inputs'] = _parse(request_body)
+        if isinstance(outputs, dict):
+            outputs.pop('success', None)
+        entry['outputs'] = outputs
+        return json.dumps(entry, separators=(',', ':'), ensure_ascii=False)
+
+    def _write(self, batch):
+        if not batch:
+            return
+        try:
+            data = ('\n'.join(self._format(entry) for entry in batch) + '\n').encode('utf-8')
+            if self._file is not None and self._file_bytes + len(data) > self.config['max_file_bytes']:
+                self._rotate()
+            if self._file is None:
+                self._open()
+            self._file.write(data)
+            self._file.flush()
+            self._file_bytes += len(data)
+        except (OSError, TypeError, ValueError) as e:
+            print(f"Audit log write failed: {e}")
+            self.stats['write_errors'] += len(batch)
+            return
+        with self._lock:
+            self.stats['written'] += len(batch)
+            self.stats['batches'] += 1
+
+    def _open(self):
+        # Process id keeps files of concurrent server processes apart
+        stamp = time.strftime('%Y%m%dT%H%M%S')
+        self._files_opened += 1
+        name = f'audit-{stamp}-{os.getpid()}-{self._files_opened:04d}.ndjson'
+        self._path = os.path.join(self.config['log_dir'], name)
+        self._file = open(self._path, 'ab')
+        self._file_bytes = self._file.tell()
+
+    def _rotate(self):
+        if self._file is None:
+            return
+        self._file.close()
+        self._file = None
+        try:
+            if self.config['compress']:
+                with open(self._path, 'rb') as src, gzip.open(self._path + '.gz', 'wb') as dst:
+                    shutil.copyfileobj(src, dst)
+                os.remove(self._path)
+            # File names sort chronologically
+            log_dir = self.config['log_dir']
+            suffix = '.ndjson.gz' if self.config['compress'] else '.ndjson'
+            rotated = sorted(name for name in os.listdir(log_dir) if name.startswith('audit-') and name.endswith(suffix))
+            for name in rotated[:-self.config['max_files']]:
+                os.remove(os.path.join(log_dir, name))
+        except OSError as e:
+            print(f"Audit log rotation failed: {e}")
+        with self._lock:
+            self.stats['rotations'] += 1
+
+    def info(self):
+        with self._lock:
+            stats = dict(self.stats)
+        return {
+            'enabled': self.enabled,
+            'queued': self._queue.qsize(),
+            'queue_size': self.config['queue_size'],
+            'current_file': self._path if self._file is not None else None,
+            **stats
+        }
@@ -0,0 +1,168 @@
+"""
+Length-bucketed Batch Inference for O/L Grade Prediction
+Runs many (marks history, attendance) requests through the models at once.
+Histories are grouped into length buckets and left-padded only to the
+longest history in their bucket, so a masked LSTM can use each student's
+full history without wasting work on padding.
+"""
+
+import numpy as np
+import tensorflow as tf
+from tensorflow import keras
+from tensorflow.keras import layers
+
+from cascade import agreement_scores
+from config import INFERENCE_CONFIG
+
+
+class LengthBucketedBatcher:
+    """Batch predictor wrapping a loaded OLGradePredictor"""
+
+    def __init__(self, predictor, config=INFERENCE_CONFIG):
+        self.predictor = predictor
+        self.config = config
+        self.pad_value = config['pad_value']
+        self._model = None
+        self._model_fn = None
+        self.last_stats = {}
+
+        variable = config['variable_length']
+        if variable == 'auto':
+            variable = bool(predictor.model_config.get('variable_length'))
+        self.variable_length = variable
+
+    @property
+    def model(self):
+        """LSTM accepting any number of timesteps, sharing the trained layers' weights"""
+        if self._model is None:
+            base = self.predictor.lstm_model
+            if any(isinstance(layer, layers.Masking) for layer in base.layers):
+                self._model = base
+            else:
+                # LSTM weights do not depend on sequence length, so the trained
+                # layers are reused behind a variable-length masked input
+                inputs = keras.Input(shape=(None, base.input_shape[-1]))
+                x = layers.Masking(mask_value=self.pad_value)(inputs)
+                for layer in base.layers:
+                    x = layer(x)
+                self._model = keras.Model(inputs, x)
+        return self._model
+
+    def _call_variable(self, X):
+        # One graph for every (batch, length) shape instead of eager step-by-step LSTM loops
+        if self._model_fn is None:
+            model = self.model
+            self._model_fn = tf.function(
+                lambda x: model(x, training=False),
+                input_signature=[tf.TensorSpec(shape=(None, None, 2), dtype=tf.float32)]
+            )
+        return self._model_fn(tf.constant(X))
+
+    def _bucket_of(self, length):
+        for boundary in self.config['length_buckets']:
+            if length <= boundary:
+                return boundary
+        return self.config['length_buckets'][-1]
+
+    def _pad(self, histories, attendances, length):
+        X = np.full((len(histories), length, 2), self.pad_value, dtype=np.float32)
+        for row, (marks, attendance) in enumerate(zip(histories, attendances)):
+            marks = marks[-length:]
+            X[row, length - len(marks):, 0] = marks
+            X[row, length - len(marks):, 1] = attendance
+        return X
+
+    def predict(self, items, tier='ensemble', cascade=True):
+        """
+        Predict the next mark for many histories at once
+
+        Args:
+            items: List of (marks_history, attendance_percentage) pairs
+            tier: 'ensemble', or a cheaper service tier under load:
+                'gb_only' skips the LSTM, 'simple_average' skips both models
+            cascade: Let confident GB predictions skip the LSTM when the
+                predictor has a calibrated cascade
+
+        Returns:
+            list: One result dict per item, shaped like predict_next_mark
+        """
+        predictor = self.predictor
+        seq_len = predictor.sequence_length
+        use_lstm = tier == 'ensemble'
+        variable = self.variable_length and use_lstm
+        min_len = self.config['min_history'] if variable else seq_len
+        max_len = self.config['max_history'] if self.variable_length else seq_len
+
+        results = [None] * len(items)
+        histories, attendances, indices = [], [], []
+        for i, (marks, attendance) in enumerate(items):
+            if len(marks) < min_len or tier == 'simple_average':
+                results[i] = predictor.simple_average_prediction(marks, attendance)
+                continue
+            histories.append(np.asarray(marks[-max_len:], dtype=np.float64))
+            attendances.append(float(attendance))
+            indices.append(i)
+
+        stats = {'items': len(items), 'model_items': len(indices), 'buckets': 0,
+                 'model_calls': 0, 'padded_cells': 0, 'used_cells': 0, 'early_exits': 0}
+        if not indices:
+            self.last_stats = stats
+            return results
+        lengths = np.array([len(h) for h in histories])
+
+        # GB: a single call over the fixed last-window features; short histories
+        # only get a GB prediction if the GB model was trained on padded windows
+        gb_trained_padded = bool(predictor.model_config.get('variable_length'))
+        gb_rows = [pos for pos in range(len(histories))
+                   if lengths[pos] >= seq_len or gb_trained_padded]
+        gb_preds = np.full(len(histories), np.nan)
+        early = np.zeros(len(histories), dtype=bool)
+        if gb_rows:
+            X_gb = self._pad([histories[p] for p in gb_rows], [attendances[p] for p in gb_rows], seq_len)
+            gb_preds[gb_rows] = predictor.gb_model.predict(X_gb.reshape(len(gb_rows), -1))
+
+            # Cascade: confident GB predictions skip the LSTM
+            if use_lstm and cascade and predictor.cascade is not None:
+                scores = agreement_scores(X_gb[:, :, 0], gb_preds[gb_rows], self.pad_value)
+                early[gb_rows] = predictor.cascade.exits(scores)
+                stats['early_exits'] = int(early.sum())
+
+        # LSTM: one call per (bucket, batch) chunk, padded to the chunk's longest history
+        lstm_preds = np.empty(len(histories), dtype=np.float64)
+        buckets = {}
+        for pos, length in enumerate(lengths):
+            if not early[pos]:
+                buckets.setdefault(self._bucket_of(length), []).append(pos)
+
+        for positions in (buckets.values() if use_lstm else []):
+            positions.sort(key=lambda pos: lengths[pos])
+            for start in range(0, len(positions), self.config['max_batch_size']):
+                chunk = positions[start:start + self.config['max_batch_size']]
+                pad_len = int(lengths[chunk[-1]])
+                X = self._pad([histories[p] for p in chunk], [attendances[p] for p in chunk], pad_len)
+                if self.variable_length:
+                    preds = self._call_variable(X)
+                else:
+                    preds = predictor.lstm_model(X, training=False)
+                lstm_preds[chunk] = np.asarray(preds).reshape(-1)
+                stats['model_calls'] += 1
+                stats['padded_cells'] += len(chunk) * pad_len
+                stats['used_cells'] += int(lengths[chunk].sum())
+        stats['buckets'] = len(buckets) if use_lstm else 0
+
+        for pos, i in enumerate(indices):
+            gb_pred = None if np.isnan(gb_preds[pos]) else gb_preds[pos]
+            if not use_lstm and gb_pred is None:
+                results[i] = predictor.simple_average_prediction(histories[pos], attendances[pos])
+                continue
+            results[i] = predictor.combine_predictions(
+                histories[pos], attendances[pos],
+                lstm_preds[pos] if use_lstm and not early[pos] else None, gb_pred
+            )
+            if early[pos]:
+                results[i]['method'] = 'early_exit'
+
+        if stats['padded_cells']:
+            stats['padding_waste'] = 1 - stats['used_cells'] / stats['padded_cells']
+        self.last_stats = stats
+        return results
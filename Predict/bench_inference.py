@@ -0,0 +1,134 @@
+"""
+Benchmark: fixed-window per-request inference vs length-bucketed batches
+Measures throughput on mixed-length histories for
+  1. predict_next_mark called once per history (fixed window)
+  2. predict_batch with the fixed window
+  3. predict_batch with full variable-length histories, one padded batch
+  4. predict_batch with full variable-length histories, length-bucketed
+and the cost of MC dropout uncertainty on top of the batched path, with all
+samples tiled into one batch vs one model call per sample, and the cost of
+per-mark explanations (GB path attribution and LSTM integrated gradients)
+"""
+
+import argparse
+import os
+import time
+
+os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '3')
+
+import numpy as np
+
+from batch_inference import LengthBucketedBatcher
+from config import INFERENCE_CONFIG, UNCERTAINTY_CONFIG
+from train_model import OLGradePredictor
+
+
+def make_histories(n, seed=42):
+    """Mixed-length histories like a school mid-way through O/L preparation"""
+    rng = np.random.default_rng(seed)
+    items = []
+    for _ in range(n):
+        length = int(rng.integers(2, INFERENCE_CONFIG['max_history'] + 1))
+        ability = rng.normal(60, 18)
+        marks = np.clip(ability + rng.normal(0, 6, length), 0, 100).round().tolist()
+        items.append((marks, float(rng.beta(8, 2) * 100)))
+    return items
+
+
+def timed(fn, repeat):
+    fn()  # Warm-up (graph tracing, lazy model build)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def run(n_items, repeat):
+    predictor = OLGradePredictor()
+    if not predictor.load_models():
+        raise SystemExit("Models not found. Train models first using train_model.py")
+
+    items = make_histories(n_items)
+    rows = []
+
+    per_item = timed(lambda: [predictor.predict_next_mark(m, a) for m, a in items], 1)
+    rows.append(('per-request fixed window', per_item, None, n_items))
+
+    fixed = LengthBucketedBatcher(predictor, {**INFERENCE_CONFIG, 'variable_length': False})
+    seconds = timed(lambda: fixed.predict(items), repeat)
+    rows.append(('batched fixed window', seconds, fixed.last_stats, n_items))
+
+    single_bucket = LengthBucketedBatcher(predictor, {
+        **INFERENCE_CONFIG,
+        'variable_length': True,
+        'length_buckets': [INFERENCE_CONFIG['max_history']]
+    })
+    seconds = timed(lambda: single_bucket.predict(items), repeat)
+    rows.append(('batched variable, no buckets', seconds, single_bucket.last_stats, n_items))
+
+    bucketed = LengthBucketedBatcher(predictor, {**INFERENCE_CONFIG, 'variable_length': True})
+    seconds = timed(lambda: bucketed.predict(items), repeat)
+    rows.append(('batched variable, bucketed', seconds, bucketed.last_stats, n_items))
+
+    print("\n" + "="*80)
+    print(f"INFERENCE BENCHMARK: {n_items} mixed-length histories (2-{INFERENCE_CONFIG['max_history']} marks)")
+    print("="*80)
+    print(f"{'path':32} {'seconds':>9} {'items/s':>10} {'calls':>6} {'pad waste':>10} {'model items':>12}")
+    for name, seconds, stats, n in rows:
+        calls = stats['model_calls'] if stats else n
+        waste = f"{stats['padding_waste'] * 100:.1f}%" if stats else '-'
+        model_items = stats['model_items'] if stats else sum(
+            1 for m, _ in items if len(m) >= predictor.sequence_length
+        )
+        print(f"{name:32} {seconds:>9.3f} {n / seconds:>10.0f} {calls:>6} {waste:>10} {model_items:>12}")
+
+    run_uncertainty(predictor, items, repeat)
+    run_explanations(predictor, items, repeat)
+
+
+def run_uncertainty(predictor, items, repeat):
+    """MC dropout cost: tiled single batch vs a model call per sample"""
+    samples = UNCERTAINTY_CONFIG['mc_samples']
+    point = timed(lambda: predictor.predict_batch(items), repeat)
+    tiled = timed(lambda: predictor.predict_batch(items, uncertainty=samples), repeat)
+    stats = predictor._uncertainty.last_stats
+
+    estimator = predictor._uncertainty
+    preds = predictor.predict_batch(items)
+    rows = [i for i, pred in enumerate(preds) if 'lstm_prediction' in pred]
+    histories = [items[i][0] for i in rows]
+    attendances = [items[i][1] for i in rows]
+
+    def per_sample():
+        for _ in range(samples):
+            estimator.last_stats = {'model_calls': 0, 'model_rows': 0}
+            estimator.lstm_samples(histories, attendances, 1)
+    looped = timed(per_sample, 1)
+
+    print(f"\nUNCERTAINTY: {samples} MC dropout samples x {stats['model_items']} model predictions")
+    print(f"{'point predictions':32} {point:>9.3f}s")
+    print(f"{'+ tiled samples':32} {tiled:>9.3f}s  ({stats['model_calls']} calls, {stats['model_rows']} rows, "
+          f"{tiled / point:.1f}x point cost)")
+    print(f"{'samples, one call each':32} {looped:>9.3f}s  (LSTM sampling only)")
+
+
+def run_explanations(predictor, items, repeat):
+    """Explanation cost on top of point predictions, split by model"""
+    point = timed(lambda: predictor.predict_batch(items), repeat)
+    explained = timed(lambda: predictor.predict_batch(items, explain=True), repeat)
+    stats = predictor._explainer.last_stats
+
+    print(f"\nEXPLANATIONS: {stats['explained']} predictions, {stats['steps']} integrated gradient steps")
+    print(f"{'point predictions':32} {point:>9.3f}s")
+    print(f"{'+ explanations':32} {explained:>9.3f}s  ({stats['model_calls']} gradient calls, "
+          f"{stats['model_rows']} rows, {explained / point:.1f}x point cost)")
+    print(f"{'  LSTM integrated gradients':32} {stats['lstm_seconds']:>9.3f}s")
+    print(f"{'  GB path attribution':32} {stats['gb_seconds']:>9.3f}s")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark batched inference paths")
+    parser.add_argument('--items', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    run(args.items, args.repeat)
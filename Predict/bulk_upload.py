@@ -0,0 +1,257 @@
+"""
+Streaming Bulk Upload Parsing
+Reads a /api/predict/bulk body incrementally, one class at a time, and
+validates each class against a schema compiled once into nested checks,
+so malformed or oversized uploads are rejected as soon as the offending
+part arrives and memory holds one class rather than the whole school
+"""
+
+import codecs
+import hashlib
+import json
+
+from config import BULK_UPLOAD_CONFIG
+
+_WHITESPACE = ' \t\n\r'
+
+
+class PayloadError(ValueError):
+    """Rejected upload; status is the HTTP status to answer with"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+# Schema compilation
+
+class Range:
+    """Number (not bool) between lo and hi"""
+
+    def __init__(self, lo, hi):
+        self.lo, self.hi = lo, hi
+
+
+class ListOf:
+    """List of items, at most max_key (a BULK_UPLOAD_CONFIG key) long"""
+
+    def __init__(self, item, max_key):
+        self.item, self.max_key = item, max_key
+
+
+class Obj:
+    """Object with typed optional fields; other keys are ignored"""
+
+    def __init__(self, fields, required=()):
+        self.fields, self.required = fields, required
+
+
+def compile_schema(schema, config=BULK_UPLOAD_CONFIG):
+    """
+    Validator for a schema of types / type tuples, Range, ListOf and Obj
+
+    Returns:
+        callable: check(value, path) raising PayloadError naming the path
+    """
+    if isinstance(schema, Range):
+        lo, hi = schema.lo, schema.hi
+
+        def check(value, path):
+            if isinstance(value, bool) or not isinstance(value, (int, float)) or not lo <= value <= hi:
+                raise PayloadError(f'{path} must be a number between {lo} and {hi}')
+        return check
+
+    if isinstance(schema, ListOf):
+        item = compile_schema(schema.item, config)
+        limit, max_key = config[schema.max_key], schema.max_key
+
+        def check(value, path):
+            if not isinstance(value, list):
+                raise PayloadError(f'{path} must be a list')
+            if len(value) > limit:
+                raise PayloadError(f'{path} has {len(value)} entries, limit is {limit} ({max_key})', 413)
+            for i, entry in enumerate(value):
+                item(entry, f'{path}[{i}]')
+        return check
+
+    if isinstance(schema, Obj):
+        fields = {key: compile_schema(spec, config) for key, spec in schema.fields.items()}
+        required = schema.required
+
+        def check(value, path):
+            if not isinstance(value, dict):
+                raise PayloadError(f'{path} must be an object')
+            for key in required:
+                if key not in value:
+                    raise PayloadError(f'{path}.{key} is required')
+            for key, entry in value.items():
+                field = fields.get(key)
+                if field is not None and entry is not None:
+                    field(entry, f'{path}.{key}')
+        return check
+
+    types = schema if isinstance(schema, tuple) else (schema,)
+    names = ' or '.join(t.__name__ for t in types)
+
+    def check(value, path):
+        if not isinstance(value, types) or (isinstance(value, bool) and bool not in types):
+            raise PayloadError(f'{path} must be {names}')
+    return check
+
+
+SUBJECT_SCHEMA = Obj({'name': str, 'marks': ListOf(Range(0, 100), 'max_marks')}, required=('name',))
+
+STUDENT_SCHEMA = Obj({
+    'student_id': (str, int),
+    'name': str,
+    'attendance': Range(0, 100),
+    'grade': (str, int),
+    'school_id': (str, int),
+    'subjects': ListOf(SUBJECT_SCHEMA, 'max_subjects')
+})
+
+CLASS_SCHEMA = Obj({
+    'class_id': (str, int),
+    'class_name': str,
+    'grade': (str, int),
+    'students': ListOf(STUDENT_SCHEMA, 'max_students_per_class')
+})
+
+# Top-level fields that change predictions: once some classes have been
+# predicted (see BulkUpload.freeze_options) they can no longer arrive
+STREAM_OPTIONS = ('school_id', 'grade', 'uncertainty')
+
+
+class BulkUpload:
+    """
+    Incremental reader of {"classes": [...], ...options} from a file object
+
+    Options before "classes" are in .options by the time the first class
+    is yielded; .digest is the content_hash of the raw body once read.
+    """
+
+    def __init__(self, stream, content_length=None, config=BULK_UPLOAD_CONFIG):
+        if content_length is not None and content_length > config['max_body_bytes']:
+            raise PayloadError(f'Request body is {content_length} bytes, limit is {config["max_body_bytes"]}', 413)
+        self.stream = stream
+        self.config = config
+        self.options = {}
+        self.digest = None
+        self._options_frozen = False
+        self._check_class = compile_schema(CLASS_SCHEMA, config)
+        self._decoder = codecs.getincrementaldecoder('utf-8')()
+        self._json = json.JSONDecoder()
+        self._hash = hashlib.blake2b(digest_size=16)
+        self._buf = ''
+        self._pos = 0
+        self._read = 0
+        self._eof = False
+
+    # Buffer
+
+    def _fill(self, size=None):
+        if self._eof:
+            return False
+        chunk = self.stream.read(size or self.config['chunk_bytes'])
+        if not chunk:
+            self._eof = True
+            self._buf += self._decoder.decode(b'', final=True)
+            return False
+        self._read += len(chunk)
+        if self._read > self.config['max_body_bytes']:
+            raise PayloadError(f'Request body exceeds {self.config["max_body_bytes"]} bytes', 413)
+        self._hash.update(chunk)
+        if self._pos > self.config['chunk_bytes']:
+            self._buf, self._pos = self._buf[self._pos:], 0
+        self._buf += self._decoder.decode(chunk)
+        return True
+
+    def _peek(self):
+        """Next non-whitespace character, '' at the end of the body"""
+        while True:
+            while self._pos < len(self._buf) and self._buf[self._pos] in _WHITESPACE:
+                self._pos += 1
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._fill():
+                return ''
+
+    def _expect(self, chars):
+        char = self._peek()
+        if not char or char not in chars:
+            found = repr(char) if char else 'end of body'
+            raise PayloadError(f'Malformed JSON at byte {self._read}: expected {" or ".join(chars)}, found {found}')
+        self._pos += 1
+        return char
+
+    def _value(self, max_chars):
+        """Next complete JSON value, reading until it (and one following character) is buffered"""
+        self._peek()
+        while True:
+            try:
+                value, end = self._json.raw_decode(self._buf, self._pos)
+                # A number at the end of the buffer may continue in the next chunk
+                if end < len(self._buf) or self._eof:
+                    self._pos = end
+                    return value
+            except json.JSONDecodeError as e:
+                if self._eof:
+                    raise PayloadError(f'Malformed JSON: {e.msg}')
+            pending = len(self._buf) - self._pos
+            if pending > max_chars:
+                raise PayloadError(f'A single class or field exceeds {max_chars} characters', 413)
+            # Grow geometrically so a large value is not re-parsed once per chunk
+            self._fill(max(self.config['chunk_bytes'], pending))
+
+    def freeze_options(self):
+        """Reject STREAM_OPTIONS that arrive from now on (predictions already used .options)"""
+        self._options_frozen = True
+
+    # Document
+
+    def classes(self):
+        """Yield each validated class dict in order"""
+        config = self.config
+        self._expect('{')
+        seen_classes = False
+        n_classes = n_students = 0
+        if self._peek() == '}':
+            self._pos += 1
+        else:
+            while True:
+                key = self._value(config['max_field_chars'])
+                if not isinstance(key, str):
+                    raise PayloadError('Malformed JSON: object keys must be strings')
+                self._expect(':')
+                if key == 'classes':
+                    seen_classes = True
+                    self._expect('[')
+                    if self._peek() == ']':
+                        self._pos += 1
+                    else:
+                        while True:
+                            class_data = self._value(config['max_class_chars'])
+                            path = f'$.classes[{n_classes}]'
+                            self._check_class(class_data, path)
+                            n_classes += 1
+                            n_students += len(class_data.get('students') or [])
+                            if n_classes > config['max_classes']:
+                                raise PayloadError(f'More than {config["max_classes"]} classes (max_classes)', 413)
+                            if n_students > config['max_students']:
+                                raise PayloadError(f'More than {config["max_students"]} students (max_students)', 413)
+                            yield class_data
+                            if self._expect(',]') == ']':
+                                break
+                else:
+                    if self._options_frozen and key in STREAM_OPTIONS:
+                        raise PayloadError(f'"{key}" must come before "classes" in large request bodies')
+                    self.options[key] = self._value(config['max_field_chars'])
+                if self._expect(',}') == '}':
+                    break
+
+        if self._peek():
+            raise PayloadError(f'Malformed JSON at byte {self._read}: data after the request object')
+        if not seen_classes:
+            raise PayloadError('Invalid request. "classes" field is required.')
+        self._hash.update(b'\x00')
+        self.digest = self._hash.hexdigest()
@@ -0,0 +1,194 @@
+"""
+Cascaded Early-exit Inference
+A cheap first stage (GB on the last window) answers on its own when it
+agrees with the window mean and recent marks are stable; only the
+remaining, uncertain predictions run the LSTM. The score threshold is
+calibrated offline on held-out windows so the cascade's MAE stays within
+a configured tolerance of the full ensemble's, and reported on held-out
+windows it was not chosen on.
+"""
+
+import argparse
+import json
+import os
+import threading
+
+import numpy as np
+
+from config import CASCADE_CONFIG, INFERENCE_CONFIG
+
+CALIBRATION_FILE = 'cascade.json'
+
+
+def agreement_scores(windows, gb_preds, pad_value=None):
+    """
+    Uncertainty of the cheap stage: disagreement between the GB prediction
+    and the window mean, plus the spread of the recent marks
+
+    Args:
+        windows: Marks of the GB input windows, shape (n, sequence_length)
+        gb_preds: GB predictions, shape (n,)
+        pad_value: Padding marker in windows to ignore, if any
+    """
+    windows = np.asarray(windows, dtype=np.float64)
+    valid = np.ones_like(windows, dtype=bool) if pad_value is None else windows != pad_value
+    counts = np.maximum(valid.sum(axis=1), 1)
+    means = np.where(valid, windows, 0).sum(axis=1) / counts
+    stds = np.sqrt(np.where(valid, (windows - means[:, None]) ** 2, 0).sum(axis=1) / counts)
+    return np.abs(np.asarray(gb_preds) - means) + stds
+
+
+class Cascade:
+    """Calibrated early-exit threshold with thread-safe exit counters"""
+
+    def __init__(self, calibration):
+        self.calibration = calibration
+        self.threshold = calibration['threshold']
+        self._lock = threading.Lock()
+        self.stats = {'model_items': 0, 'early_exits': 0}
+
+    @classmethod
+    def load(cls, model_path, model_version):
+        """Calibration stored next to the artifacts, if it was made for these models"""
+        path = os.path.join(model_path, CALIBRATION_FILE)
+        if not CASCADE_CONFIG['enabled'] or not os.path.exists(path):
+            return None
+        with open(path) as f:
+            calibration = json.load(f)
+        if calibration.get('model_version') != model_version:
+            print("Cascade calibration is for other models, run cascade.py to recalibrate")
+            return None
+        return cls(calibration)
+
+    def exits(self, scores):
+        """Mask of predictions the cheap stage answers on its own"""
+        mask = np.asarray(scores) <= self.threshold
+        with self._lock:
+            self.stats['model_items'] += len(mask)
+            self.stats['early_exits'] += int(mask.sum())
+        return mask
+
+    def info(self):
+        with self._lock:
+            stats = dict(self.stats)
+        stats['early_exit_share'] = stats['early_exits'] / stats['model_items'] if stats['model_items'] else 0.0
+        return {'threshold': self.threshold, 'calibration': self.calibration, **stats}
+
+
+def calibrate(predictor, X, y, tolerance=None, report_split=None, seed=42):
+    """
+    Largest score threshold whose cascade MAE stays within tolerance of the ensemble
+
+    The held-out windows are split: the threshold is chosen on one part and
+    the reported MAEs and early-exit share are measured on the other.
+
+    Args:
+        predictor: Loaded OLGradePredictor
+        X: Held-out windows, shape (n, sequence_length, 2)
+        y: True next marks
+        tolerance: Allowed MAE increase in marks (default CASCADE_CONFIG)
+        report_split: Share of the windows kept for reporting (default CASCADE_CONFIG)
+
+    Returns:
+        dict: Threshold, early-exit share and both MAEs on the report windows,
+        plus the same on the calibration windows under 'calibration'
+    """
+    tolerance = CASCADE_CONFIG['mae_tolerance'] if tolerance is None else tolerance
+    report_split = CASCADE_CONFIG['report_split'] if report_split is None else report_split
+    y = np.asarray(y, dtype=np.float64)
+    factors = np.array([predictor.calculate_attendance_factor(a) for a in X[:, -1, 1]])
+
+    lstm = np.asarray(predictor.lstm_model.predict(X, verbose=0)).reshape(-1)
+    gb = predictor.gb_model.predict(predictor.gb_features(X))
+    full_errors = np.abs(predictor.blend(lstm, gb, factors) - y)
+    cheap_errors = np.abs(predictor.blend(None, gb, factors) - y)
+    pad_value = INFERENCE_CONFIG['pad_value'] if predictor.model_config.get('variable_length') else None
+    scores = agreement_scores(X[:, -predictor.sequence_length:, 0], gb, pad_value)
+
+    rows = np.random.default_rng(seed).permutation(len(y))
+    n_report = int(round(len(y) * report_split))
+    calibration_rows, report_rows = rows[n_report:], rows[:n_report]
+    if not len(calibration_rows) or not len(report_rows):
+        raise ValueError(f'Need held-out windows for both calibration and reporting, got {len(y)}')
+
+    # Cascade MAE on the calibration rows when the k lowest-score windows exit early, for every k
+    order = calibration_rows[np.argsort(scores[calibration_rows], kind='stable')]
+    n = len(order)
+    gain = np.concatenate([[0.0], np.cumsum(cheap_errors[order] - full_errors[order])])
+    cascade_mae = (full_errors[order].sum() + gain) / n
+    ensemble_mae = full_errors[order].mean()
+    # Ties must exit together, so only cut between distinct scores
+    sorted_scores = scores[order]
+    cuts = np.concatenate([[0], np.flatnonzero(np.diff(sorted_scores) > 0) + 1, [n]])
+    allowed = cuts[cascade_mae[cuts] <= ensemble_mae + tolerance]
+    k = int(allowed.max())
+    threshold = float(sorted_scores[k - 1]) if k else -1.0
+    curve = {f'{share:.2f}': float(cascade_mae[cuts[cuts <= share * n].max()]) for share in (0.25, 0.5, 0.75, 0.9, 1.0)}
+
+    # The chosen threshold on windows it was not chosen on
+    exits = scores[report_rows] <= threshold
+    cascade_errors = np.where(exits, cheap_errors[report_rows], full_errors[report_rows])
+
+    return {
+        'threshold': threshold,
+        'tolerance': float(tolerance),
+        'early_exit_share': float(exits.mean()),
+        'ensemble_mae': float(full_errors[report_rows].mean()),
+        'cascade_mae': float(cascade_errors.mean()),
+        'gb_only_mae': float(cheap_errors[report_rows].mean()),
+        'n_samples': len(report_rows),
+        'calibration': {
+            'early_exit_share': k / n,
+            'ensemble_mae': float(ensemble_mae),
+            'cascade_mae': float(cascade_mae[k]),
+            'mae_by_exit_share': curve,
+            'n_samples': n
+        },
+        'model_version': predictor.model_version
+    }
+
+
+def print_report(report):
+    print("\n" + "="*60)
+    print("CASCADE CALIBRATION")
+    print("="*60)
+    calibration = report['calibration']
+    print(f"Held-out windows:      {calibration['n_samples']} calibration, {report['n_samples']} report")
+    print(f"Calibration cascade:   {calibration['cascade_mae']:.3f} vs ensemble {calibration['ensemble_mae']:.3f}")
+    print("\nOn the report windows:")
+    print(f"Ensemble MAE:          {report['ensemble_mae']:.3f}")
+    print(f"GB-only MAE:           {report['gb_only_mae']:.3f}")
+    print(f"Cascade MAE:           {report['cascade_mae']:.3f}  (tolerance +{report['tolerance']:.2f})")
+    print(f"Score threshold:       {report['threshold']:.3f}")
+    print(f"Early exits:           {report['early_exit_share'] * 100:.1f}%")
+    print("\nCalibration cascade MAE by early-exit share:")
+    for share, mae in calibration['mae_by_exit_share'].items():
+        print(f"  {float(share) * 100:5.0f}%  {mae:.3f}")
+
+
+if __name__ == '__main__':
+    from sklearn.model_selection import train_test_split
+    from train_model import OLGradePredictor
+
+    parser = argparse.ArgumentParser(description="Calibrate the early-exit cascade on held-out data")
+    parser.add_argument('--model-path', default='models/')
+    parser.add_argument('--marks', help="CSV/Parquet export of exam results (default: synthetic data)")
+    parser.add_argument('--attendance', help="CSV/Parquet export of attendance records")
+    parser.add_argument('--tolerance', type=float, help="Allowed MAE increase in marks")
+    args = parser.parse_args()
+
+    predictor = OLGradePredictor()
+    if not predictor.load_models(args.model_path):
+        raise SystemExit("Models not found. Train models first using train_model.py")
+
+    # The same held-out split train_models evaluates on
+    seed = predictor.model_config['seed']
+    np.random.seed(seed)
+    X, y = predictor.load_training_data(args.marks, args.attendance)
+    _, X_test, _, y_test = train_test_split(X, y, test_size=0.2, random_state=seed)
+
+    report = calibrate(predictor, X_test, y_test, args.tolerance)
+    print_report(report)
+    with open(os.path.join(args.model_path, CALIBRATION_FILE), 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nCalibration saved to {os.path.join(args.model_path, CALIBRATION_FILE)}")
@@ -41,14 +41,272 @@ MODEL_CONFIG = {
     'learning_rate': 0.001,
     'batch_size': 32,
     'epochs': 100,
-    'validation_split': 0.2
+    'validation_split': 0.2,
+    'variable_length': False,     # Train a masked LSTM on full, padded histories
+    'seed': 42,                   # Seeds data generation, splits and weights
+    'synthetic_students': 2000    # Synthetic students when no export is given
+}
+
+# Gradient Boosting Configuration
+GB_CONFIG = {
+    'n_estimators': 100,
+    'learning_rate': 0.1,
+    'max_depth': 5,
+    'random_state': 42
+}
+
+# Hyperparameter Sweep Configuration
+TUNING_CONFIG = {
+    'search': 'random',            # 'grid' or 'random'
+    'n_random_trials': 20,         # Trials sampled when search is 'random'
+    'n_folds': 3,
+    'epochs': 30,                  # Per-fold LSTM epochs (early stopping still applies)
+    'n_students': 2000,            # Synthetic students when no export is given
+    'seed': 42,
+    'workers': None,               # Default: CPU count // threads_per_worker
+    'threads_per_worker': 2,
+    'cache_dir': 'sweep_cache/',
+    'leaderboard_path': 'sweep_cache/leaderboard.json',
+    'promoted_config_path': 'models/tuned_config.json',
+    'space': {
+        'lstm_units': [64, 128],
+        'dropout_rate': [0.2, 0.3],
+        'learning_rate': [0.001, 0.003],
+        'batch_size': [32, 64],
+        'sequence_length': [4, 5, 6],
+        'gb_n_estimators': [100, 200],
+        'gb_learning_rate': [0.05, 0.1],
+        'gb_max_depth': [3, 5]
+    }
+}
+
+# Training Pipeline (GB fits in worker processes while the LSTM trains)
+TRAINING_CONFIG = {
+    'parallel': True,
+    'gb_workers': 3,               # Point model plus the two quantile models at once
+    'gb_threads': 1,               # BLAS threads per GB worker (the fits are single-threaded)
+    'lstm_threads': None           # TensorFlow intra-op threads (default: CPU count - 1)
+}
+
+# Training Cache (skips retraining when config, data and code are unchanged)
+TRAINING_CACHE_CONFIG = {
+    'enabled': True,
+    'cache_dir': 'training_cache/',
+    'max_artifact_sets': 5        # Complete model sets kept by fingerprint
+}
+
+# Incremental (warm-start) Training Configuration
+INCREMENTAL_CONFIG = {
+    'epochs': 10,                  # Fine-tuning epochs instead of a full run
+    'learning_rate_scale': 0.1,    # Fraction of MODEL_CONFIG learning rate
+    'replay_ratio': 1.0,           # Replayed old windows per new window
+    'replay_buffer_size': 5000,    # Old windows kept with the artifacts
+    'extra_trees': 20,             # Trees added to the GB ensemble per run
+    'new_synthetic_students': 200, # New data when no export is given
+    'checkpoint_dir': 'checkpoints/',  # Inside the model directory
+    'seed': 42
+}
+
+# Historical Data Ingestion (CSV/Parquet exports of ExamResult and Attendance)
+INGEST_CONFIG = {
+    'chunk_size': 50000,           # Rows read per chunk from an export
+    'cache_dir': 'data_cache/',    # Windowed datasets cached by source hash
+    'presorted': False,            # Export ordered by student -> flush histories early
+    'spill_rows': 2000000,         # Unsorted exports: rows buffered before spilling to disk
+    'spill_partitions': 16,        # Spilled rows are split by history into this many files
+    'default_attendance': 100,     # Used when a student has no attendance rows
+    'marks_columns': {
+        'student': 'studentId',
+        'subject': 'subject',
+        'mark': 'marks',
+        'max_marks': 'maxMarks',           # Optional, marks are scaled to 0-100
+        'order': ['year', 'term', 'examId']  # Chronological sort keys
+    },
+    'attendance_columns': {
+        'student': 'studentId',
+        'status': 'status',        # PRESENT / LATE / ABSENT
+        'present': 'present'       # Fallback boolean column
+    }
+}
+
+# Batch Inference Configuration
+INFERENCE_CONFIG = {
+    'variable_length': 'auto',    # Use full histories: True/False, 'auto' = if trained so
+    'min_history': 2,             # Shorter histories use the simple average
+    'max_history': 24,            # Longest history fed to the LSTM
+    'length_buckets': [3, 5, 8, 12, 16, 24],
+    'max_batch_size': 512,
+    'pad_value': -1.0             # Masked padding value (marks are never negative)
+}
+
+# Prediction Uncertainty (MC dropout intervals, GB quantiles, grade probabilities)
+UNCERTAINTY_CONFIG = {
+    'mc_samples': 30,             # Dropout-enabled LSTM samples per prediction
+    'max_samples': 200,           # Upper limit for a per-request sample count
+    'interval': 0.8,              # Central coverage of reported intervals
+    'gb_quantiles': True,         # Train quantile GB models for the interval bounds
+    'max_batch_rows': 16384       # Rows (items x samples) per tiled model call
+}
+
+# Prediction Explanations (per-mark attributions, see explain.py)
+EXPLANATION_CONFIG = {
+    'ig_steps': 16,                # Integrated gradient steps per LSTM explanation
+    'max_steps': 64,               # Upper bound for a requested number of steps
+    'baseline_attendance': 100,    # Reference attendance of the attribution baseline
+    'max_batch_rows': 16384        # LSTM rows (steps x histories) per gradient call
+}
+
+# What-if Scenarios (attendance x hypothetical future marks grids)
+SCENARIO_CONFIG = {
+    'attendance_sweep': {'start': 60, 'stop': 100, 'steps': 21},  # Default attendance grid
+    'max_scenarios': 500,         # Grid points (attendance values x future mark sequences)
+    'max_items': 100000           # Predictions (subjects x grid points) per request
+}
+
+# Multi-horizon Forecasts (marks rolled forward towards the O/L exam)
+FORECAST_CONFIG = {
+    'default_horizon': 3,         # Future exams forecast when no horizon is given
+    'max_horizon': 12,            # Longest trajectory per request
+    'max_items': 100000           # Predictions (subjects x steps) per request
+}
+
+# Model Registry (specialized model sets per school / grade / subject)
+MODEL_REGISTRY_CONFIG = {
+    'variants_dir': 'models/variants/',  # One artifact directory per model set, named
+                                         # e.g. 'subject=Mathematics' or 'school=S01,grade=11'
+    'resolution': [                      # Most specific model set first; else models/
+        ('school', 'grade', 'subject'),
+        ('school', 'subject'),
+        ('grade', 'subject'),
+        ('subject',),
+        ('school',),
+        ('grade',)
+    ],
+    'max_loaded': 8,                     # Model sets kept in memory besides the default
+    'max_loaded_bytes': 512 * 1024 * 1024,  # Artifact size budget of loaded model sets
+    'preload': []                        # Model set names to load at startup
+}
+
+# Ensemble Calibration (combining base models, refit from cached OOF predictions)
+ENSEMBLE_CONFIG = {
+    'auto_fit': True,             # Fit the combination at the end of training
+    'oof_folds': 0,               # > 1: k-fold OOF predictions over the training split
+                                  # (trains the base models that many extra times)
+    'validation_split': 0.15,     # Otherwise: share of the training split held out from the
+                                  # base models to fit the combination on (0 = no fit)
+    'oof_epochs': None,           # Epochs of the per-fold LSTMs (None = MODEL_CONFIG)
+    'modes': ['default', 'weights', 'stacking'],
+    'cv_folds': 5,                # Folds for choosing between modes on the OOF cache
+    'ridge': 1.0,                 # Stacking meta-model regularization
+    'min_improvement': 0.02       # CV MAE gain needed to replace the default combination
+}
+
+# Cascaded Early Exit (GB first, LSTM only for uncertain predictions)
+CASCADE_CONFIG = {
+    'enabled': True,              # Used once cascade.py has calibrated the loaded models
+    'mae_tolerance': 0.1,         # Allowed held-out MAE increase over the full ensemble
+    'report_split': 0.5           # Held-out share the MAEs are reported on, not calibrated on
+}
+
+# Response Cache (ETags and cached bodies for prediction endpoints)
+RESPONSE_CACHE_CONFIG = {
+    'enabled': True,
+    'coalesce_inflight': True,      # Concurrent identical requests share one computation
+    'max_entries': 1024,
+    'max_bytes': 64 * 1024 * 1024   # Total size of cached response bodies
+}
+
+# Shared Prediction Cache (SQLite file shared by all serving processes on the host)
+SHARED_CACHE_CONFIG = {
+    'enabled': True,
+    'path': 'prediction_cache/responses.sqlite3',
+    'max_entries': 100000,
+    'max_bytes': 512 * 1024 * 1024, # Total size of stored bodies
+    'max_body_bytes': 4 * 1024 * 1024,  # Larger bodies are only cached in-process
+    'evict_to': 0.9,                # Share of the limits left after an eviction
+    'touch_interval': 60.0,         # Seconds between access time updates of an entry
+    'busy_timeout': 5.0             # Seconds to wait for another process's write lock
+}
+
+# Graceful Degradation (latency budgets and service tiers under load)
+DEGRADATION_CONFIG = {
+    'enabled': True,
+    'latency_budget_ms': {          # Per-endpoint budget for one request
+        'default': 500,
+        '/api/predict/bulk': 5000,
+        '/api/predict/scenarios': 5000,
+        '/api/predict/forecast': 2000
+    },
+    'ewma_alpha': 0.2,              # Weight of the newest request in the load estimate
+    'step_down_load': 1.0,          # Step down a tier when recent latency / budget exceeds this
+    'step_up_load': 0.5,            # Step back up when it falls below this
+    'cooldown_seconds': 2.0,        # Minimum time between tier changes
+    'queue_delay_steps': [0.5, 0.8], # Share of the budget spent queueing (server backlog or
+                                    # X-Request-Start header) that forces each lower tier
+    'server_threads': 4             # Worker threads of start_server.py; requests beyond them queue
+}
+
+# Prediction Audit Log (append-only, written off the request path)
+AUDIT_LOG_CONFIG = {
+    'enabled': True,
+    'log_dir': 'audit_logs',
+    'include_inputs': True,         # Keep request bodies (for retraining), not only their digest
+    'queue_size': 10000,            # Entries waiting for the writer thread
+    'sample_above': 0.5,            # Queue fill above which only 1 in sample_every entries is kept
+    'sample_every': 4,
+    'batch_size': 500,              # Entries per write
+    'flush_interval': 1.0,          # Seconds before a partial batch is written
+    'max_file_bytes': 64 * 1024 * 1024,  # Rotate to a new file beyond this size
+    'max_files': 20,                # Rotated files kept (oldest deleted)
+    'compress': True                # gzip rotated files
+}
+
+# Bulk Uploads (/api/predict/bulk, parsed and predicted class by class)
+BULK_UPLOAD_CONFIG = {
+    'max_body_bytes': 64 * 1024 * 1024,
+    'stream_above_bytes': 1024 * 1024,  # Larger (or chunked) bodies are streamed, not cached
+    'chunk_bytes': 64 * 1024,       # Read size from the request stream
+    'max_class_chars': 8 * 1024 * 1024,  # One class object
+    'max_field_chars': 64 * 1024,   # Any other top-level field
+    'max_classes': 500,
+    'max_students': 20000,
+    'max_students_per_class': 500,
+    'max_subjects': 20,
+    'max_marks': 100,               # Marks per subject history
+    'predict_batch_students': 2000  # Students per prediction call while streaming
 }
 
 # API Configuration
 API_CONFIG = {
     'host': '127.0.0.1',
     'port': 5000,
-    'debug': False
+    'debug': False,
+    'exports_dir': 'exports/'      # /api/train reads marks/attendance exports only from here
+}
+
+# Load Test Configuration (loadtest.py)
+LOADTEST_CONFIG = {
+    'base_url': 'http://127.0.0.1:5001',   # Waitress server from start_server.py
+    'mix': {                               # Relative share of dashboard requests
+        'student': 0.60,
+        'class': 0.25,
+        'subject': 0.10,
+        'bulk': 0.05
+    },
+    'class_size': 35,
+    'classes_per_bulk': 6,
+    'payload_pool': 50,         # Distinct pre-built payloads per endpoint
+    'cache_hit_ratio': 0.0,     # Share of requests repeating a pooled body as-is; the rest
+                                # get a unique nonce field so the response cache misses
+    'timeout': 30,              # Seconds before a request counts as an error
+    'report_interval': 5,       # Seconds per row of the time series
+    'step_duration': 20,        # Seconds per rate step when searching saturation
+    'start_rate': 1.0,          # Requests/second of the first step
+    'rate_growth': 1.5,         # Multiplier between steps
+    'max_error_rate': 0.01,     # Saturation: more than 1% errors
+    'latency_slo_ms': 2000,     # Saturation: p95 above this
+    'min_throughput_ratio': 0.9,  # Saturation: served < 90% of offered rate
+    'seed': 42
 }
 
 # Risk Thresholds
@@ -0,0 +1,30 @@
+"""
+Shared pytest fixtures for the prediction tests
+"""
+import pytest
+
+from train_model import OLGradePredictor
+
+
+@pytest.fixture(scope='session')
+def loaded_predictor():
+    """Predictor with the shipped models in models/"""
+    predictor = OLGradePredictor()
+    if not predictor.load_models():
+        pytest.skip('No trained models')
+    return predictor
+
+
+@pytest.fixture(scope='module')
+def tiny_predictor():
+    """
+    (predictor, X, y): small LSTM, GB and GB quantile models fit for one
+    epoch on synthetic windows, rebuilt per test module
+    """
+    predictor = OLGradePredictor(model_config={'epochs': 1, 'lstm_units': 8},
+                                 gb_config={'n_estimators': 20})
+    X, y = predictor.generate_synthetic_data(n_students=80)
+    predictor.fit_lstm(X, y, epochs=1, verbose=0)
+    predictor.fit_gb(X, y)
+    predictor.fit_gb_quantiles(X, y)
+    return predictor, X, y
@@ -0,0 +1,152 @@
+"""
+Latency-budget Graceful Degradation
+Watches queue delay (measured in process from the server's backlog, or
+from a proxy's X-Request-Start header) and recent request latency against
+per-endpoint budgets and steps prediction requests down through cheaper service tiers under load
+(full ensemble -> GB only -> simple average), then back up as load drops
+"""
+
+import threading
+import time
+
+from config import DEGRADATION_CONFIG
+
+# Service tiers, most accurate first; names match the 'method' of predictions
+TIERS = ['ensemble', 'gb_only', 'simple_average']
+
+
+def request_start_delay(header, now=None):
+    """
+    Seconds a request spent queued before reaching the app, from an
+    X-Request-Start header set by the proxy ("t=<epoch>" in s, ms or us)
+    """
+    if not header:
+        return 0.0
+    try:
+        start = float(header.strip().lstrip('t='))
+    except ValueError:
+        return 0.0
+    # Scale milli/microsecond timestamps back to seconds
+    while start > 1e11:
+        start /= 1000
+    now = time.time() if now is None else now
+    return max(0.0, now - start)
+
+
+class LatencyGovernor:
+    """
+    Thread-safe controller choosing the service tier of each request
+
+    The global level moves one tier at a time with hysteresis: down when the
+    moving average of latency / budget exceeds step_down_load, up when it
+    falls below step_up_load. A request arriving behind a backlog that would
+    spend most of its budget queueing is pushed further down on its own.
+
+    The backlog is the server's count of requests waiting for a worker
+    thread (see watch_queue), else the requests in flight beyond
+    server_threads; it is converted to a delay with the recent service time.
+    """
+
+    def __init__(self, config=DEGRADATION_CONFIG):
+        self.config = config
+        self.level = 0
+        self.load = 0.0
+        self.in_flight = 0
+        self.service_time = None
+        self._queue_depth = None
+        self._last_change = time.monotonic()
+        self._lock = threading.Lock()
+        self.stats = {
+            'requests': {tier: 0 for tier in TIERS},
+            'budget_exceeded': 0,
+            'step_downs': 0,
+            'step_ups': 0
+        }
+
+    def budget(self, endpoint):
+        """Latency budget of an endpoint in seconds"""
+        budgets = self.config['latency_budget_ms']
+        return budgets.get(endpoint, budgets['default']) / 1000
+
+    def watch_queue(self, depth):
+        """Measure the backlog with depth(), the number of requests waiting for a server thread"""
+        self._queue_depth = depth
+
+    def _backlog_delay(self):
+        """Estimated seconds a request arriving now waits for a worker thread (lock held)"""
+        if not self.service_time:
+            return 0.0
+        if self._queue_depth is not None:
+            waiting = self._queue_depth()
+        else:
+            waiting = self.in_flight + 1 - self.config['server_threads']
+        return max(0, waiting) * self.service_time / self.config['server_threads']
+
+    def choose(self, endpoint, queue_delay=0.0):
+        """
+        Pick the tier for a new request
+
+        Args:
+            endpoint: Request path, selects the latency budget
+            queue_delay: Seconds the request already waited before the app,
+                if known from a proxy; the in-process backlog estimate is
+                used when it is larger
+
+        Returns:
+            str: One of TIERS
+        """
+        if not self.config['enabled']:
+            return TIERS[0]
+        with self._lock:
+            spent = max(queue_delay, self._backlog_delay()) / self.budget(endpoint)
+            self._adjust(time.monotonic())
+            level = self.level
+            for step, share in enumerate(self.config['queue_delay_steps'], start=1):
+                if spent >= share:
+                    level = max(level, step)
+            self.in_flight += 1
+            tier = TIERS[min(level, len(TIERS) - 1)]
+            self.stats['requests'][tier] += 1
+        return tier
+
+    def record(self, endpoint, elapsed, queue_delay=0.0):
+        """Feed back the latency of a request started with choose()"""
+        if not self.config['enabled']:
+            return
+        ratio = (elapsed + queue_delay) / self.budget(endpoint)
+        with self._lock:
+            self.in_flight -= 1
+            if self.service_time is None:
+                self.service_time = elapsed
+            self.service_time += self.config['ewma_alpha'] * (elapsed - self.service_time)
+            if ratio > 1:
+                self.stats['budget_exceeded'] += 1
+            self.load += self.config['ewma_alpha'] * (ratio - self.load)
+            self._adjust(time.monotonic())
+
+    def _adjust(self, now):
+        if now - self._last_change < self.config['cooldown_seconds']:
+            return
+        if self.load > self.config['step_down_load'] and self.level < len(TIERS) - 1:
+            self.level += 1
+            self.stats['step_downs'] += 1
+            print(f"Load {self.load:.2f} over budget, degrading to tier '{TIERS[self.level]}'")
+        elif self.load < self.config['step_up_load'] and self.level > 0:
+            self.level -= 1
+            self.stats['step_ups'] += 1
+            print(f"Load {self.load:.2f} back under budget, restoring tier '{TIERS[self.level]}'")
+        else:
+            return
+        self._last_change = now
+
+    def info(self):
+        with self._lock:
+            return {
+                **self.stats,
+                'requests': dict(self.stats['requests']),
+                'tier': TIERS[self.level],
+                'load': float(self.load),
+                'in_flight': self.in_flight,
+                'service_time_ms': self.service_time * 1000 if self.service_time else None,
+                'backlog_delay_ms': self._backlog_delay() * 1000
+            }
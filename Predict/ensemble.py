@@ -0,0 +1,250 @@
+"""
+Ensemble Calibration for O/L Grade Prediction
+Fits how the base model outputs are combined (LSTM/GB weights and the
+attendance scaling, or a linear stacking meta-model) from cached
+out-of-fold predictions, so it can be refit in seconds without
+retraining the base models. The chosen combination is stored with the
+artifacts and used by OLGradePredictor.blend at serve time.
+"""
+
+import argparse
+import json
+import os
+
+import numpy as np
+
+from config import ENSEMBLE_CONFIG
+
+OOF_FILE = 'oof_predictions.npz'
+ENSEMBLE_FILE = 'ensemble.json'
+
+# The original hand-set combination: (0.6 * lstm + 0.4 * gb) * (0.8 + 0.2 * attendance_factor)
+DEFAULT_ENSEMBLE = {
+    'mode': 'weights',
+    'lstm_weight': 0.6,
+    'gb_weight': 0.4,
+    'attendance_base': 0.8,
+    'attendance_scale': 0.2
+}
+
+STACKING_FEATURES = ['bias', 'lstm', 'gb', 'attendance_factor', 'lstm_x_attendance', 'gb_x_attendance']
+
+
+def _stacking_features(lstm, gb, factors):
+    lstm, gb, factors = np.broadcast_arrays(*(np.asarray(v, dtype=np.float64) for v in (lstm, gb, factors)))
+    return np.stack([np.ones_like(lstm), lstm, gb, factors, lstm * factors, gb * factors], axis=-1)
+
+
+def ensemble_mark(params, lstm_pred, gb_pred, attendance_factor):
+    """
+    Final mark from base model outputs (scalars or arrays)
+
+    Stacking needs both models; with only one model (short history,
+    degraded tier, early exit) its output gets the fitted attendance scaling.
+    """
+    if params['mode'] == 'stacking' and lstm_pred is not None and gb_pred is not None:
+        pred = _stacking_features(lstm_pred, gb_pred, attendance_factor) @ np.asarray(params['coef'])
+    else:
+        if lstm_pred is None:
+            base = gb_pred
+        elif gb_pred is None:
+            base = lstm_pred
+        else:
+            base = lstm_pred * params['lstm_weight'] + gb_pred * params['gb_weight']
+        pred = base * (params['attendance_base'] + params['attendance_scale'] * attendance_factor)
+    return np.clip(pred, 0, 100)
+
+
+def ensemble_coefficients(params, attendance_factor, has_gb=True):
+    """
+    Linear form of the combination for given attendance factors
+
+    Returns:
+        tuple: (k, a_lstm, a_gb) arrays with ensemble_mark = clip(k + a_lstm * lstm + a_gb * gb);
+        rows without a GB prediction get a_gb = 0
+    """
+    factors = np.asarray(attendance_factor, dtype=np.float64)
+    has_gb = np.broadcast_to(np.asarray(has_gb, dtype=bool), factors.shape)
+    scale = params['attendance_base'] + params['attendance_scale'] * factors
+    k = np.zeros_like(factors)
+    a_lstm = np.where(has_gb, params['lstm_weight'] * scale, scale)
+    a_gb = np.where(has_gb, params['gb_weight'] * scale, 0.0)
+    if params['mode'] == 'stacking':
+        # Stacking needs both models (see ensemble_mark)
+        c = params['coef']
+        k = np.where(has_gb, c[0] + c[3] * factors, k)
+        a_lstm = np.where(has_gb, c[1] + c[4] * factors, a_lstm)
+        a_gb = np.where(has_gb, c[2] + c[5] * factors, a_gb)
+    return k, a_lstm, a_gb
+
+
+# Out-of-fold prediction cache
+
+def save_oof(model_path, lstm, gb, attendance_factor, y, source):
+    """Write base model predictions on rows their models were not trained on"""
+    path = os.path.join(model_path, OOF_FILE)
+    tmp_path = path + '.tmp.npz'
+    np.savez(tmp_path, lstm=np.asarray(lstm, dtype=np.float64), gb=np.asarray(gb, dtype=np.float64),
+             attendance_factor=np.asarray(attendance_factor, dtype=np.float64), y=np.asarray(y, dtype=np.float64),
+             source=np.asarray(source))
+    os.replace(tmp_path, path)
+
+
+def load_oof(model_path):
+    path = os.path.join(model_path, OOF_FILE)
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as cached:
+        return {key: cached[key] for key in cached.files}
+
+
+def kfold_oof(predictor, X, y, folds=None, epochs=None, seed=42):
+    """
+    Out-of-fold LSTM and GB predictions over X from fresh per-fold models
+
+    Returns:
+        tuple: (lstm_preds, gb_preds)
+    """
+    from sklearn.model_selection import KFold
+    from tensorflow import keras
+
+    folds = folds or ENSEMBLE_CONFIG['oof_folds']
+    epochs = epochs or ENSEMBLE_CONFIG['oof_epochs']
+    lstm_preds = np.empty(len(y))
+    gb_preds = np.empty(len(y))
+    fold_model = predictor.__class__(model_config=predictor.model_config, gb_config=predictor.gb_config)
+    for fold, (train_idx, test_idx) in enumerate(KFold(folds, shuffle=True, random_state=seed).split(X)):
+        print(f"Out-of-fold predictions: fold {fold + 1}/{folds}")
+        keras.utils.set_random_seed(seed + fold)
+        fold_model.lstm_model = fold_model.create_lstm_model((X.shape[1], X.shape[2]))
+        fold_model.fit_lstm(X[train_idx], y[train_idx], epochs=epochs, verbose=0)
+        fold_model.fit_gb(X[train_idx], y[train_idx])
+        lstm_preds[test_idx] = fold_model.lstm_model.predict(X[test_idx], batch_size=1024, verbose=0).ravel()
+        gb_preds[test_idx] = fold_model.gb_model.predict(fold_model.gb_features(X[test_idx]))
+    return lstm_preds, gb_preds
+
+
+# Fitting
+
+def fit_weights(lstm, gb, factors, y):
+    """LSTM weight (GB gets the rest) on a 0.01 grid, attendance scaling by least squares"""
+    best = None
+    for w in np.linspace(0, 1, 101):
+        base = w * lstm + (1 - w) * gb
+        design = np.stack([base, base * factors], axis=1)
+        (a, b), *_ = np.linalg.lstsq(design, y, rcond=None)
+        params = {'mode': 'weights', 'lstm_weight': float(w), 'gb_weight': float(1 - w),
+                  'attendance_base': float(a), 'attendance_scale': float(b)}
+        mae = float(np.mean(np.abs(ensemble_mark(params, lstm, gb, factors) - y)))
+        if best is None or mae < best[0]:
+            best = (mae, params)
+    return best[1]
+
+
+def fit_stacking(lstm, gb, factors, y, ridge=None):
+    """Ridge-regularized linear meta-model over STACKING_FEATURES"""
+    ridge = ENSEMBLE_CONFIG['ridge'] if ridge is None else ridge
+    design = _stacking_features(lstm, gb, factors)
+    penalty = ridge * np.eye(design.shape[1])
+    penalty[0, 0] = 0  # No shrinkage of the bias
+    coef = np.linalg.solve(design.T @ design + penalty, design.T @ y)
+    # Single-model fallback keeps the fitted weights' attendance scaling
+    return {**fit_weights(lstm, gb, factors, y), 'mode': 'stacking', 'coef': coef.tolist(),
+            'features': STACKING_FEATURES}
+
+
+FITTERS = {
+    'default': lambda lstm, gb, factors, y: dict(DEFAULT_ENSEMBLE),
+    'weights': fit_weights,
+    'stacking': fit_stacking
+}
+
+
+def fit_ensemble(oof, modes=None, cv_folds=None, seed=42):
+    """
+    Pick the combination with the lowest cross-validated MAE on the OOF cache
+
+    Returns:
+        tuple: (params fitted on all rows, report of per-mode CV MAE)
+    """
+    modes = modes or ENSEMBLE_CONFIG['modes']
+    cv_folds = cv_folds or ENSEMBLE_CONFIG['cv_folds']
+    lstm, gb, factors, y = oof['lstm'], oof['gb'], oof['attendance_factor'], oof['y']
+    fold_of = np.random.default_rng(seed).permutation(len(y)) % cv_folds
+
+    cv_mae = {}
+    for mode in modes:
+        errors = np.empty(len(y))
+        for fold in range(cv_folds):
+            train, test = fold_of != fold, fold_of == fold
+            params = FITTERS[mode](lstm[train], gb[train], factors[train], y[train])
+            errors[test] = np.abs(ensemble_mark(params, lstm[test], gb[test], factors[test]) - y[test])
+        cv_mae[mode] = float(errors.mean())
+
+    # The hand-set default stays unless a fitted mode is clearly better
+    best = min(cv_mae, key=cv_mae.get)
+    if 'default' in cv_mae and cv_mae['default'] - cv_mae[best] < ENSEMBLE_CONFIG['min_improvement']:
+        best = 'default'
+    params = FITTERS[best](lstm, gb, factors, y)
+    report = {
+        'chosen': best,
+        'cv_mae': cv_mae,
+        'n_samples': int(len(y)),
+        'sources': sorted(set(np.asarray(oof.get('source', ['unknown'])).tolist()))
+    }
+    return params, report
+
+
+def load_ensemble(model_path):
+    """Stored combination for the artifacts in model_path, else the default"""
+    path = os.path.join(model_path, ENSEMBLE_FILE)
+    if not os.path.exists(path):
+        return dict(DEFAULT_ENSEMBLE)
+    with open(path) as f:
+        return json.load(f)['params']
+
+
+def save_ensemble(model_path, params, report=None):
+    path = os.path.join(model_path, ENSEMBLE_FILE)
+    if params == DEFAULT_ENSEMBLE and report is None:
+        if os.path.exists(path):
+            os.remove(path)
+        return
+    with open(path, 'w') as f:
+        json.dump({'params': params, 'report': report}, f, indent=2)
+
+
+def print_report(params, report):
+    print("\n" + "="*60)
+    print("ENSEMBLE CALIBRATION")
+    print("="*60)
+    print(f"OOF rows: {report['n_samples']} ({', '.join(report['sources'])})")
+    for mode, mae in report['cv_mae'].items():
+        marker = '  <- chosen' if mode == report['chosen'] else ''
+        print(f"  {mode:10} CV MAE {mae:.3f}{marker}")
+    if 'test_mae' in report:
+        print(f"  Test MAE (unseen rows): {report['test_mae']['chosen']:.3f}, "
+              f"default combination {report['test_mae']['default']:.3f}")
+    if params['mode'] == 'stacking':
+        for name, coef in zip(params['features'], params['coef']):
+            print(f"  {name:20} {coef:+.4f}")
+    else:
+        print(f"  ({params['lstm_weight']:.2f} * lstm + {params['gb_weight']:.2f} * gb) * "
+              f"({params['attendance_base']:.3f} + {params['attendance_scale']:.3f} * attendance_factor)")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Refit the ensemble combination from cached OOF predictions")
+    parser.add_argument('--model-path', default='models/')
+    parser.add_argument('--modes', nargs='+', choices=sorted(FITTERS), help="Candidate combinations")
+    args = parser.parse_args()
+
+    oof = load_oof(args.model_path)
+    if oof is None:
+        raise SystemExit(f"No {OOF_FILE} in {args.model_path}. Train models first using train_model.py")
+
+    params, report = fit_ensemble(oof, modes=args.modes)
+    print_report(params, report)
+    save_ensemble(args.model_path, params, report)
+    print(f"\nEnsemble saved to {os.path.join(args.model_path, ENSEMBLE_FILE)}; "
+          f"recalibrate the cascade (cascade.py) if it is used")
@@ -0,0 +1,212 @@
+"""
+Prediction Explanations for O/L Grade Prediction
+Per-prediction attributions over the input window (each past mark and
+attendance), computed for whole batches:
+- GB: exact path attribution. Every tree's root-to-leaf path gain is
+  precomputed per leaf, so a batch costs one apply() and a gather.
+- LSTM: integrated gradients from a flat history at the student's own
+  average and full attendance. All interpolation steps of all histories
+  are tiled into one gradient pass.
+Both go through the ensemble's (linear) combination, so base value plus
+contributions reproduces the predicted mark.
+"""
+
+import time
+
+import numpy as np
+import tensorflow as tf
+
+from config import EXPLANATION_CONFIG
+from ensemble import ensemble_coefficients
+
+
+def _leaf_contributions(tree, scale, n_features):
+    """Per node: summed value change along its root path, split by the feature of each split"""
+    value = tree.value[:, 0, 0] * scale
+    table = np.zeros((tree.node_count, n_features))
+    stack = [0]
+    while stack:
+        node = stack.pop()
+        for child in (tree.children_left[node], tree.children_right[node]):
+            if child >= 0:
+                table[child] = table[node]
+                table[child, tree.feature[node]] += value[child] - value[node]
+                stack.append(child)
+    return table, value[0]
+
+
+class PredictionExplainer:
+    """Batched attribution wrapping a loaded OLGradePredictor"""
+
+    def __init__(self, predictor, config=EXPLANATION_CONFIG):
+        self.predictor = predictor
+        self.config = config
+        self._gb_tables = None
+        self._gradient_fn = None
+        self.last_stats = {}
+
+    @property
+    def batcher(self):
+        predictor = self.predictor
+        if predictor._batcher is None:
+            from batch_inference import LengthBucketedBatcher
+            predictor._batcher = LengthBucketedBatcher(predictor)
+        return predictor._batcher
+
+    def gb_attributions(self, X_flat):
+        """
+        Exact path attribution of the GB model
+
+        Returns:
+            tuple: (base values, shape (n,); contributions, shape (n, n_features));
+            base + contributions.sum(axis=1) equals gb_model.predict(X_flat)
+        """
+        gb = self.predictor.gb_model
+        if self._gb_tables is None:
+            tables = [_leaf_contributions(tree.tree_, gb.learning_rate, gb.n_features_in_)
+                      for tree in gb.estimators_[:, 0]]
+            self._gb_tables = ([table for table, _ in tables], sum(root for _, root in tables))
+        tables, roots = self._gb_tables
+
+        leaves = gb.apply(X_flat).reshape(len(X_flat), -1).astype(np.intp)
+        contributions = np.zeros((len(X_flat), gb.n_features_in_))
+        for t, table in enumerate(tables):
+            contributions += table[leaves[:, t]]
+        init = gb.init_.predict(X_flat).reshape(-1) if hasattr(gb.init_, 'predict') else np.zeros(len(X_flat))
+        return init + roots, contributions
+
+    def _gradients(self, X):
+        if self._gradient_fn is None:
+            model = self.batcher.model if self.batcher.variable_length else self.predictor.lstm_model
+
+            @tf.function(reduce_retracing=True)
+            def gradient_fn(x):
+                with tf.GradientTape() as tape:
+                    tape.watch(x)
+                    y = model(x, training=False)
+                return y, tape.gradient(y, x)
+            self._gradient_fn = gradient_fn
+        outputs, grads = self._gradient_fn(tf.constant(X, dtype=tf.float32))
+        return np.asarray(outputs).reshape(-1), np.asarray(grads)
+
+    def lstm_attributions(self, X, baseline, steps):
+        """
+        Integrated gradients of the LSTM, all steps tiled into one batch per chunk
+
+        Returns:
+            tuple: (baseline outputs, shape (n,); attributions, shape X.shape)
+        """
+        n = len(X)
+        alphas = ((np.arange(steps) + 0.5) / steps).astype(np.float32)
+        per_call = max(1, self.config['max_batch_rows'] // (steps + 1))
+        reference = np.empty(n)
+        attributions = np.empty(X.shape)
+        for start in range(0, n, per_call):
+            x, b = X[start:start + per_call], baseline[start:start + per_call]
+            # Baseline rows first, then every interpolation step of every row
+            path = b[None] + alphas[:, None, None, None] * (x - b)[None]
+            outputs, grads = self._gradients(np.concatenate([b, path.reshape(-1, *x.shape[1:])]))
+            m = len(x)
+            reference[start:start + m] = outputs[:m]
+            attributions[start:start + m] = (x - b) * grads[m:].reshape(steps, *x.shape).mean(axis=0)
+            self.last_stats['model_calls'] += 1
+            self.last_stats['model_rows'] += m * (steps + 1)
+        return reference, attributions
+
+    def explain(self, items, preds, steps=None):
+        """
+        Attributions of batch predictions
+
+        Args:
+            items: (marks_history, attendance_percentage) pairs given to predict_batch
+            preds: Its results; only predictions with an LSTM output are explained
+            steps: Integrated gradient steps (default ig_steps)
+
+        Returns:
+            list: Per item, None or {'base_value', 'marks': [{'exams_ago',
+                  'mark', 'contribution'}], 'attendance', 'residual', 'models'}
+        """
+        start = time.perf_counter()
+        steps = min(max(int(steps or self.config['ig_steps']), 1), self.config['max_steps'])
+        predictor = self.predictor
+        batcher = self.batcher
+        seq_len = predictor.sequence_length
+        max_len = batcher.config['max_history'] if batcher.variable_length else seq_len
+
+        rows = [i for i, pred in enumerate(preds) if 'lstm_prediction' in pred]
+        self.last_stats = {'items': len(items), 'explained': len(rows), 'steps': steps,
+                           'model_calls': 0, 'model_rows': 0}
+        results = [None] * len(items)
+        if not rows:
+            self.last_stats['seconds'] = time.perf_counter() - start
+            return results
+
+        histories = [np.asarray(items[i][0][-max_len:], dtype=np.float64) for i in rows]
+        attendances = [float(items[i][1]) for i in rows]
+        lstm = np.array([preds[i]['lstm_prediction'] for i in rows])
+        gb = np.array([preds[i].get('gb_prediction', np.nan) for i in rows])
+        has_gb = ~np.isnan(gb)
+        factors = np.array([preds[i]['attendance_factor'] for i in rows])
+
+        # LSTM: one window padded to the longest history; padding is
+        # identical in the baseline, so it gets no attribution
+        lstm_start = time.perf_counter()
+        pad_len = max(len(h) for h in histories) if batcher.variable_length else seq_len
+        X = batcher._pad(histories, attendances, pad_len)
+        valid = X[:, :, 0] != batcher.pad_value
+        baseline = X.copy()
+        means = np.array([h[-pad_len:].mean() for h in histories], dtype=np.float32)
+        baseline[:, :, 0] = np.where(valid, means[:, None], X[:, :, 0])
+        baseline[:, :, 1] = np.where(valid, self.config['baseline_attendance'], X[:, :, 1])
+        lstm_reference, lstm_attr = self.lstm_attributions(X, baseline, steps)
+        self.last_stats['lstm_seconds'] = time.perf_counter() - lstm_start
+
+        # GB: last-window features, (mark, attendance) per timestep
+        gb_start = time.perf_counter()
+        gb_reference = np.zeros(len(rows))
+        gb_attr = np.zeros((len(rows), seq_len, 2))
+        gb_rows = np.flatnonzero(has_gb)
+        if len(gb_rows):
+            X_gb = batcher._pad([histories[p] for p in gb_rows], [attendances[p] for p in gb_rows], seq_len)
+            base, contributions = self.gb_attributions(X_gb.reshape(len(gb_rows), -1))
+            gb_reference[gb_rows] = base
+            gb_attr[gb_rows] = contributions.reshape(len(gb_rows), seq_len, 2)
+        self.last_stats['gb_seconds'] = time.perf_counter() - gb_start
+
+        # Ensemble: mark = k + a_lstm * lstm + a_gb * gb for the given attendance
+        # factor; the change from a full attendance factor is attendance's
+        k, a_lstm, a_gb = ensemble_coefficients(predictor.ensemble, factors, has_gb)
+        k_ref, a_lstm_ref, a_gb_ref = ensemble_coefficients(predictor.ensemble, np.ones(len(rows)), has_gb)
+        gb_reference = np.where(has_gb, gb_reference, 0.0)
+        base_value = k_ref + a_lstm_ref * lstm_reference + a_gb_ref * gb_reference
+        factor_effect = k + a_lstm * lstm_reference + a_gb * gb_reference - base_value
+
+        # Align both windows by how many exams ago each timestep was
+        width = max(pad_len, seq_len)
+        combined = np.zeros((len(rows), width, 2))
+        combined[:, width - pad_len:] += a_lstm[:, None, None] * lstm_attr
+        combined[:, width - seq_len:] += a_gb[:, None, None] * gb_attr
+
+        for pos, i in enumerate(rows):
+            history = histories[pos][-width:]
+            marks = [
+                {'exams_ago': len(history) - t, 'mark': float(mark),
+                 'contribution': float(combined[pos, width - len(history) + t, 0])}
+                for t, mark in enumerate(history)
+            ]
+            attendance = float(combined[pos, :, 1].sum() + factor_effect[pos])
+            explained = base_value[pos] + attendance + sum(m['contribution'] for m in marks)
+            results[i] = {
+                'base_value': float(base_value[pos]),
+                'marks': marks,
+                'attendance': attendance,
+                # Left unexplained by the integrated gradient approximation and clipping
+                'residual': float(preds[i]['predicted_mark'] - explained),
+                'models': {
+                    'lstm': {'reference': float(lstm_reference[pos]), 'prediction': float(lstm[pos])},
+                    'gb': {'reference': float(gb_reference[pos]), 'prediction': float(gb[pos])}
+                    if has_gb[pos] else None
+                }
+            }
+        self.last_stats['seconds'] = time.perf_counter() - start
+        return results
@@ -0,0 +1,100 @@
+"""
+Multi-horizon Forecasting for O/L Grade Prediction
+Rolls next-mark predictions forward towards the O/L exam: every step
+predicts all (student, subject) histories in one batch and appends the
+predicted marks to them, so a k-step trajectory for a whole school costs
+k batched calls instead of k calls per student and subject
+"""
+
+import numpy as np
+
+from config import FORECAST_CONFIG
+from rollup import student_surfaces
+
+
+def forecast_horizon(horizon):
+    """Number of future exams to forecast (default FORECAST_CONFIG['default_horizon'])"""
+    if horizon is None:
+        return FORECAST_CONFIG['default_horizon']
+    if isinstance(horizon, bool) or int(horizon) != horizon or not 1 <= horizon <= FORECAST_CONFIG['max_horizon']:
+        raise ValueError(f'"horizon" must be a whole number between 1 and {FORECAST_CONFIG["max_horizon"]}')
+    return int(horizon)
+
+
+def rollout(predict, items, horizon):
+    """
+    Autoregressive multi-step prediction
+
+    Args:
+        predict: Batch predictor, items -> results shaped like predict_next_mark
+        items: (marks_history, attendance_percentage) pairs
+        horizon: Number of steps
+
+    Returns:
+        tuple: (marks, shape (len(items), horizon); results of the last step)
+    """
+    histories = [list(marks) for marks, _ in items]
+    attendances = [attendance for _, attendance in items]
+    marks = np.empty((len(items), horizon))
+    preds = []
+    for step in range(horizon):
+        preds = predict(list(zip(histories, attendances)))
+        for row, pred in enumerate(preds):
+            marks[row, step] = pred['predicted_mark']
+            histories[row].append(pred['predicted_mark'])
+    return marks, preds
+
+
+def forecast_students(predictor, students, horizon=None, tier='ensemble', registry=None, grade=None, school=None):
+    """
+    Mark trajectories of every subject of many students
+
+    Args:
+        predictor: Loaded OLGradePredictor
+        students: List of {'subjects': [{'name', 'marks'}], 'attendance'} dicts;
+            attendance (default 100) is held constant over the horizon
+        horizon: Number of future exams, see forecast_horizon
+        tier: Service tier, see OLGradePredictor.predict_batch
+        registry: Optional ModelRegistry routing each subject to its model
+            set, by the student's (or the given) grade and school
+
+    Returns:
+        dict: Per student and step, subject marks and grades, overall
+        average and risk level, plus the average trajectory over all students
+    """
+    horizon = forecast_horizon(horizon)
+
+    items = []
+    blocks = []
+    names = []
+    for s, student in enumerate(students):
+        attendance = student.get('attendance', 100)
+        for subject in student.get('subjects', []):
+            if not subject.get('marks'):
+                continue
+            items.append((subject['marks'], attendance))
+            blocks.append((s, subject['name']))
+            if registry is not None:
+                names.append(registry.resolve(subject['name'], student.get('grade', grade),
+                                              student.get('school_id', school)))
+    if len(items) * horizon > FORECAST_CONFIG['max_items']:
+        raise ValueError(f'Forecast expands to {len(items) * horizon} predictions, '
+                         f'limit is {FORECAST_CONFIG["max_items"]}')
+
+    if registry is not None:
+        def predict(batch):
+            return registry.predict_batch(batch, names, tier=tier)
+    else:
+        def predict(batch):
+            return predictor.predict_batch(batch, tier=tier)
+    trajectories = rollout(predict, items, horizon)[0] if items else np.empty((0, horizon))
+    results, averages = student_surfaces(len(students), blocks, trajectories)
+
+    return {
+        'horizon': horizon,
+        'steps': list(range(1, horizon + 1)),
+        'students': results,
+        'average': averages.mean(axis=0).tolist() if len(students) else [],
+        'total_predictions': len(items) * horizon,
+        'batched_calls': horizon if items else 0
+    }
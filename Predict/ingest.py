@@ -0,0 +1,363 @@
+"""
+Historical Data Ingestion for O/L Grade Prediction
+Streams CSV/Parquet exports of real exam marks and attendance into the
+windowed (sequence, target) dataset used by the training pipeline
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from config import INFERENCE_CONFIG, INGEST_CONFIG, MODEL_CONFIG
+
+ATTENDED_STATUSES = ('PRESENT', 'LATE')
+
+
+def file_hash(paths, extra=None):
+    """Hash source files (read in 1MB blocks) plus any extra settings"""
+    digest = hashlib.sha256()
+    for path in paths:
+        if not path:
+            continue
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+    if extra is not None:
+        digest.update(json.dumps(extra, sort_keys=True).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def iter_chunks(path, columns=None, chunk_size=None):
+    """Yield DataFrame chunks of a CSV or Parquet export without reading it whole"""
+    chunk_size = chunk_size or INGEST_CONFIG['chunk_size']
+
+    if path.endswith('.parquet') or path.endswith('.pq'):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("pyarrow is required to read Parquet exports (pip install pyarrow)")
+
+        parquet_file = pq.ParquetFile(path)
+        available = set(parquet_file.schema_arrow.names)
+        wanted = [c for c in columns if c in available] if columns else None
+        for batch in parquet_file.iter_batches(batch_size=chunk_size, columns=wanted):
+            yield batch.to_pandas()
+    else:
+        header = pd.read_csv(path, nrows=0).columns
+        wanted = [c for c in columns if c in header] if columns else None
+        for chunk in pd.read_csv(path, usecols=wanted, chunksize=chunk_size):
+            yield chunk
+
+
+def load_attendance(path, chunk_size=None):
+    """
+    Aggregate an Attendance export into a percentage per student
+
+    Only two counters per student are kept, so the export can be any size.
+    """
+    cols = INGEST_CONFIG['attendance_columns']
+    attended = {}
+    totals = {}
+
+    for chunk in iter_chunks(path, list(cols.values()), chunk_size):
+        if cols['status'] in chunk.columns:
+            present = chunk[cols['status']].astype(str).str.upper().isin(ATTENDED_STATUSES)
+        else:
+            present = chunk[cols['present']].astype(str).str.lower().isin(('true', '1'))
+
+        grouped = present.groupby(chunk[cols['student']].astype(str)).agg(['sum', 'count'])
+        for student_id, (n_present, n_total) in grouped.iterrows():
+            attended[student_id] = attended.get(student_id, 0) + int(n_present)
+            totals[student_id] = totals.get(student_id, 0) + int(n_total)
+
+    return {
+        student_id: attended[student_id] / totals[student_id] * 100
+        for student_id in totals if totals[student_id] > 0
+    }
+
+
+class HistoryWindowBuilder:
+    """
+    Builds per-student per-subject ordered mark histories and sliding windows
+    incrementally from export chunks.
+
+    Each row is reduced to a few numeric columns (history code, sort keys,
+    mark) as soon as it is read. With a presorted export, every student whose
+    rows are complete is windowed and released after each chunk. Otherwise
+    rows are buffered up to INGEST_CONFIG['spill_rows'] and then spilled to
+    temporary partition files by history, which finish() sorts and windows
+    one partition at a time. With variable_length, windows are full-history
+    prefixes left-padded to INFERENCE_CONFIG['max_history'], as for the
+    masked LSTM.
+    """
+
+    def __init__(self, sequence_length, attendance=None, presorted=False, variable_length=False):
+        self.sequence_length = sequence_length
+        self.variable_length = variable_length
+        self.window_length = INFERENCE_CONFIG['max_history'] if variable_length else sequence_length
+        self.attendance = attendance or {}
+        self.presorted = presorted
+        self.default_attendance = INGEST_CONFIG['default_attendance']
+
+        self._history_codes = {}    # (student, subject) -> int code
+        self._history_attendance = []
+        self._pending = []          # Compact per-chunk column arrays
+        self._pending_rows = 0
+        self._rows_seen = 0
+        self._spill_dir = None
+        self._spills = 0
+        self._windows = []
+        self._targets = []
+        self.n_histories = 0
+
+    def _encode(self, students, subjects):
+        codes = np.empty(len(students), dtype=np.int64)
+        for i, key in enumerate(zip(students, subjects)):
+            code = self._history_codes.get(key)
+            if code is None:
+                code = len(self._history_codes)
+                self._history_codes[key] = code
+                self._history_attendance.append(
+                    self.attendance.get(key[0], self.default_attendance)
+                )
+            codes[i] = code
+        return codes
+
+    @staticmethod
+    def _order_values(series):
+        if pd.api.types.is_numeric_dtype(series):
+            return series.to_numpy(dtype=np.float64, na_value=np.nan)
+        parsed = pd.to_datetime(series, errors='coerce')
+        return parsed.astype('int64').to_numpy(dtype=np.float64)
+
+    def add_chunk(self, chunk):
+        """Project a raw export chunk to compact arrays and window finished histories"""
+        cols = INGEST_CONFIG['marks_columns']
+        chunk = chunk.dropna(subset=[cols['student'], cols['subject'], cols['mark']])
+        if chunk.empty:
+            return
+
+        students = chunk[cols['student']].astype(str).to_numpy()
+        marks = chunk[cols['mark']].to_numpy(dtype=np.float64)
+        if cols.get('max_marks') in chunk.columns:
+            max_marks = chunk[cols['max_marks']].to_numpy(dtype=np.float64)
+            max_marks = np.where(np.isnan(max_marks) | (max_marks <= 0), 100.0, max_marks)
+            marks = marks / max_marks * 100
+        marks = np.clip(marks, 0, 100).astype(np.float32)
+
+        order = [self._order_values(chunk[c]) for c in cols['order'] if c in chunk.columns]
+        # Export row position is the final tie-breaker
+        order.append(np.arange(self._rows_seen, self._rows_seen + len(chunk), dtype=np.float64))
+        self._rows_seen += len(chunk)
+
+        codes = self._encode(students, chunk[cols['subject']].astype(str).to_numpy())
+        # Student ids are only needed to find the complete students of a presorted export
+        self._pending.append((codes, students if self.presorted else None, order, marks))
+        self._pending_rows += len(codes)
+
+        if self.presorted:
+            # Every student except the last one in this chunk is complete
+            last_student = students[-1]
+            self._flush(keep_student=last_student)
+        elif self._pending_rows > INGEST_CONFIG['spill_rows']:
+            self._spill()
+
+    def _take_pending(self):
+        codes = np.concatenate([p[0] for p in self._pending])
+        marks = np.concatenate([p[3] for p in self._pending])
+        order = [
+            np.concatenate([p[2][k] for p in self._pending])
+            for k in range(len(self._pending[0][2]))
+        ]
+        self._pending = []
+        self._pending_rows = 0
+        return codes, order, marks
+
+    def _spill(self):
+        """Append the buffered rows to per-partition files, split by history code"""
+        if not self._pending:
+            return
+        if self._spill_dir is None:
+            self._spill_dir = tempfile.mkdtemp(prefix='ingest_spill_')
+        codes, order, marks = self._take_pending()
+        partitions = codes % INGEST_CONFIG['spill_partitions']
+        for partition in np.unique(partitions):
+            rows = partitions == partition
+            path = os.path.join(self._spill_dir, f'part{partition}_{self._spills}.npz')
+            np.savez(path, codes=codes[rows], marks=marks[rows], order=np.stack([o[rows] for o in order]))
+        self._spills += 1
+
+    def _merge_spills(self):
+        """Sort and window each spilled partition, then remove the spill files"""
+        self._spill()
+        try:
+            for partition in range(INGEST_CONFIG['spill_partitions']):
+                parts = []
+                for spill in range(self._spills):
+                    path = os.path.join(self._spill_dir, f'part{partition}_{spill}.npz')
+                    if os.path.exists(path):
+                        with np.load(path) as part:
+                            parts.append((part['codes'], part['order'], part['marks']))
+                if not parts:
+                    continue
+                codes = np.concatenate([p[0] for p in parts])
+                order = np.concatenate([p[1] for p in parts], axis=1)
+                marks = np.concatenate([p[2] for p in parts])
+                sort_idx = np.lexsort(tuple(reversed(order)) + (codes,))
+                self._emit_windows(codes[sort_idx], marks[sort_idx])
+        finally:
+            shutil.rmtree(self._spill_dir, ignore_errors=True)
+            self._spill_dir, self._spills = None, 0
+
+    def _flush(self, keep_student=None):
+        if not self._pending:
+            return
+
+        if keep_student is not None:
+            students = np.concatenate([p[1] for p in self._pending])
+            codes, order, marks = self._take_pending()
+            carry = students == keep_student
+            self._pending = [(codes[carry], students[carry], [o[carry] for o in order], marks[carry])]
+            self._pending_rows = int(carry.sum())
+            done = ~carry
+            codes, marks = codes[done], marks[done]
+            order = [o[done] for o in order]
+        else:
+            codes, order, marks = self._take_pending()
+
+        if len(codes) == 0:
+            return
+
+        # np.lexsort sorts by the last key first: history code, then chronology
+        sort_idx = np.lexsort(tuple(reversed(order)) + (codes,))
+        self._emit_windows(codes[sort_idx], marks[sort_idx])
+
+    def _emit_windows(self, codes, marks):
+        self.n_histories += len(np.unique(codes))
+        if self.variable_length:
+            self._emit_variable_windows(codes, marks)
+            return
+        span = self.sequence_length + 1
+        if len(marks) < span:
+            return
+
+        window_marks = sliding_window_view(marks, span)
+        window_codes = sliding_window_view(codes, span)
+        valid = window_codes[:, 0] == window_codes[:, -1]
+        if not valid.any():
+            return
+
+        window_marks = window_marks[valid]
+        attendance = np.asarray(self._history_attendance, dtype=np.float32)[window_codes[valid, 0]]
+
+        X = np.empty((len(window_marks), self.sequence_length, 2), dtype=np.float32)
+        X[:, :, 0] = window_marks[:, :self.sequence_length]
+        X[:, :, 1] = attendance[:, None]
+        self._windows.append(X)
+        self._targets.append(window_marks[:, -1].astype(np.float32))
+
+    def _emit_variable_windows(self, codes, marks):
+        min_history = INFERENCE_CONFIG['min_history']
+        max_history = INFERENCE_CONFIG['max_history']
+        pad = INFERENCE_CONFIG['pad_value']
+
+        # Position of every mark within its (sorted, contiguous) history
+        starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+        history_start = np.repeat(starts, np.diff(np.r_[starts, len(codes)]))
+        targets = np.flatnonzero(np.arange(len(codes)) - history_start >= min_history)
+        if not len(targets):
+            return
+
+        # Up to max_history preceding marks of the same history, padded on the left
+        idx = targets[:, None] - max_history + np.arange(max_history)
+        valid = idx >= history_start[targets][:, None]
+        attendance = np.asarray(self._history_attendance, dtype=np.float32)[codes[targets]]
+
+        X = np.empty((len(targets), max_history, 2), dtype=np.float32)
+        X[:, :, 0] = np.where(valid, marks[np.maximum(idx, 0)], pad)
+        X[:, :, 1] = np.where(valid, attendance[:, None], pad)
+        self._windows.append(X)
+        self._targets.append(marks[targets].astype(np.float32))
+
+    def finish(self):
+        """Window all remaining histories and return (X, y)"""
+        if self._spill_dir is not None:
+            self._merge_spills()
+        else:
+            self._flush()
+        if not self._windows:
+            return (np.empty((0, self.window_length, 2), dtype=np.float32),
+                    np.empty((0,), dtype=np.float32))
+        X = np.concatenate(self._windows)
+        y = np.concatenate(self._targets)
+        self._windows, self._targets = [], []
+        return X, y
+
+
+def build_windowed_dataset(marks_path, attendance_path=None, sequence_length=None,
+                           use_cache=True, chunk_size=None, variable_length=False, presorted=None):
+    """
+    Build the LSTM/GB training dataset from real exports
+
+    Args:
+        marks_path: CSV/Parquet export of exam results (one row per student, subject, exam)
+        attendance_path: Optional CSV/Parquet export of daily attendance
+        sequence_length: Window length (defaults to MODEL_CONFIG['sequence_length'])
+        use_cache: Reuse a cached dataset built from identical source files
+        variable_length: Padded full-history windows for the masked LSTM
+        presorted: Export ordered by student (defaults to INGEST_CONFIG['presorted'])
+
+    Returns:
+        tuple: (X, y) with X shaped (n_windows, sequence_length, 2), or
+        (n_windows, max_history, 2) with variable_length
+    """
+    sequence_length = sequence_length or MODEL_CONFIG['sequence_length']
+    cache_key = file_hash(
+        [marks_path, attendance_path],
+        extra={
+            'sequence_length': sequence_length,
+            'marks_columns': INGEST_CONFIG['marks_columns'],
+            'attendance_columns': INGEST_CONFIG['attendance_columns'],
+            'default_attendance': INGEST_CONFIG['default_attendance'],
+            'variable_length': variable_length,
+            'windows': {key: INFERENCE_CONFIG[key] for key in ('min_history', 'max_history', 'pad_value')}
+        }
+    )
+    cache_path = os.path.join(INGEST_CONFIG['cache_dir'], f'windows_{cache_key[:16]}.npz')
+
+    if use_cache and os.path.exists(cache_path):
+        print(f"Using cached windowed dataset {cache_path}")
+        with np.load(cache_path) as cached:
+            return cached['X'], cached['y']
+
+    attendance = {}
+    if attendance_path:
+        print(f"Aggregating attendance from {attendance_path}...")
+        attendance = load_attendance(attendance_path, chunk_size)
+
+    print(f"Building mark histories from {marks_path}...")
+    builder = HistoryWindowBuilder(
+        sequence_length, attendance,
+        presorted=INGEST_CONFIG['presorted'] if presorted is None else presorted,
+        variable_length=variable_length
+    )
+    cols = INGEST_CONFIG['marks_columns']
+    wanted = [cols['student'], cols['subject'], cols['mark'], cols.get('max_marks')] + list(cols['order'])
+    for chunk in iter_chunks(marks_path, [c for c in wanted if c], chunk_size):
+        builder.add_chunk(chunk)
+    X, y = builder.finish()
+    print(f"Built {len(X)} windows from {builder.n_histories} student-subject histories")
+
+    if use_cache:
+        os.makedirs(INGEST_CONFIG['cache_dir'], exist_ok=True)
+        tmp_path = cache_path + '.tmp.npz'
+        np.savez(tmp_path, X=X, y=y)
+        os.replace(tmp_path, cache_path)
+
+    return X, y
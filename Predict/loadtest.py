@@ -0,0 +1,416 @@
+"""
+Load Test Harness for the O/L Grade Prediction API
+Replays a mix of dashboard requests (shaped like src/lib/mlPredictionService.ts)
+at a fixed arrival rate or fixed concurrency and reports throughput, error
+rate and latency percentiles over time. Can step the rate up automatically
+to find the saturation point of a locally started server. Request bodies
+are made unique so the API's response cache does not answer them, except
+for a configurable share of repeats (cache_hit_ratio); the X-Cache hit rate
+is reported next to throughput.
+"""
+
+import argparse
+import http.client
+import itertools
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+import numpy as np
+
+from config import LOADTEST_CONFIG, OL_SUBJECTS
+
+ENDPOINTS = {
+    'student': '/api/predict/student',
+    'class': '/api/predict/class',
+    'subject': '/api/predict/subject',
+    'bulk': '/api/predict/bulk'
+}
+
+# X-Cache values of responses served without running inference
+CACHE_HITS = ('HIT', 'SHARED_HIT')
+
+
+class PayloadFactory:
+    """Builds realistic request bodies matching the Next.js prediction service"""
+
+    def __init__(self, config=LOADTEST_CONFIG):
+        self.config = config
+        self.rng = np.random.default_rng(config['seed'])
+        self._student_counter = 0
+
+    def _marks(self):
+        # Term tests so far: between 1 and 4 years of 3 terms
+        n_exams = int(self.rng.integers(3, 13))
+        ability = float(np.clip(self.rng.normal(60, 18), 5, 98))
+        trend = float(self.rng.normal(0, 1.5))
+        marks = ability + trend * np.arange(n_exams) + self.rng.normal(0, 6, n_exams)
+        return [int(m) for m in np.clip(marks, 0, 100).round()]
+
+    def student(self):
+        self._student_counter += 1
+        n_subjects = int(self.rng.integers(6, len(OL_SUBJECTS) + 1))
+        subjects = self.rng.choice(OL_SUBJECTS, size=n_subjects, replace=False)
+        return {
+            'student_id': f"S{self._student_counter:05d}",
+            'name': f"Student {self._student_counter}",
+            'subjects': [{'name': str(name), 'marks': self._marks()} for name in subjects],
+            'attendance': round(float(self.rng.beta(8, 2) * 100), 1)
+        }
+
+    def build(self, kind):
+        size = self.config['class_size']
+        if kind == 'student':
+            student = self.student()
+            return {'subjects': student['subjects'], 'attendance': student['attendance']}
+        if kind == 'class':
+            return {'students': [self.student() for _ in range(size)]}
+        if kind == 'subject':
+            return {
+                'subject_name': str(self.rng.choice(OL_SUBJECTS)),
+                'students': [
+                    {
+                        'student_id': s['student_id'],
+                        'name': s['name'],
+                        'marks': self._marks(),
+                        'attendance': s['attendance']
+                    }
+                    for s in (self.student() for _ in range(size))
+                ]
+            }
+        if kind == 'bulk':
+            return {
+                'classes': [
+                    {
+                        'class_id': f"C{c:03d}",
+                        'class_name': f"Grade 11-{chr(ord('A') + c)}",
+                        'students': [self.student() for _ in range(size)]
+                    }
+                    for c in range(self.config['classes_per_bulk'])
+                ]
+            }
+        raise ValueError(f"Unknown request kind: {kind}")
+
+    def pool(self):
+        """Pre-serialize a pool of bodies per endpoint so encoding cost is not measured"""
+        n = self.config['payload_pool']
+        return {
+            kind: [json.dumps(self.build(kind)).encode('utf-8') for _ in range(n)]
+            for kind in ENDPOINTS
+        }
+
+
+class LoadGenerator:
+    """Sends requests with one keep-alive connection per worker thread"""
+
+    def __init__(self, base_url=None, config=LOADTEST_CONFIG):
+        self.config = config
+        url = urlparse(base_url or config['base_url'])
+        self.host, self.port = url.hostname, url.port or 80
+        self.bodies = PayloadFactory(config).pool()
+        kinds = list(config['mix'])
+        weights = np.array([config['mix'][k] for k in kinds], dtype=float)
+        self.kinds = kinds
+        self.weights = weights / weights.sum()
+        self.rng = np.random.default_rng(config['seed'] + 1)
+        self._nonces = itertools.count()
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = http.client.HTTPConnection(self.host, self.port, timeout=self.config['timeout'])
+            self._local.conn = conn
+        return conn
+
+    def _next_request(self):
+        """
+        Next (kind, body): a pooled body as-is for a cache_hit_ratio share of
+        requests, otherwise one made unique by a nonce field, so it measures
+        inference rather than the response cache
+        """
+        kind = self.kinds[self.rng.choice(len(self.kinds), p=self.weights)]
+        bodies = self.bodies[kind]
+        body = bodies[int(self.rng.integers(len(bodies)))]
+        if self.rng.random() >= self.config['cache_hit_ratio']:
+            body = body[:-1] + b', "load_test_nonce": %d}' % next(self._nonces)
+        return kind, body
+
+    def send(self, kind, body, scheduled):
+        """Send one request; latency counts from the scheduled send time"""
+        status, error, cache = 0, None, None
+        try:
+            conn = self._connection()
+            conn.request('POST', ENDPOINTS[kind], body=body,
+                         headers={'Content-Type': 'application/json'})
+            response = conn.getresponse()
+            response.read()
+            status = response.status
+            cache = response.getheader('X-Cache')
+        except Exception as e:
+            error = type(e).__name__
+            self._local.conn = None
+        finished = time.perf_counter()
+        return {
+            'kind': kind,
+            'scheduled': scheduled,
+            'finished': finished,
+            'latency': finished - scheduled,
+            'status': status,
+            'ok': error is None and 200 <= status < 400,
+            'error': error,
+            'cache': cache
+        }
+
+    def run_open(self, rate, duration, max_in_flight=256):
+        """
+        Open-loop run: requests arrive as a Poisson process at `rate` per second
+        regardless of how fast the server answers (no coordinated omission).
+        """
+        results = []
+        lock = threading.Lock()
+
+        def task(kind, body, scheduled):
+            result = self.send(kind, body, scheduled)
+            with lock:
+                results.append(result)
+
+        start = time.perf_counter()
+        next_time = start
+        with ThreadPoolExecutor(max_workers=max_in_flight) as pool:
+            while True:
+                next_time += self.rng.exponential(1.0 / rate)
+                if next_time - start >= duration:
+                    break
+                delay = next_time - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                kind, body = self._next_request()
+                pool.submit(task, kind, body, next_time)
+        return start, results
+
+    def run_closed(self, concurrency, duration):
+        """Closed-loop run: `concurrency` virtual users each send back-to-back"""
+        results = []
+        lock = threading.Lock()
+        start = time.perf_counter()
+        deadline = start + duration
+
+        def user():
+            while time.perf_counter() < deadline:
+                with lock:
+                    kind, body = self._next_request()
+                result = self.send(kind, body, time.perf_counter())
+                with lock:
+                    results.append(result)
+
+        threads = [threading.Thread(target=user, daemon=True) for _ in range(concurrency)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return start, results
+
+
+def elapsed(start, results, duration):
+    """Run time including requests still draining after the last arrival"""
+    if not results:
+        return duration
+    return max(duration, max(r['finished'] for r in results) - start)
+
+
+def summarize(results, duration):
+    """Throughput, error rate and latency percentiles for a set of results"""
+    if not results:
+        return {'requests': 0, 'throughput': 0.0, 'error_rate': 0.0, 'cache_hit_rate': 0.0,
+                'p50_ms': None, 'p95_ms': None, 'p99_ms': None, 'max_ms': None}
+    latencies = np.array([r['latency'] for r in results]) * 1000
+    ok = sum(1 for r in results if r['ok'])
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    return {
+        'requests': len(results),
+        'throughput': ok / duration,
+        'error_rate': 1 - ok / len(results),
+        # Share answered from the API's response caches, not by the models
+        'cache_hit_rate': sum(1 for r in results if r.get('cache') in CACHE_HITS) / len(results),
+        'p50_ms': float(p50),
+        'p95_ms': float(p95),
+        'p99_ms': float(p99),
+        'max_ms': float(latencies.max())
+    }
+
+
+def time_series(start, results, interval):
+    """Bucket results by completion time into fixed reporting intervals"""
+    if not results:
+        return []
+    end = max(r['finished'] for r in results)
+    n_buckets = int((end - start) // interval) + 1
+    buckets = [[] for _ in range(n_buckets)]
+    for r in results:
+        buckets[int((r['finished'] - start) // interval)].append(r)
+    return [
+        {'t': i * interval, **summarize(bucket, interval)}
+        for i, bucket in enumerate(buckets)
+    ]
+
+
+def by_endpoint(results, duration):
+    return {
+        kind: summarize([r for r in results if r['kind'] == kind], duration)
+        for kind in ENDPOINTS
+    }
+
+
+def print_report(title, series, summary, per_endpoint):
+    print("\n" + "="*80)
+    print(title)
+    print("="*80)
+    print(f"{'t(s)':>6} {'req':>6} {'ok/s':>8} {'hit%':>6} {'err%':>6} {'p50ms':>8} {'p95ms':>8} {'p99ms':>8}")
+    for row in series:
+        if row['requests'] == 0:
+            print(f"{row['t']:>6.0f} {0:>6}")
+            continue
+        print(f"{row['t']:>6.0f} {row['requests']:>6} {row['throughput']:>8.2f} "
+              f"{row['cache_hit_rate'] * 100:>6.1f} {row['error_rate'] * 100:>6.1f} {row['p50_ms']:>8.0f} {row['p95_ms']:>8.0f} {row['p99_ms']:>8.0f}")
+    print("-"*80)
+    for kind, stats in per_endpoint.items():
+        if stats['requests']:
+            print(f"{kind:>8}: {stats['requests']:>5} req  err {stats['error_rate'] * 100:.1f}%  "
+                  f"p50 {stats['p50_ms']:.0f}ms  p95 {stats['p95_ms']:.0f}ms  p99 {stats['p99_ms']:.0f}ms")
+    print(f"   TOTAL: {summary['throughput']:.2f} ok/s  cache hits {summary['cache_hit_rate'] * 100:.1f}%  err {summary['error_rate'] * 100:.1f}%  "
+          f"p95 {summary['p95_ms'] or 0:.0f}ms  p99 {summary['p99_ms'] or 0:.0f}ms")
+
+
+def is_saturated(summary, offered_rate, config=LOADTEST_CONFIG):
+    """A step is saturated when errors, tail latency or throughput break the limits"""
+    if summary['requests'] == 0:
+        return True
+    return (
+        summary['error_rate'] > config['max_error_rate']
+        or summary['p95_ms'] > config['latency_slo_ms']
+        or summary['throughput'] < offered_rate * config['min_throughput_ratio']
+    )
+
+
+def find_saturation(generator, config=LOADTEST_CONFIG):
+    """
+    Step the arrival rate up geometrically until a step saturates, then
+    bisect between the last good and first bad rate.
+
+    Returns:
+        dict: Maximum sustainable rate and the per-step summaries
+    """
+    steps = []
+    rate = config['start_rate']
+    good, bad = None, None
+
+    def run_step(rate):
+        start, results = generator.run_open(rate, config['step_duration'])
+        summary = summarize(results, elapsed(start, results, config['step_duration']))
+        saturated = is_saturated(summary, rate, config)
+        steps.append({'rate': rate, 'saturated': saturated, **summary})
+        print(f"rate {rate:7.2f}/s -> {summary['throughput']:7.2f} ok/s  "
+              f"hits {summary['cache_hit_rate'] * 100:5.1f}%  err {summary['error_rate'] * 100:5.1f}%  p95 {summary['p95_ms'] or 0:8.0f}ms"
+              f"  {'SATURATED' if saturated else 'ok'}")
+        return saturated
+
+    while bad is None:
+        if run_step(rate):
+            bad = rate
+        else:
+            good = rate
+            rate *= config['rate_growth']
+
+    # Bisect between the last good rate and the first saturated one
+    low = good or 0.0
+    for _ in range(3):
+        mid = (low + bad) / 2
+        if mid <= 0 or bad - low < 0.1:
+            break
+        if run_step(mid):
+            bad = mid
+        else:
+            low = good = mid
+
+    return {'max_sustainable_rate': good, 'first_saturated_rate': bad, 'steps': steps}
+
+
+def wait_for_server(base_url, timeout=120):
+    url = urlparse(base_url)
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection(url.hostname, url.port, timeout=2)
+            conn.request('GET', '/health')
+            health = json.loads(conn.getresponse().read())
+            if health.get('model_loaded'):
+                return True
+        except (OSError, ValueError):
+            pass
+        time.sleep(1)
+    return False
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Load test the O/L Grade Prediction API")
+    parser.add_argument('--url', default=LOADTEST_CONFIG['base_url'])
+    parser.add_argument('--rate', type=float, help="Open-loop arrival rate (requests/second)")
+    parser.add_argument('--concurrency', type=int, help="Closed-loop virtual users")
+    parser.add_argument('--duration', type=float, default=60, help="Seconds per run")
+    parser.add_argument('--cache-hit-ratio', type=float, default=LOADTEST_CONFIG['cache_hit_ratio'],
+                        help="Share of requests repeating a pooled body (answered from the response cache)")
+    parser.add_argument('--find-saturation', action='store_true',
+                        help="Step the rate up until the server saturates")
+    parser.add_argument('--spawn', action='store_true',
+                        help="Start start_server.py locally for the duration of the test")
+    parser.add_argument('--out', help="Write the full report as JSON")
+    args = parser.parse_args()
+
+    server = None
+    if args.spawn:
+        server = subprocess.Popen(
+            [sys.executable, 'start_server.py'],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL
+        )
+
+    try:
+        if not wait_for_server(args.url):
+            print(f"❌ Server at {args.url} is not up with models loaded")
+            sys.exit(1)
+
+        generator = LoadGenerator(args.url, {**LOADTEST_CONFIG, 'cache_hit_ratio': args.cache_hit_ratio})
+        report = {'url': args.url}
+
+        if args.find_saturation:
+            report['saturation'] = find_saturation(generator)
+            print(f"\nMax sustainable rate: {report['saturation']['max_sustainable_rate']} req/s")
+        else:
+            if args.concurrency:
+                title = f"Closed loop: {args.concurrency} concurrent users for {args.duration:.0f}s"
+                start, results = generator.run_closed(args.concurrency, args.duration)
+            else:
+                rate = args.rate or LOADTEST_CONFIG['start_rate']
+                title = f"Open loop: {rate:.2f} req/s for {args.duration:.0f}s"
+                start, results = generator.run_open(rate, args.duration)
+
+            run_time = elapsed(start, results, args.duration)
+            report['summary'] = summarize(results, run_time)
+            report['endpoints'] = by_endpoint(results, run_time)
+            report['series'] = time_series(start, results, LOADTEST_CONFIG['report_interval'])
+            print_report(title, report['series'], report['summary'], report['endpoints'])
+
+        if args.out:
+            with open(args.out, 'w') as f:
+                json.dump(report, f, indent=2)
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
@@ -0,0 +1,194 @@
+"""
+Model Registry for Multi-model Serving
+Routes each prediction to the most specific registered model set (per
+school, grade and/or subject), loading model sets on first use into a
+memory-bounded LRU next to the always-loaded default models
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from config import MODEL_REGISTRY_CONFIG
+from single_flight import SingleFlight
+from train_model import OLGradePredictor
+from training_cache import digest
+
+DEFAULT_MODEL = 'default'
+
+
+def variant_name(**keys):
+    """Directory name of a model set, e.g. variant_name(school='S01', subject='ICT')"""
+    return ','.join(f'{key}={value}' for key, value in keys.items())
+
+
+def _artifact_bytes(path):
+    return sum(entry.stat().st_size for entry in os.scandir(path) if entry.is_file())
+
+
+class ModelRegistry:
+    """
+    Thread-safe registry of model sets
+
+    Only the names and artifact stamps of registered model sets are kept
+    until one is used, so memory depends on the LRU limits, not on how
+    many variants exist on disk.
+    """
+
+    def __init__(self, default, config=MODEL_REGISTRY_CONFIG):
+        self.default = default
+        self.config = config
+        self._variants = {}
+        self._loaded = OrderedDict()
+        self._bytes = 0
+        self._loading = SingleFlight()
+        self._lock = threading.Lock()
+        self.stats = {}
+        self.refresh()
+
+    def refresh(self):
+        """Rescan variants_dir; loaded model sets whose artifacts changed are dropped"""
+        variants = {}
+        variants_dir = self.config['variants_dir']
+        if os.path.isdir(variants_dir):
+            for entry in os.scandir(variants_dir):
+                if entry.is_dir() and any(
+                    os.path.exists(os.path.join(entry.path, name))
+                    for name in ('lstm_model.keras', 'lstm_model.h5')
+                ):
+                    variants[entry.name] = OLGradePredictor._artifact_digest(entry.path)
+        with self._lock:
+            self._variants = variants
+            for name, (_, _, stamp) in list(self._loaded.items()):
+                if variants.get(name) != stamp:
+                    self._evict(name)
+            self._variants_version = digest(sorted(variants.items()))
+        return sorted(variants)
+
+    @property
+    def model_version(self):
+        """Identity of everything that can serve a prediction"""
+        return digest([self.default.model_version, self._variants_version])
+
+    def resolve(self, subject=None, grade=None, school=None):
+        """Name of the most specific registered model set for a prediction"""
+        values = {'subject': subject, 'grade': grade, 'school': school}
+        for keys in self.config['resolution']:
+            if all(values[key] not in (None, '') for key in keys):
+                name = variant_name(**{key: values[key] for key in keys})
+                if name in self._variants:
+                    return name
+        return DEFAULT_MODEL
+
+    def get(self, name):
+        """Predictor for a model set, loading it on first use"""
+        if name == DEFAULT_MODEL:
+            return self.default
+        with self._lock:
+            stats = self._stats(name)
+            if name in self._loaded:
+                self._loaded.move_to_end(name)
+                stats['hits'] += 1
+                return self._loaded[name][0]
+            stats['misses'] += 1
+        predictor, _ = self._loading.do(name, lambda: self._load(name))
+        return predictor
+
+    def _load(self, name):
+        path = os.path.join(self.config['variants_dir'], name)
+        start = time.perf_counter()
+        predictor = OLGradePredictor()
+        if name not in self._variants or not predictor.load_models(path):
+            print(f"Model set '{name}' could not be loaded, using the default models")
+            with self._lock:
+                self._stats(name)['failures'] += 1
+            return self.default
+
+        size = _artifact_bytes(path)
+        stamp = OLGradePredictor._artifact_digest(path)
+        with self._lock:
+            stats = self._stats(name)
+            stats['loads'] += 1
+            stats['load_seconds'] += time.perf_counter() - start
+            self._loaded[name] = (predictor, size, stamp)
+            self._bytes += size
+            # Keep the newest model set even if it alone exceeds the byte budget
+            while len(self._loaded) > 1 and (
+                len(self._loaded) > self.config['max_loaded'] or self._bytes > self.config['max_loaded_bytes']
+            ):
+                self._evict(next(iter(self._loaded)))
+        print(f"Loaded model set '{name}' ({size / 1e6:.1f} MB) in {time.perf_counter() - start:.2f}s")
+        return predictor
+
+    def _evict(self, name):
+        _, size, _ = self._loaded.pop(name)
+        self._bytes -= size
+        self._stats(name)['evictions'] += 1
+
+    def _stats(self, name):
+        if name not in self.stats:
+            self.stats[name] = {'loads': 0, 'hits': 0, 'misses': 0, 'evictions': 0, 'failures': 0,
+                                'load_seconds': 0.0, 'predictions': 0}
+        return self.stats[name]
+
+    def preload(self, names=None):
+        """Load model sets ahead of traffic (default MODEL_REGISTRY_CONFIG['preload'])"""
+        names = self.config['preload'] if names is None else names
+        return [name for name in names if self.get(name) is not self.default]
+
+    def predict_batch(self, items, names, tier='ensemble', uncertainty=None, explain=None):
+        """
+        predict_batch over several model sets: one batch per model set
+
+        Args:
+            items: (marks_history, attendance_percentage) pairs
+            names: Model set name per item (see resolve)
+
+        Returns:
+            list: Results in item order, each with the 'model' that served it
+        """
+        groups = OrderedDict()
+        for i, name in enumerate(names):
+            groups.setdefault(name, []).append(i)
+
+        results = [None] * len(items)
+        for name, indices in groups.items():
+            predictor = self.get(name)
+            preds = predictor.predict_batch([items[i] for i in indices], tier=tier,
+                                            uncertainty=uncertainty, explain=explain)
+            served_by = name if predictor is not self.default else DEFAULT_MODEL
+            for i, pred in zip(indices, preds):
+                pred['model'] = served_by
+                results[i] = pred
+            with self._lock:
+                self._stats(served_by)['predictions'] += len(indices)
+        return results
+
+    def predict_students(self, students, grade=None, school=None, tier='ensemble', uncertainty=None,
+                         explain=None):
+        """
+        OLGradePredictor.predict_students with each subject routed to its model set
+
+        Args:
+            students: List of student_data dicts; a student's own 'grade' /
+                'school_id' override the request-level grade and school
+        """
+        items, owners = self.default.student_items(students)
+        names = [
+            self.resolve(subject['name'], students[s].get('grade', grade), students[s].get('school_id', school))
+            for s, subject in owners
+        ]
+        preds = self.predict_batch(items, names, tier=tier, uncertainty=uncertainty, explain=explain)
+        return self.default.summarize_students(students, owners, preds)
+
+    def info(self):
+        with self._lock:
+            return {
+                'registered': len(self._variants),
+                'loaded': list(self._loaded),
+                'loaded_bytes': self._bytes,
+                'max_loaded': self.config['max_loaded'],
+                'max_loaded_bytes': self.config['max_loaded_bytes'],
+                'models': {name: dict(stats) for name, stats in self.stats.items()}
+            }
@@ -4,9 +4,11 @@ Can be called from Node.js via child_process
 """
 import sys
 import json
-from train_model import OLGradePredictor
 import os
 
+from response_cache import canonical_json, content_hash
+from shared_cache import SharedCache, serving_version, stored_model_version
+
 # Suppress TensorFlow warnings
 os.environ['TF_CPP_MIN_LOG_LEVEL'] = '3'
 
@@ -15,6 +17,18 @@ def main():
         # Read input from stdin
         input_data = json.loads(sys.stdin.read())
         
+        # Repeat inputs are answered from the shared cache without loading
+        # TensorFlow or the models
+        cache = SharedCache()
+        key = content_hash('predict_standalone', stored_model_version(), serving_version(),
+                           canonical_json(input_data))
+        body = cache.get(key)
+        if body is not None:
+            print(body.decode('utf-8'))
+            return
+        
+        from train_model import OLGradePredictor
+        
         # Initialize predictor
         predictor = OLGradePredictor()
         
@@ -27,10 +41,12 @@ def main():
         result = predictor.predict_all_subjects(input_data)
         
         # Output result as JSON
-        print(json.dumps({
+        body = json.dumps({
             'success': True,
             'data': result
-        }))
+        })
+        cache.put(key, body)
+        print(body)
         
     except Exception as e:
         print(json.dumps({
@@ -0,0 +1,145 @@
+"""
+Percentile Ranking Index
+Keeps every predicted student's overall average and subject marks in
+sorted arrays per class and per school, updated as predictions are served,
+so rank and percentile queries are binary searches instead of predicting
+and sorting a whole school per request
+"""
+
+import threading
+from bisect import bisect_left, bisect_right, insort
+
+DEFAULT_SCHOOL = 'school'
+OVERALL = 'overall'
+
+
+def prediction_values(prediction):
+    """Rankable values of a predict_students result: overall average and each subject mark"""
+    values = {OVERALL: float(prediction['overall_average'])}
+    for subject in prediction.get('subject_predictions', []):
+        values[subject['subject']] = float(subject['predicted_mark'])
+    return values
+
+
+def _position(sorted_values, value):
+    """Rank (1 = highest), size and percentile of value within an ascending array"""
+    n = len(sorted_values)
+    below = bisect_left(sorted_values, value)
+    not_above = bisect_right(sorted_values, value)
+    return {
+        'rank': n - not_above + 1,
+        'of': n,
+        # Ties count half, so equal values share a percentile
+        'percentile': round(100.0 * (below + 0.5 * (not_above - below)) / n, 2) if n else None,
+        'value': value
+    }
+
+
+class RankingIndex:
+    """
+    Thread-safe sorted arrays per (scope, metric)
+
+    Scopes are ('school', school) and ('class', school, class); students
+    without a class are only ranked in their school. Metrics are OVERALL
+    and subject names. Queries are O(log n); updating one
+    student replaces their old values with a binary search and an array
+    insert per scope and metric.
+    """
+
+    def __init__(self):
+        self._sorted = {}
+        self._students = {}
+        self._lock = threading.Lock()
+        self.stats = {'updates': 0, 'queries': 0}
+
+    @staticmethod
+    def _scopes(school, class_key):
+        scopes = {'school': ('school', school)}
+        if class_key is not None:
+            scopes['class'] = ('class', school, class_key)
+        return scopes
+
+    def _remove(self, student_id):
+        entry = self._students.pop(student_id, None)
+        if entry is None:
+            return
+        for scope in self._scopes(entry['school'], entry['class']).values():
+            for metric, value in entry['values'].items():
+                values = self._sorted[(scope, metric)]
+                del values[bisect_left(values, value)]
+                if not values:
+                    del self._sorted[(scope, metric)]
+
+    def update(self, student_id, values, class_key, school=None):
+        """
+        Set a student's current values, replacing earlier ones (also after a class change)
+
+        Args:
+            student_id: Student identifier; students without one are not ranked
+            values: {metric: value}, see prediction_values
+            class_key: Class the student is ranked in, None for school rankings only
+            school: School the class belongs to (default DEFAULT_SCHOOL)
+        """
+        if student_id is None:
+            return
+        student_id = str(student_id)
+        class_key = str(class_key) if class_key is not None else None
+        school = str(school) if school is not None else DEFAULT_SCHOOL
+        with self._lock:
+            self._remove(student_id)
+            for scope in self._scopes(school, class_key).values():
+                for metric, value in values.items():
+                    insort(self._sorted.setdefault((scope, metric), []), value)
+            self._students[student_id] = {'school': school, 'class': class_key, 'values': dict(values)}
+            self.stats['updates'] += 1
+
+    def remove(self, student_id):
+        with self._lock:
+            self._remove(str(student_id))
+
+    def rank(self, student_id, metric=None):
+        """
+        Class and school position of a student
+
+        Args:
+            metric: OVERALL or a subject name; default every indexed metric
+
+        Returns:
+            dict: {'class_id', 'school_id', 'rankings': {metric: {'class': {...}, 'school': {...}}}},
+            'class' None for students without a class, or None if the student has not been predicted
+        """
+        with self._lock:
+            self.stats['queries'] += 1
+            entry = self._students.get(str(student_id))
+            if entry is None:
+                return None
+            metrics = [metric] if metric is not None else list(entry['values'])
+            scopes = self._scopes(entry['school'], entry['class'])
+            rankings = {
+                name: {level: _position(self._sorted[(scopes[level], name)], entry['values'][name])
+                       if level in scopes else None for level in ('class', 'school')}
+                for name in metrics if name in entry['values']
+            }
+        return {'class_id': entry['class'], 'school_id': entry['school'], 'rankings': rankings}
+
+    def position_of(self, value, metric=OVERALL, class_key=None, school=None):
+        """Where a (hypothetical) value would rank among the indexed students of a class or school"""
+        school = str(school) if school is not None else DEFAULT_SCHOOL
+        scope = self._scopes(school, str(class_key))['class' if class_key is not None else 'school']
+        with self._lock:
+            self.stats['queries'] += 1
+            return _position(self._sorted.get((scope, metric), []), float(value))
+
+    def clear(self):
+        with self._lock:
+            self._sorted.clear()
+            self._students.clear()
+
+    def info(self):
+        with self._lock:
+            return {
+                'students': len(self._students),
+                'arrays': len(self._sorted),
+                'indexed_values': sum(len(values) for values in self._sorted.values()),
+                **self.stats
+            }
@@ -0,0 +1,103 @@
+"""
+Response Cache for Prediction Endpoints
+Content-hash ETags over (endpoint, canonical request body, model version)
+and a bounded LRU of serialized response bodies keyed by that hash
+"""
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+from config import RESPONSE_CACHE_CONFIG
+
+
+def canonical_json(data):
+    """Key-order and whitespace independent serialization of a request body"""
+    return json.dumps(data, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+
+
+def content_hash(*parts):
+    """Fast 128-bit hash of the given str/bytes parts"""
+    h = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        h.update(part if isinstance(part, bytes) else str(part).encode('utf-8'))
+        h.update(b'\x00')
+    return h.hexdigest()
+
+
+class ResponseCache:
+    """
+    Thread-safe LRU of serialized response bodies bounded by entry count
+    and total bytes.
+
+    Raw request bytes are also mapped to their canonical key, so a byte-for-byte
+    repeat of a request is recognised without re-parsing or re-serializing it.
+    """
+
+    def __init__(self, max_entries=None, max_bytes=None):
+        self.max_entries = max_entries or RESPONSE_CACHE_CONFIG['max_entries']
+        self.max_bytes = max_bytes or RESPONSE_CACHE_CONFIG['max_bytes']
+        self._bodies = OrderedDict()
+        self._raw_keys = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'not_modified': 0, 'evictions': 0}
+
+    def raw_key(self, raw_key):
+        """Canonical key previously seen for these exact request bytes"""
+        with self._lock:
+            key = self._raw_keys.get(raw_key)
+            if key is not None:
+                self._raw_keys.move_to_end(raw_key)
+            return key
+
+    def remember_raw(self, raw_key, key):
+        with self._lock:
+            self._raw_keys[raw_key] = key
+            self._raw_keys.move_to_end(raw_key)
+            while len(self._raw_keys) > self.max_entries * 2:
+                self._raw_keys.popitem(last=False)
+
+    def get(self, key):
+        with self._lock:
+            body = self._bodies.get(key)
+            if body is None:
+                self.stats['misses'] += 1
+                return None
+            self._bodies.move_to_end(key)
+            self.stats['hits'] += 1
+            return body
+
+    def peek(self, key):
+        """Cached body without counting a hit or refreshing its recency"""
+        with self._lock:
+            return self._bodies.get(key)
+
+    def put(self, key, body):
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._bodies.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old)
+            self._bodies[key] = body
+            self._bytes += len(body)
+            while len(self._bodies) > self.max_entries or self._bytes > self.max_bytes:
+                _, evicted = self._bodies.popitem(last=False)
+                self._bytes -= len(evicted)
+                self.stats['evictions'] += 1
+
+    def record_not_modified(self):
+        with self._lock:
+            self.stats['not_modified'] += 1
+
+    def clear(self):
+        with self._lock:
+            self._bodies.clear()
+            self._raw_keys.clear()
+            self._bytes = 0
+
+    def info(self):
+        with self._lock:
+            return {**self.stats, 'entries': len(self._bodies), 'bytes': self._bytes}
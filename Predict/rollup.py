@@ -0,0 +1,196 @@
+"""
+Hierarchical Rollup Engine for O/L Grade Predictions
+Computes school, class, subject and class x subject aggregates (risk counts,
+averages, grade distributions, pass rates) from the flat list of
+per-(student, subject) predictions in one vectorized pass of grouped
+reductions over integer-coded keys
+"""
+
+import numpy as np
+
+from config import GRADE_BOUNDARIES, RISK_THRESHOLDS
+
+GRADES = ['A', 'B', 'C', 'S', 'W']
+RISK_LEVELS = ['HIGH', 'MEDIUM', 'LOW']
+
+# Ascending lower bounds for searchsorted: W, S, C, B, A
+_GRADE_BOUNDS = np.array([GRADE_BOUNDARIES[g] for g in reversed(GRADES)], dtype=np.float64)
+
+
+def grade_codes(marks):
+    """Vectorized mark_to_grade, as indices into GRADES"""
+    return len(GRADES) - np.searchsorted(_GRADE_BOUNDS, marks, side='right')
+
+
+def risk_codes(averages):
+    """Vectorized risk level of predicted averages, as indices into RISK_LEVELS"""
+    return np.where(averages < RISK_THRESHOLDS['HIGH'], 0,
+                    np.where(averages < RISK_THRESHOLDS['MEDIUM'], 1, 2))
+
+
+def student_surfaces(n_students, blocks, marks):
+    """
+    Per-student subject, overall average and risk results of prediction
+    surfaces (forecast trajectories, scenario grids)
+
+    Args:
+        n_students: Number of students
+        blocks: (student index, subject name) of each surface
+        marks: Predicted marks, shape (len(blocks), *surface shape)
+
+    Returns:
+        tuple: (results, one {'subjects', 'overall_average', 'risk_level'} dict
+        per student; averages, shape (n_students, *surface shape)), where a
+        student without subjects averages 0
+    """
+    shape = marks.shape[1:]
+    grades = np.array(GRADES)[grade_codes(marks)]
+    sums = np.zeros((n_students,) + shape)
+    counts = np.zeros(n_students)
+    if blocks:
+        owners = np.array([s for s, _ in blocks])
+        np.add.at(sums, owners, marks)
+        counts = np.bincount(owners, minlength=n_students)
+    counts = counts.reshape((n_students,) + (1,) * len(shape))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        averages = np.where(counts > 0, sums / counts, 0.0)
+    risks = np.array(RISK_LEVELS)[risk_codes(averages)]
+
+    results = [{'subjects': {}} for _ in range(n_students)]
+    for b, (s, name) in enumerate(blocks):
+        results[s]['subjects'][name] = {
+            'predicted_mark': marks[b].tolist(),
+            'predicted_grade': grades[b].tolist()
+        }
+    for s, result in enumerate(results):
+        result['overall_average'] = averages[s].tolist()
+        result['risk_level'] = risks[s].tolist()
+    return results, averages
+
+
+def _encode(keys):
+    uniques, codes = np.unique(np.asarray(keys, dtype=object).astype(str), return_inverse=True)
+    return uniques, codes
+
+
+def _mark_stats(codes, n_groups, marks, grades):
+    """Count, mean mark, grade distribution and pass rate per group"""
+    counts = np.bincount(codes, minlength=n_groups)
+    sums = np.bincount(codes, weights=marks, minlength=n_groups)
+    dist = np.bincount(codes * len(GRADES) + grades, minlength=n_groups * len(GRADES))
+    dist = dist.reshape(n_groups, len(GRADES))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = np.where(counts > 0, sums / counts, 0.0)
+        pass_rates = np.where(counts > 0, (counts - dist[:, -1]) / counts * 100, 0.0)
+    return counts, means, dist, pass_rates
+
+
+def _mark_summary(count, mean, dist, pass_rate):
+    return {
+        'total_predictions': int(count),
+        'average_predicted': float(mean),
+        'grade_distribution': {g: int(n) for g, n in zip(GRADES, dist)},
+        'pass_rate': float(pass_rate)
+    }
+
+
+def _student_summary(n_students, average, risk):
+    return {
+        'total_students': int(n_students),
+        'average': float(average),
+        'high_risk_count': int(risk[0]),
+        'medium_risk_count': int(risk[1]),
+        'low_risk_count': int(risk[2]),
+        'high_risk_percentage': float(risk[0] / n_students * 100) if n_students else 0.0
+    }
+
+
+def rollup(student_classes, row_students, row_subjects, row_marks):
+    """
+    Aggregate predictions at school, class, subject and class x subject level
+
+    Args:
+        student_classes: Class key of each student (students without any
+            predicted subject count as average 0, like predict_all_subjects)
+        row_students: Student index (into student_classes) of each prediction row
+        row_subjects: Subject name of each prediction row
+        row_marks: Predicted mark of each prediction row
+
+    Returns:
+        dict: {'school': {...}, 'classes': {class: {..., 'subjects': {...}}},
+               'subjects': {subject: {...}}}
+    """
+    class_keys, student_class = _encode(student_classes)
+    n_students, n_classes = len(student_class), len(class_keys)
+    row_students = np.asarray(row_students, dtype=np.int64)
+    row_marks = np.asarray(row_marks, dtype=np.float64)
+    subject_keys, row_subject = _encode(row_subjects) if len(row_marks) else (np.array([]), np.zeros(0, int))
+    n_subjects = len(subject_keys)
+
+    # Student level: overall predicted average and risk
+    student_counts = np.bincount(row_students, minlength=n_students)
+    student_sums = np.bincount(row_students, weights=row_marks, minlength=n_students)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        student_avg = np.where(student_counts > 0, student_sums / student_counts, 0.0)
+    student_risk = risk_codes(student_avg)
+
+    # Class and school level over students
+    class_sizes = np.bincount(student_class, minlength=n_classes)
+    class_avg_sum = np.bincount(student_class, weights=student_avg, minlength=n_classes)
+    class_risk = np.bincount(student_class * 3 + student_risk, minlength=n_classes * 3).reshape(n_classes, 3)
+
+    # Prediction rows at every level, one grouped reduction each
+    grades = grade_codes(row_marks)
+    row_class = student_class[row_students]
+    school = _mark_stats(np.zeros(len(row_marks), dtype=np.int64), 1, row_marks, grades)
+    by_class = _mark_stats(row_class, n_classes, row_marks, grades)
+    by_subject = _mark_stats(row_subject, n_subjects, row_marks, grades)
+    by_class_subject = _mark_stats(row_class * n_subjects + row_subject, n_classes * n_subjects,
+                                   row_marks, grades)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        class_avg = np.where(class_sizes > 0, class_avg_sum / class_sizes, 0.0)
+
+    classes = {}
+    for c, key in enumerate(class_keys):
+        subjects = {}
+        for s, subject in enumerate(subject_keys):
+            g = c * n_subjects + s
+            if by_class_subject[0][g]:
+                subjects[str(subject)] = _mark_summary(*(stat[g] for stat in by_class_subject))
+        classes[str(key)] = {
+            **_student_summary(class_sizes[c], class_avg[c], class_risk[c]),
+            **_mark_summary(*(stat[c] for stat in by_class)),
+            'subjects': subjects
+        }
+
+    return {
+        'school': {
+            **_student_summary(n_students, student_avg.mean() if n_students else 0.0,
+                               class_risk.sum(axis=0) if n_classes else np.zeros(3, int)),
+            'total_classes': int(n_classes),
+            **_mark_summary(*(stat[0] for stat in school))
+        },
+        'classes': classes,
+        'subjects': {
+            str(subject): _mark_summary(*(stat[s] for stat in by_subject))
+            for s, subject in enumerate(subject_keys)
+        }
+    }
+
+
+def rollup_student_predictions(class_keys, predictions):
+    """
+    Rollup of predict_students output
+
+    Args:
+        class_keys: Class key per student
+        predictions: Per-student results from OLGradePredictor.predict_students
+    """
+    row_students, row_subjects, row_marks = [], [], []
+    for i, prediction in enumerate(predictions):
+        for subject in prediction['subject_predictions']:
+            row_students.append(i)
+            row_subjects.append(subject['subject'])
+            row_marks.append(subject['predicted_mark'])
+    return rollup(class_keys, row_students, row_subjects, row_marks)
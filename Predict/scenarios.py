@@ -0,0 +1,120 @@
+"""
+What-if Scenarios for O/L Grade Prediction
+Expands students x subjects x (hypothetical future marks x attendance) into
+one prediction batch and reshapes the results into prediction surfaces,
+so a whole attendance sweep for a class costs a single batched call
+"""
+
+import numpy as np
+
+from config import SCENARIO_CONFIG
+from rollup import student_surfaces
+
+
+def attendance_grid(spec):
+    """
+    Attendance values of a scenario request
+
+    Args:
+        spec: List of percentages, or {"start", "stop", "steps"} for a sweep
+            of evenly spaced whole percentages (default
+            SCENARIO_CONFIG['attendance_sweep']); at most
+            SCENARIO_CONFIG['max_scenarios'] values
+    """
+    max_values = SCENARIO_CONFIG['max_scenarios']
+    if spec is None:
+        spec = SCENARIO_CONFIG['attendance_sweep']
+    if isinstance(spec, dict):
+        # Checked before anything is allocated
+        steps = spec.get('steps', 2)
+        if isinstance(steps, bool) or float(steps) != int(steps) or not 1 <= int(steps) <= max_values:
+            raise ValueError(f'"steps" must be a whole number between 1 and {max_values}')
+        # Whole percentages, like the ATTENDANCE_WEIGHTS bands
+        values = np.linspace(float(spec.get('start', 0)), float(spec.get('stop', 100)), int(steps)).round()
+    else:
+        if isinstance(spec, (list, tuple)) and len(spec) > max_values:
+            raise ValueError(f'At most {max_values} attendance values per request, got {len(spec)}')
+        values = np.asarray(spec, dtype=np.float64).reshape(-1)
+    if len(values) == 0 or values.min() < 0 or values.max() > 100:
+        raise ValueError('Attendance values must be a non-empty list of percentages between 0 and 100')
+    return values.round(2)
+
+
+def future_marks_grid(spec):
+    """Hypothetical future mark sequences; [] is the unchanged history"""
+    if spec is None:
+        return [[]]
+    sequences = [[float(m) for m in sequence] for sequence in spec]
+    if not sequences or any(m < 0 or m > 100 for sequence in sequences for m in sequence):
+        raise ValueError('"future_marks" must be a non-empty list of mark lists between 0 and 100')
+    return sequences
+
+
+def predict_scenarios(predictor, students, attendance=None, future_marks=None, tier='ensemble',
+                      registry=None, grade=None, school=None):
+    """
+    Prediction surfaces over an attendance x future marks grid
+
+    Args:
+        predictor: Loaded OLGradePredictor
+        students: List of {'subjects': [{'name', 'marks'}], ...} dicts
+        attendance: Attendance grid spec, see attendance_grid
+        future_marks: List of mark sequences appended to every subject history
+        tier: Service tier, see OLGradePredictor.predict_batch
+        registry: Optional ModelRegistry routing each subject to its model
+            set, by the student's (or the given) grade and school
+
+    Returns:
+        dict: Grid axes and, per student, [future][attendance] surfaces of
+        subject marks and grades, overall average and risk level, plus the
+        average surface over all students
+    """
+    attendance = attendance_grid(attendance)
+    futures = future_marks_grid(future_marks)
+    n_att, n_fut = len(attendance), len(futures)
+    grid_size = n_att * n_fut
+    if grid_size > SCENARIO_CONFIG['max_scenarios']:
+        raise ValueError(f'At most {SCENARIO_CONFIG["max_scenarios"]} scenarios per request, got {grid_size}')
+
+    # Size of the expansion, checked before any history is expanded
+    n_histories = sum(1 for student in students for subject in student.get('subjects', []) if subject.get('marks'))
+    if n_histories * grid_size > SCENARIO_CONFIG['max_items']:
+        raise ValueError(f'Scenario grid expands to {n_histories * grid_size} predictions, '
+                         f'limit is {SCENARIO_CONFIG["max_items"]}')
+
+    # Items ordered student -> subject -> future -> attendance, so every
+    # (student, subject) block reshapes straight into its surface
+    items = []
+    blocks = []
+    names = []
+    for s, student in enumerate(students):
+        for subject in student.get('subjects', []):
+            if not subject.get('marks'):
+                continue
+            for future in futures:
+                history = list(subject['marks']) + future
+                items.extend((history, a) for a in attendance)
+            blocks.append((s, subject['name']))
+            if registry is not None:
+                name = registry.resolve(subject['name'], student.get('grade', grade),
+                                        student.get('school_id', school))
+                names.extend([name] * grid_size)
+
+    if not items:
+        preds = []
+    elif registry is not None:
+        preds = registry.predict_batch(items, names, tier=tier)
+    else:
+        preds = predictor.predict_batch(items, tier=tier)
+    marks = np.array([p['predicted_mark'] for p in preds], dtype=np.float64)
+    surfaces = marks.reshape(len(blocks), n_fut, n_att)
+    results, averages = student_surfaces(len(students), blocks, surfaces)
+
+    return {
+        'attendance': attendance.tolist(),
+        'future_marks': futures,
+        'attendance_factor': [predictor.calculate_attendance_factor(a) for a in attendance],
+        'students': results,
+        'average': averages.mean(axis=0).tolist() if len(students) else [],
+        'total_predictions': len(items)
+    }
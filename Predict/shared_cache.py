@@ -0,0 +1,240 @@
+"""
+Shared Prediction Cache
+Serialized prediction bodies in an SQLite file that every serving process
+on the host (API workers, predict_standalone.py runs) reads and writes,
+keyed by the same content hash as the in-process response cache (canonical
+input, model version and serving version). Entries survive restarts, so new or restarted
+workers serve repeat requests warm; the file is bounded by entry count and
+bytes with least-recently-used eviction.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+
+from cascade import CALIBRATION_FILE
+from config import (
+    ATTENDANCE_WEIGHTS, CASCADE_CONFIG, EXPLANATION_CONFIG, FORECAST_CONFIG, GRADE_BOUNDARIES,
+    INFERENCE_CONFIG, MODEL_REGISTRY_CONFIG, RISK_THRESHOLDS, SCENARIO_CONFIG, SHARED_CACHE_CONFIG,
+    UNCERTAINTY_CONFIG
+)
+from ensemble import DEFAULT_ENSEMBLE, load_ensemble
+from training_cache import TrainingCache, artifact_digest, code_version, digest
+
+# Code that builds prediction bodies from the artifacts
+SERVING_FILES = ('api.py', 'predict_standalone.py', 'train_model.py', 'batch_inference.py', 'cascade.py',
+                 'ensemble.py', 'uncertainty.py', 'explain.py', 'rollup.py', 'scenarios.py', 'forecast.py',
+                 'model_registry.py')
+
+_SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS entries ('
+    ' key TEXT PRIMARY KEY, body BLOB NOT NULL, size INTEGER NOT NULL, accessed REAL NOT NULL)',
+    'CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)',
+    # Running totals kept by triggers, so size checks do not scan the table
+    'CREATE TABLE IF NOT EXISTS usage (id INTEGER PRIMARY KEY CHECK (id = 0),'
+    ' entries INTEGER NOT NULL, bytes INTEGER NOT NULL)',
+    'INSERT OR IGNORE INTO usage VALUES (0, 0, 0)',
+    'CREATE TRIGGER IF NOT EXISTS entries_insert AFTER INSERT ON entries BEGIN'
+    ' UPDATE usage SET entries = entries + 1, bytes = bytes + NEW.size WHERE id = 0; END',
+    'CREATE TRIGGER IF NOT EXISTS entries_update AFTER UPDATE OF size ON entries BEGIN'
+    ' UPDATE usage SET bytes = bytes + NEW.size - OLD.size WHERE id = 0; END',
+    'CREATE TRIGGER IF NOT EXISTS entries_delete AFTER DELETE ON entries BEGIN'
+    ' UPDATE usage SET entries = entries - 1, bytes = bytes - OLD.size WHERE id = 0; END'
+)
+
+
+def stored_model_version(model_path='models/'):
+    """
+    model_version OLGradePredictor.load_models(model_path) would report,
+    read from the artifact files without loading them (or TensorFlow)
+    """
+    fingerprint, _ = TrainingCache.read_fingerprint(model_path)
+    version = fingerprint or artifact_digest(model_path)
+    ensemble = load_ensemble(model_path)
+    if ensemble != DEFAULT_ENSEMBLE:
+        return digest([version, ensemble])
+    return version
+
+
+def serving_version(model_path='models/', variants_dir=None):
+    """
+    Digest of what shapes a served body besides the model artifacts: the
+    serving code, the serving settings and the cascade calibrations of the
+    default and specialized model sets. Stored bodies outlive processes,
+    so their keys include it.
+    """
+    variants_dir = variants_dir or MODEL_REGISTRY_CONFIG['variants_dir']
+    paths = [model_path]
+    if os.path.isdir(variants_dir):
+        paths += sorted(entry.path for entry in os.scandir(variants_dir) if entry.is_dir())
+    calibrations = []
+    for path in paths:
+        calibration = os.path.join(path, CALIBRATION_FILE)
+        if os.path.exists(calibration):
+            with open(calibration, 'rb') as f:
+                calibrations.append([os.path.basename(os.path.normpath(path)), f.read().decode('utf-8')])
+    return digest({
+        'code': code_version(SERVING_FILES),
+        'config': [INFERENCE_CONFIG, UNCERTAINTY_CONFIG, CASCADE_CONFIG, EXPLANATION_CONFIG, SCENARIO_CONFIG,
+                   FORECAST_CONFIG, GRADE_BOUNDARIES, ATTENDANCE_WEIGHTS, RISK_THRESHOLDS],
+        'cascades': calibrations
+    })
+
+
+class SharedCache:
+    """
+    Cross-process body cache in one SQLite file (WAL mode)
+
+    Readers never block writers; writes from all processes are serialized
+    by SQLite's write lock, each put and its eviction in one transaction.
+    Every thread and process opens its own connection. Storage errors are
+    counted and treated as misses, so the cache can never fail a request.
+    """
+
+    def __init__(self, config=SHARED_CACHE_CONFIG):
+        self.config = config
+        self.enabled = config['enabled']
+        self.path = config['path']
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'writes': 0, 'evictions': 0, 'errors': 0}
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        # Connections must not cross a fork
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=self.config['busy_timeout'],
+                               isolation_level=None, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            for statement in _SCHEMA:
+                conn.execute(statement)
+            conn.execute('COMMIT')
+        except sqlite3.Error:
+            conn.execute('ROLLBACK')
+            raise
+        self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def _count(self, name, n=1):
+        with self._lock:
+            self.stats[name] += n
+
+    def _failed(self, action, error):
+        with self._lock:
+            self.stats['errors'] += 1
+            first = self.stats['errors'] == 1
+        if first:
+            print(f"Shared cache {action} failed ({self.path}): {error}")
+
+    def get(self, key):
+        """Cached body for key, or None"""
+        if not self.enabled:
+            return None
+        try:
+            conn = self._connection()
+            row = conn.execute('SELECT body, accessed FROM entries WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                self._count('misses')
+                return None
+            now = time.time()
+            # Access times are coarse so hits rarely need the write lock
+            if now - row[1] > self.config['touch_interval']:
+                conn.execute('UPDATE entries SET accessed = ? WHERE key = ?', (now, key))
+        except sqlite3.Error as e:
+            self._failed('read', e)
+            return None
+        self._count('hits')
+        return bytes(row[0])
+
+    def put(self, key, body):
+        """Store a body (bytes or str), evicting least recently used entries beyond the limits"""
+        if not self.enabled:
+            return False
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        if len(body) > self.config['max_body_bytes']:
+            return False
+        try:
+            conn = self._connection()
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                conn.execute(
+                    'INSERT INTO entries (key, body, size, accessed) VALUES (?, ?, ?, ?) '
+                    'ON CONFLICT (key) DO UPDATE SET body = excluded.body, size = excluded.size, '
+                    'accessed = excluded.accessed',
+                    (key, body, len(body), time.time())
+                )
+                evicted = self._evict(conn)
+                conn.execute('COMMIT')
+            except sqlite3.Error:
+                conn.execute('ROLLBACK')
+                raise
+        except sqlite3.Error as e:
+            self._failed('write', e)
+            return False
+        with self._lock:
+            self.stats['writes'] += 1
+            self.stats['evictions'] += evicted
+        return True
+
+    def _evict(self, conn):
+        entries, size = conn.execute('SELECT entries, bytes FROM usage WHERE id = 0').fetchone()
+        max_entries, max_bytes = self.config['max_entries'], self.config['max_bytes']
+        if entries <= max_entries and size <= max_bytes:
+            return 0
+        # Evict below the limits, so the next puts do not each evict again
+        entries_over = entries - int(max_entries * self.config['evict_to'])
+        bytes_over = size - int(max_bytes * self.config['evict_to'])
+        victims = []
+        cursor = conn.execute('SELECT key, size FROM entries ORDER BY accessed')
+        try:
+            while len(victims) < entries_over or bytes_over > 0:
+                rows = cursor.fetchmany(256)
+                if not rows:
+                    break
+                for key, entry_size in rows:
+                    if len(victims) >= entries_over and bytes_over <= 0:
+                        break
+                    victims.append((key,))
+                    bytes_over -= entry_size
+        finally:
+            cursor.close()
+        conn.executemany('DELETE FROM entries WHERE key = ?', victims)
+        return len(victims)
+
+    def clear(self):
+        if not self.enabled:
+            return
+        try:
+            self._connection().execute('DELETE FROM entries')
+        except sqlite3.Error as e:
+            self._failed('clear', e)
+
+    def info(self):
+        with self._lock:
+            stats = dict(self.stats)
+        usage = None
+        if self.enabled:
+            try:
+                entries, size = self._connection().execute(
+                    'SELECT entries, bytes FROM usage WHERE id = 0').fetchone()
+                usage = {'entries': entries, 'bytes': size}
+            except sqlite3.Error as e:
+                self._failed('read', e)
+        return {
+            'enabled': self.enabled,
+            'path': self.path,
+            'max_entries': self.config['max_entries'],
+            'max_bytes': self.config['max_bytes'],
+            # Shared by all processes; stats are this process's
+            'stored': usage,
+            **stats
+        }
@@ -0,0 +1,67 @@
+"""
+Single-flight Request Coalescing
+Concurrent callers with the same key share one computation: the first
+caller computes, the others wait for and reuse its result
+"""
+
+import threading
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Thread-safe in-flight deduplication keyed by a content hash"""
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.stats = {'computations': 0, 'coalesced': 0, 'errors': 0, 'max_waiters': 0}
+
+    def do(self, key, fn):
+        """
+        Run fn() once for all concurrent callers with the same key
+
+        Returns:
+            tuple: (result, shared) where shared is True for callers that
+            reused another caller's computation
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+                self.stats['computations'] += 1
+            else:
+                call.waiters += 1
+                self.stats['coalesced'] += 1
+                self.stats['max_waiters'] = max(self.stats['max_waiters'], call.waiters)
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+            with self._lock:
+                self.stats['errors'] += 1
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+    def info(self):
+        with self._lock:
+            return {**self.stats, 'in_flight': len(self._calls)}
@@ -1,8 +1,9 @@
 """
 Production server starter using Waitress
 """
-from waitress import serve
-from api import app
+from waitress.server import create_server
+from api import app, governor
+from config import DEGRADATION_CONFIG
 import os
 
 if __name__ == '__main__':
@@ -13,4 +14,7 @@ if __name__ == '__main__':
     print("="*60 + "\n")
     
     # Serve with waitress (production-ready WSGI server)
-    serve(app, host='127.0.0.1', port=5001, threads=4)
+    server = create_server(app, host='127.0.0.1', port=5001, threads=DEGRADATION_CONFIG['server_threads'])
+    # Requests waiting for a worker thread are the queueing signal of the latency governor
+    governor.watch_queue(lambda: len(server.task_dispatcher.queue))
+    server.run()
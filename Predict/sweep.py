@@ -0,0 +1,265 @@
+"""
+Hyperparameter Sweep for O/L Grade Prediction Models
+Runs grid or random search with k-fold cross-validation across a process pool,
+caching each trial on disk so interrupted sweeps resume where they stopped
+"""
+
+import argparse
+import hashlib
+import itertools
+import json
+import multiprocessing
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from config import ATTENDANCE_WEIGHTS, INFERENCE_CONFIG, MODEL_CONFIG, GB_CONFIG, TUNING_CONFIG
+from training_cache import CODE_FILES, code_version
+
+# Per-process dataset cache, datasets only differ by sequence length
+_datasets = {}
+
+
+def _init_worker(threads):
+    """Bound BLAS/TensorFlow threads before TensorFlow is imported in the worker"""
+    for var in ('OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS'):
+        os.environ[var] = str(threads)
+    os.environ['TF_NUM_INTRAOP_THREADS'] = str(threads)
+    os.environ['TF_NUM_INTEROP_THREADS'] = '1'
+    os.environ['TF_CPP_MIN_LOG_LEVEL'] = '3'
+
+    import tensorflow as tf
+    tf.config.threading.set_intra_op_parallelism_threads(threads)
+    tf.config.threading.set_inter_op_parallelism_threads(1)
+
+
+def split_params(params):
+    """Split flat trial params into (model_config, gb_config) overrides"""
+    model = {k: v for k, v in params.items() if not k.startswith('gb_')}
+    gb = {k[len('gb_'):]: v for k, v in params.items() if k.startswith('gb_')}
+    return model, gb
+
+
+def data_fingerprint(data_source, tuning=TUNING_CONFIG):
+    """Hash identifying the training data a trial is evaluated on"""
+    if data_source.get('marks_path'):
+        from ingest import file_hash
+        return file_hash([data_source['marks_path'], data_source.get('attendance_path')])
+    return hashlib.sha256(json.dumps({
+        'synthetic': tuning['n_students'],
+        'seed': tuning['seed']
+    }, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def trial_key(params, data_hash, tuning=TUNING_CONFIG):
+    """Cache key for one trial: config (swept and not), data, CV settings and code"""
+    payload = {
+        'params': params,
+        'base': {
+            'model': MODEL_CONFIG,
+            'gb': GB_CONFIG,
+            'inference': INFERENCE_CONFIG,
+            'attendance_weights': ATTENDANCE_WEIGHTS
+        },
+        'code': code_version(CODE_FILES + ('sweep.py',)),
+        'data': data_hash,
+        'n_folds': tuning['n_folds'],
+        'epochs': tuning['epochs'],
+        'seed': tuning['seed']
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode('utf-8')).hexdigest()[:20]
+
+
+def generate_trials(tuning=TUNING_CONFIG):
+    """Expand the search space into a list of flat param dicts"""
+    space = tuning['space']
+    names = sorted(space)
+    grid = [dict(zip(names, values)) for values in itertools.product(*(space[n] for n in names))]
+
+    if tuning['search'] == 'random' and tuning['n_random_trials'] < len(grid):
+        rng = random.Random(tuning['seed'])
+        grid = rng.sample(grid, tuning['n_random_trials'])
+    return grid
+
+
+def _load_dataset(predictor, data_source, tuning):
+    key = predictor.sequence_length
+    if key not in _datasets:
+        if data_source.get('marks_path'):
+            _datasets[key] = predictor.load_training_data(
+                data_source['marks_path'], data_source.get('attendance_path')
+            )
+        else:
+            np.random.seed(tuning['seed'])
+            _datasets[key] = predictor.generate_synthetic_data(n_students=tuning['n_students'])
+    return _datasets[key]
+
+
+def run_trial(params, data_source, tuning=TUNING_CONFIG):
+    """Evaluate one configuration with k-fold cross-validation"""
+    import tensorflow as tf
+    from sklearn.model_selection import KFold
+    from train_model import OLGradePredictor
+
+    start = time.time()
+    model_overrides, gb_overrides = split_params(params)
+    predictor = OLGradePredictor(
+        model_config={**MODEL_CONFIG, **model_overrides, 'epochs': tuning['epochs']},
+        gb_config={**GB_CONFIG, **gb_overrides}
+    )
+    X, y = _load_dataset(predictor, data_source, tuning)
+
+    folds = KFold(n_splits=tuning['n_folds'], shuffle=True, random_state=tuning['seed'])
+    lstm_maes, gb_maes, ensemble_maes = [], [], []
+
+    for train_idx, test_idx in folds.split(X):
+        tf.keras.utils.set_random_seed(tuning['seed'])
+        predictor.fit_lstm(X[train_idx], y[train_idx], verbose=0)
+        lstm_pred = predictor.lstm_model.predict(X[test_idx], batch_size=1024, verbose=0).ravel()
+
+        predictor.fit_gb(X[train_idx], y[train_idx])
+        gb_pred = predictor.gb_model.predict(predictor.gb_features(X[test_idx]))
+
+        # The serving combination (default ensemble), attendance factor included
+        ensemble_pred = predictor.blend(lstm_pred, gb_pred, predictor.attendance_factors(X[test_idx]))
+        y_test = y[test_idx]
+        lstm_maes.append(float(np.mean(np.abs(lstm_pred - y_test))))
+        gb_maes.append(float(np.mean(np.abs(gb_pred - y_test))))
+        ensemble_maes.append(float(np.mean(np.abs(ensemble_pred - y_test))))
+
+    return {
+        'params': params,
+        'lstm_mae': float(np.mean(lstm_maes)),
+        'gb_mae': float(np.mean(gb_maes)),
+        'ensemble_mae': float(np.mean(ensemble_maes)),
+        'ensemble_mae_std': float(np.std(ensemble_maes)),
+        'fold_ensemble_maes': ensemble_maes,
+        'n_samples': int(len(X)),
+        'seconds': time.time() - start
+    }
+
+
+def _cache_path(key, tuning):
+    return os.path.join(tuning['cache_dir'], f'trial_{key}.json')
+
+
+def _write_json(path, payload):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(payload, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def run_sweep(data_source=None, tuning=TUNING_CONFIG):
+    """
+    Run all trials not already cached and write the leaderboard
+
+    Args:
+        data_source: Optional dict with 'marks_path'/'attendance_path' exports
+        tuning: Sweep settings (defaults to TUNING_CONFIG)
+
+    Returns:
+        list: Leaderboard entries sorted by cross-validated ensemble MAE
+    """
+    data_source = data_source or {}
+    os.makedirs(tuning['cache_dir'], exist_ok=True)
+    data_hash = data_fingerprint(data_source, tuning)
+
+    trials = generate_trials(tuning)
+    results = {}
+    pending = []
+    for params in trials:
+        key = trial_key(params, data_hash, tuning)
+        path = _cache_path(key, tuning)
+        if os.path.exists(path):
+            with open(path) as f:
+                results[key] = json.load(f)
+        else:
+            pending.append((key, params))
+
+    print(f"Sweep: {len(trials)} trials, {len(results)} cached, {len(pending)} to run")
+
+    if pending:
+        threads = tuning['threads_per_worker']
+        workers = tuning['workers'] or max(1, (os.cpu_count() or 1) // threads)
+        # Sort by sequence length so each worker mostly reuses one dataset
+        pending.sort(key=lambda item: item[1].get('sequence_length', 0))
+        print(f"Running on {workers} worker(s) x {threads} thread(s)")
+
+        start = time.time()
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker,
+            initargs=(threads,)
+        ) as pool:
+            futures = {
+                pool.submit(run_trial, params, data_source, tuning): key
+                for key, params in pending
+            }
+            for done, future in enumerate(as_completed(futures), 1):
+                key = futures[future]
+                result = future.result()
+                result['key'] = key
+                _write_json(_cache_path(key, tuning), result)
+                results[key] = result
+                print(f"[{done}/{len(pending)}] ensemble MAE {result['ensemble_mae']:.3f} "
+                      f"({result['seconds']:.0f}s) {result['params']}")
+        print(f"Sweep finished in {time.time() - start:.0f}s")
+
+    leaderboard = sorted(results.values(), key=lambda r: r['ensemble_mae'])
+    _write_json(tuning['leaderboard_path'], leaderboard)
+    return leaderboard
+
+
+def promote_best(leaderboard, tuning=TUNING_CONFIG):
+    """Write the best configuration where OLGradePredictor picks it up for training"""
+    best = leaderboard[0]
+    model_overrides, gb_overrides = split_params(best['params'])
+    os.makedirs(os.path.dirname(tuning['promoted_config_path']) or '.', exist_ok=True)
+    _write_json(tuning['promoted_config_path'], {
+        'model': model_overrides,
+        'gb': gb_overrides,
+        'cv_ensemble_mae': best['ensemble_mae'],
+        'trial_key': best.get('key')
+    })
+    print(f"Promoted config to {tuning['promoted_config_path']}")
+    return best
+
+
+def print_leaderboard(leaderboard, top=10):
+    print("\n" + "="*80)
+    print("SWEEP LEADERBOARD (cross-validated MAE)")
+    print("="*80)
+    for rank, entry in enumerate(leaderboard[:top], 1):
+        print(f"{rank:2}. ensemble {entry['ensemble_mae']:.3f} ± {entry['ensemble_mae_std']:.3f} "
+              f"| lstm {entry['lstm_mae']:.3f} | gb {entry['gb_mae']:.3f} | {entry['params']}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Hyperparameter sweep for O/L grade models")
+    parser.add_argument('--search', choices=['grid', 'random'], default=TUNING_CONFIG['search'])
+    parser.add_argument('--trials', type=int, default=TUNING_CONFIG['n_random_trials'])
+    parser.add_argument('--workers', type=int, default=TUNING_CONFIG['workers'])
+    parser.add_argument('--threads-per-worker', type=int, default=TUNING_CONFIG['threads_per_worker'])
+    parser.add_argument('--marks', help="CSV/Parquet export of exam results (default: synthetic data)")
+    parser.add_argument('--attendance', help="CSV/Parquet export of attendance records")
+    parser.add_argument('--promote', action='store_true', help="Promote the best config for training")
+    args = parser.parse_args()
+
+    tuning = {
+        **TUNING_CONFIG,
+        'search': args.search,
+        'n_random_trials': args.trials,
+        'workers': args.workers,
+        'threads_per_worker': args.threads_per_worker
+    }
+    data_source = {'marks_path': args.marks, 'attendance_path': args.attendance}
+
+    leaderboard = run_sweep(data_source, tuning)
+    print_leaderboard(leaderboard)
+    if args.promote and leaderboard:
+        promote_best(leaderboard, tuning)
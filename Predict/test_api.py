@@ -0,0 +1,233 @@
+"""
+Test script to verify caching and ranking behaviour of the prediction API
+"""
+import json
+
+import pytest
+
+from config import AUDIT_LOG_CONFIG, SHARED_CACHE_CONFIG
+
+
+@pytest.fixture(scope='module')
+def api(tmp_path_factory):
+    import api as module
+    from audit_log import AuditLog
+    from shared_cache import SharedCache
+
+    if not module.model_loaded:
+        pytest.skip('No trained models')
+    path = tmp_path_factory.mktemp('shared') / 'cache.sqlite3'
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(module, 'shared_cache', SharedCache({**SHARED_CACHE_CONFIG, 'path': str(path)}))
+        mp.setattr(module, 'audit_log', AuditLog({**AUDIT_LOG_CONFIG, 'enabled': False}))
+        yield module
+
+
+def _class_body(class_id='C1'):
+    body = {'students': [
+        {'student_id': 'S1', 'subjects': [{'name': 'Mathematics', 'marks': [60, 65, 70, 72, 75, 78]}]},
+        {'student_id': 'S2', 'subjects': [{'name': 'Mathematics', 'marks': [40, 45, 50, 48, 52, 55]}]}
+    ], 'school_id': 'SCH'}
+    if class_id is not None:
+        body['class_id'] = class_id
+    return body
+
+
+def _student_body():
+    return {'subjects': [{'name': 'Mathematics', 'marks': [60, 65, 70, 72, 75, 78]},
+                         {'name': 'Science', 'marks': [55, 58, 61, 60, 66]}], 'attendance': 92}
+
+
+def _clear_caches(api):
+    api.response_cache.clear()
+    api.shared_cache.clear()
+
+
+def test_etag_revalidation_and_reformatted_bodies(api):
+    """MISS, then 304 for If-None-Match, then HIT for the same body written differently"""
+    client = api.app.test_client()
+    _clear_caches(api)
+
+    first = client.post('/api/predict/student', json=_student_body())
+    assert first.status_code == 200 and first.headers['X-Cache'] == 'MISS'
+    etag, weak = first.get_etag()
+    assert not weak
+
+    not_modified = client.post('/api/predict/student', json=_student_body(), headers={'If-None-Match': f'"{etag}"'})
+    assert not_modified.status_code == 304 and not_modified.get_etag()[0] == etag
+
+    reformatted = json.dumps(dict(reversed(list(_student_body().items()))), indent=4)
+    hit = client.post('/api/predict/student', data=reformatted, content_type='application/json')
+    assert hit.headers['X-Cache'] == 'HIT'
+    assert hit.get_etag() == (etag, False)
+    assert hit.get_data() == first.get_data()
+
+
+def test_degraded_tiers_get_weak_uncached_etags(api, monkeypatch):
+    """Responses from a cheaper tier get their own weak ETag and never enter the caches"""
+    client = api.app.test_client()
+    _clear_caches(api)
+    monkeypatch.setattr(api.governor, 'choose', lambda *args: api.TIERS[1])
+
+    degraded = client.post('/api/predict/student', json=_student_body())
+    assert degraded.headers['X-Service-Tier'] == api.TIERS[1]
+    degraded_etag, weak = degraded.get_etag()
+    assert weak
+    assert client.post('/api/predict/student', json=_student_body()).headers['X-Cache'] == 'MISS'
+
+    monkeypatch.undo()
+    full = client.post('/api/predict/student', json=_student_body())
+    assert full.headers['X-Service-Tier'] == api.TIERS[0] and full.headers['X-Cache'] == 'MISS'
+    assert full.get_etag() != (degraded_etag, True) and not full.get_etag()[1]
+
+
+def test_new_model_version_gets_new_keys(api, monkeypatch):
+    """Bodies and ETags of the old models are not served after the model version changes"""
+    client = api.app.test_client()
+    _clear_caches(api)
+    old = client.post('/api/predict/student', json=_student_body())
+    assert client.post('/api/predict/student', json=_student_body()).headers['X-Cache'] == 'HIT'
+
+    monkeypatch.setattr(api.registry.default, 'fingerprint', 'retrained')
+    new = client.post('/api/predict/student', json=_student_body(), headers={'If-None-Match': old.headers['ETag']})
+    assert new.status_code == 200 and new.headers['X-Cache'] == 'MISS'
+    assert new.get_etag()[0] != old.get_etag()[0]
+
+
+def test_rankings_follow_cache_served_responses(api):
+    client = api.app.test_client()
+    api.ranking.clear()
+    api.response_cache.clear()
+    api.shared_cache.clear()
+
+    first = client.post('/api/predict/class', json=_class_body())
+    assert first.headers['X-Cache'] == 'MISS'
+    assert client.get('/api/predict/class/rank?student_id=S1').status_code == 200
+
+    # In-process hit, a restarted process (shared cache) and a 304 all feed the index
+    api.ranking.clear()
+    assert client.post('/api/predict/class', json=_class_body()).headers['X-Cache'] == 'HIT'
+    assert client.get('/api/predict/class/rank?student_id=S1').status_code == 200
+
+    api.ranking.clear()
+    api.response_cache.clear()
+    assert client.post('/api/predict/class', json=_class_body()).headers['X-Cache'] == 'SHARED_HIT'
+    rank = client.get('/api/predict/class/rank?student_id=S2').get_json()
+    assert rank['class_id'] == 'C1' and rank['rankings']['overall']['class']['of'] == 2
+
+    api.ranking.clear()
+    not_modified = client.post('/api/predict/class', json=_class_body(),
+                               headers={'If-None-Match': first.headers['ETag']})
+    assert not_modified.status_code == 304
+    assert client.get('/api/predict/class/rank?student_id=S1').status_code == 200
+
+
+def test_students_without_class_id_are_ranked_in_school_only(api):
+    client = api.app.test_client()
+    api.ranking.clear()
+    assert client.post('/api/predict/class', json=_class_body(None)).status_code == 200
+    rank = client.get('/api/predict/class/rank?student_id=S1').get_json()
+    assert rank['rankings']['overall']['class'] is None
+    assert rank['rankings']['overall']['school']['of'] == 2
+
+
+def test_bulk_rankings_include_subjects_on_cache_hits(api):
+    client = api.app.test_client()
+    body = {'school_id': 'SCH', 'classes': [{'class_id': 'B1', 'students': _class_body()['students']}]}
+    client.post('/api/predict/bulk', json=body)
+    computed = client.get('/api/predict/class/rank?student_id=S1').get_json()
+
+    api.ranking.clear()
+    assert client.post('/api/predict/bulk', json=body).headers['X-Cache'] == 'HIT'
+    cached = client.get('/api/predict/class/rank?student_id=S1').get_json()
+    assert cached['rankings'] == computed['rankings']
+    assert set(cached['rankings']) == {'overall', 'Mathematics'} and cached['class_id'] == 'B1'
+
+
+def test_train_rejects_paths_outside_the_exports_directory(api, tmp_path, monkeypatch):
+    """Only files inside API_CONFIG['exports_dir'] can be named for training"""
+    exports = tmp_path / 'exports'
+    exports.mkdir()
+    (exports / 'marks.csv').write_text('studentId,subject,marks\n')
+    (tmp_path / 'secret.csv').write_text('studentId,subject,marks\n')
+    monkeypatch.setitem(api.API_CONFIG, 'exports_dir', str(exports))
+    client = api.app.test_client()
+
+    for name in ('../secret.csv', str(tmp_path / 'secret.csv'), 'missing.csv', '.', 42):
+        response = client.post('/api/train', json={'marks_path': name})
+        assert response.status_code == 400, name
+        assert response.get_json()['success'] is False
+
+    assert api.export_path('marks.csv') == str((exports / 'marks.csv').resolve())
+    assert api.export_path(None) is None
+
+
+def test_streamed_bulk_rankings_wait_for_a_valid_body(api, monkeypatch):
+    """A streamed upload rejected after its first batch leaves the rankings untouched"""
+    monkeypatch.setitem(api.BULK_UPLOAD_CONFIG, 'stream_above_bytes', 10)
+    monkeypatch.setitem(api.BULK_UPLOAD_CONFIG, 'predict_batch_students', 1)
+    client = api.app.test_client()
+    api.ranking.clear()
+
+    classes = [{'class_id': 'B1', 'students': _class_body()['students']}, {'class_id': 'B2', 'students': 'none'}]
+    # Serialized here: the test client sorts keys, and options must come before "classes"
+    rejected = client.post('/api/predict/bulk', data=json.dumps({'school_id': 'SCH', 'classes': classes}),
+                           content_type='application/json')
+    assert rejected.status_code == 400 and 'must be a list' in rejected.get_json()['error']
+    assert client.get('/api/predict/class/rank?student_id=S1').status_code == 404
+
+    accepted = client.post('/api/predict/bulk', data=json.dumps({'school_id': 'SCH', 'classes': classes[:1]}),
+                           content_type='application/json')
+    assert accepted.status_code == 200
+    assert client.get('/api/predict/class/rank?student_id=S1').get_json()['class_id'] == 'B1'
+
+
+def test_bulk_students_fall_back_to_the_top_level_grade(api, monkeypatch):
+    grades = []
+    predict_students = api.registry.predict_students
+
+    def recording(students, **kwargs):
+        grades.extend(student['grade'] for student in students)
+        return predict_students(students, **kwargs)
+
+    monkeypatch.setattr(api.registry, 'predict_students', recording)
+    students = _class_body()['students']
+    body = {'grade': 10, 'classes': [{'class_id': 'G1', 'students': students},
+                                     {'class_id': 'G2', 'grade': 11, 'students': [{**students[0], 'grade': 9}, students[1]]}]}
+    assert api.app.test_client().post('/api/predict/bulk', json=body).status_code == 200
+    assert grades == [10, 10, 9, 11]
+
+
+def test_bad_uncertainty_and_explain_options_are_rejected(api):
+    client = api.app.test_client()
+    subject_body = {'subject_name': 'Mathematics', 'students': _class_body()['students']}
+    for path, body in (('/api/predict/student', _student_body()), ('/api/predict/class', _class_body()),
+                       ('/api/predict/subject', subject_body)):
+        for field in ('uncertainty', 'explain'):
+            for value in ('abc', -1, 2.5, [3]):
+                response = client.post(path, json={**body, field: value})
+                assert response.status_code == 400, (path, field, value)
+                assert field in response.get_json()['error']
+
+    bulk = json.dumps({'uncertainty': 'abc', 'classes': [{'class_id': 'U1', 'students': _class_body()['students']}]})
+    response = client.post('/api/predict/bulk', data=bulk, content_type='application/json')
+    assert response.status_code == 400 and 'uncertainty' in response.get_json()['error']
+
+
+def test_sample_counts_are_clamped(api, monkeypatch):
+    calls = []
+    predict_students = api.registry.predict_students
+
+    def recording(students, **kwargs):
+        calls.append((kwargs['uncertainty'], kwargs['explain']))
+        return predict_students(students, **{**kwargs, 'uncertainty': None, 'explain': None})
+
+    monkeypatch.setattr(api.registry, 'predict_students', recording)
+    client = api.app.test_client()
+    _clear_caches(api)
+    for uncertainty, explain in ((10 ** 6, 10 ** 6), (8.0, 0), (True, False)):
+        response = client.post('/api/predict/student',
+                               json={**_student_body(), 'uncertainty': uncertainty, 'explain': explain})
+        assert response.status_code == 200
+    assert calls == [(api.UNCERTAINTY_CONFIG['max_samples'], api.EXPLANATION_CONFIG['max_steps']),
+                     (8, False), (True, False)]
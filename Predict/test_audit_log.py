@@ -0,0 +1,59 @@
+"""
+Test script to verify the non-blocking prediction audit log
+"""
+import gzip
+import json
+import os
+
+from audit_log import AuditLog
+from config import AUDIT_LOG_CONFIG
+
+
+def make_log(tmp_path, **overrides):
+    config = {**AUDIT_LOG_CONFIG, 'log_dir': str(tmp_path), **overrides}
+    return AuditLog(config, start=False)
+
+
+def read_entries(tmp_path):
+    entries = []
+    for name in sorted(os.listdir(tmp_path)):
+        opener = gzip.open if name.endswith('.gz') else open
+        with opener(os.path.join(tmp_path, name), 'rt') as f:
+            entries.extend(json.loads(line) for line in f)
+    return entries
+
+
+def test_entries_written_rotated_and_flushed_on_close(tmp_path):
+    log = make_log(tmp_path, max_file_bytes=2000, batch_size=5)
+    log.start()
+    for i in range(40):
+        assert log.record({'endpoint': '/api/predict/student', 'latency_ms': i,
+                           'request': json.dumps({'attendance': i}).encode(),
+                           'response': b'{"success": true, "data": {"overall_average": 70}}'})
+    assert log.flush()
+    log.close()
+
+    entries = read_entries(tmp_path)
+    assert len(entries) == 40
+    assert entries[3]['inputs'] == {'attendance': 3}
+    assert entries[3]['outputs'] == {'data': {'overall_average': 70}}
+    assert len(entries[3]['input_digest']) == 32
+    assert all(name.endswith('.ndjson.gz') for name in os.listdir(tmp_path))
+    info = log.info()
+    assert info['written'] == 40 and info['rotations'] > 1
+    assert not log.record({'endpoint': 'closed'})
+
+
+def test_full_queue_samples_then_drops(tmp_path):
+    log = make_log(tmp_path, queue_size=8, sample_above=0.5, sample_every=2)
+    accepted = sum(log.record({'n': i}) for i in range(20))
+    info = log.info()
+    assert info['queued'] == accepted == 8
+    assert info['offered'] == 20
+    assert info['sampled_out'] + info['dropped'] == 12 and info['sampled_out'] > 0
+
+    log.start()
+    log.close()
+    entries = read_entries(tmp_path)
+    assert len(entries) == 8
+    assert sum('sample_weight' in entry for entry in entries) == 4
@@ -0,0 +1,43 @@
+"""
+Test script to verify batched and length-bucketed inference against single predictions
+"""
+import numpy as np
+
+from batch_inference import LengthBucketedBatcher
+from config import INFERENCE_CONFIG
+
+
+def _items(n, min_len, max_len, seed=0):
+    rng = np.random.default_rng(seed)
+    return [(rng.uniform(30, 95, rng.integers(min_len, max_len + 1)).round(1).tolist(), float(rng.uniform(50, 100)))
+            for _ in range(n)]
+
+
+def test_predict_batch_matches_predict_next_mark(loaded_predictor):
+    predictor = loaded_predictor
+    items = _items(40, 1, 12)
+    batch = LengthBucketedBatcher(predictor, {**INFERENCE_CONFIG, 'variable_length': False}).predict(items)
+    for (marks, attendance), pred in zip(items, batch):
+        single = predictor.predict_next_mark(marks, attendance)
+        assert pred['method'] == single['method']
+        assert abs(pred['predicted_mark'] - single['predicted_mark']) < 1e-4
+        assert pred['predicted_grade'] == single['predicted_grade']
+
+
+def test_bucketed_and_padded_batches_agree(loaded_predictor):
+    predictor = loaded_predictor
+    items = _items(60, 2, INFERENCE_CONFIG['max_history'], seed=1)
+    variable = {**INFERENCE_CONFIG, 'variable_length': True}
+    bucketed = LengthBucketedBatcher(predictor, variable)
+    padded = LengthBucketedBatcher(predictor, {**variable, 'length_buckets': [INFERENCE_CONFIG['max_history']]})
+
+    by_bucket = bucketed.predict(items)
+    by_padding = padded.predict(items)
+    assert bucketed.last_stats['buckets'] > 1 and padded.last_stats['buckets'] == 1
+    assert padded.last_stats['padding_waste'] > bucketed.last_stats['padding_waste']
+    # Masked padding leaves every prediction unchanged, also against an unpadded single call
+    for item, a, b in zip(items[:10], by_bucket, by_padding):
+        alone = bucketed.predict([item])[0]
+        assert abs(a['predicted_mark'] - b['predicted_mark']) < 1e-4
+        assert abs(a['predicted_mark'] - alone['predicted_mark']) < 1e-4
+    assert max(abs(a['predicted_mark'] - b['predicted_mark']) for a, b in zip(by_bucket, by_padding)) < 1e-4
@@ -0,0 +1,92 @@
+"""
+Test script to verify streaming bulk upload parsing and early rejection
+"""
+import io
+import json
+
+import pytest
+
+from bulk_upload import BulkUpload, PayloadError
+from config import BULK_UPLOAD_CONFIG
+from response_cache import content_hash
+
+
+class CountingStream(io.BytesIO):
+    """Request body that records how far it has been read"""
+
+    def read(self, size=-1):
+        chunk = super().read(size)
+        self.consumed = self.tell()
+        return chunk
+
+
+def school(n_classes, n_students=3):
+    return {
+        'school_id': 'S01',
+        'classes': [
+            {
+                'class_id': f'C{c}',
+                'students': [
+                    {'student_id': f'C{c}-{s}', 'attendance': 90,
+                     'subjects': [{'name': 'Mathematics', 'marks': [60, 65, 70.5, 72, 75]}]}
+                    for s in range(n_students)
+                ]
+            }
+            for c in range(n_classes)
+        ],
+        'uncertainty': False
+    }
+
+
+def test_classes_stream_one_at_a_time():
+    config = {**BULK_UPLOAD_CONFIG, 'chunk_bytes': 64}
+    raw = json.dumps(school(50)).encode()
+    stream = CountingStream(raw)
+    upload = BulkUpload(stream, len(raw), config)
+
+    classes = upload.classes()
+    first = next(classes)
+    assert first['class_id'] == 'C0' and upload.options == {'school_id': 'S01'}
+    assert stream.consumed < len(raw) / 10
+
+    rest = list(classes)
+    assert [c['class_id'] for c in rest] == [f'C{c}' for c in range(1, 50)]
+    assert rest[-1]['students'][2]['subjects'][0]['marks'][2] == 70.5
+    assert upload.options['uncertainty'] is False
+    assert upload.digest == content_hash(raw)
+
+
+@pytest.mark.parametrize('payload, status, message', [
+    ({'classes': [{'students': [{'attendance': 150}]}]}, 400, '$.classes[0].students[0].attendance'),
+    ({'classes': [{'students': [{'subjects': [{'marks': [50]}]}]}]}, 400, 'name is required'),
+    ({'classes': [{'students': [{}] * (BULK_UPLOAD_CONFIG['max_students_per_class'] + 1)}]}, 413,
+     'max_students_per_class'),
+    ({'students': []}, 400, '"classes" field is required'),
+    ({'classes': [{}], 'school_id': 'S01'}, 400, 'must come before "classes"'),
+])
+def test_invalid_payloads_rejected(payload, status, message):
+    raw = json.dumps(payload).encode()
+    upload = BulkUpload(io.BytesIO(raw), len(raw))
+    with pytest.raises(PayloadError) as error:
+        for _ in upload.classes():
+            upload.freeze_options()
+    assert error.value.status == status and message in str(error.value)
+
+
+def test_rejected_before_reading_the_rest():
+    config = {**BULK_UPLOAD_CONFIG, 'chunk_bytes': 256}
+    payload = school(100)
+    payload['classes'][1]['students'][0]['subjects'][0]['marks'] = ['seventy']
+    raw = json.dumps(payload).encode()
+    stream = CountingStream(raw)
+    with pytest.raises(PayloadError, match=r'classes\[1\]'):
+        list(BulkUpload(stream, len(raw), config).classes())
+    assert stream.consumed < len(raw) / 10
+
+    with pytest.raises(PayloadError) as error:
+        BulkUpload(io.BytesIO(b''), BULK_UPLOAD_CONFIG['max_body_bytes'] + 1)
+    assert error.value.status == 413
+
+    with pytest.raises(PayloadError, match='Malformed JSON'):
+        truncated = json.dumps(school(100)).encode()[:len(raw) // 2]
+        list(BulkUpload(io.BytesIO(truncated), None).classes())
@@ -0,0 +1,36 @@
+"""
+Test script to verify cascade calibration and early exits in batched inference
+"""
+import numpy as np
+
+from cascade import Cascade, agreement_scores, calibrate
+
+
+def test_agreement_scores_ignore_padding():
+    windows = np.array([[60, 60, 60, 60, 60], [-1, -1, 50, 70, 60]])
+    scores = agreement_scores(windows, [62, 60], pad_value=-1)
+    assert np.allclose(scores, [2.0, np.std([50, 70, 60])])
+
+
+def test_calibrated_cascade_stays_within_tolerance(tiny_predictor):
+    predictor, X, y = tiny_predictor
+
+    report = calibrate(predictor, X, y, tolerance=0.5, report_split=0.4)
+    calibration = report['calibration']
+    assert calibration['cascade_mae'] <= calibration['ensemble_mae'] + 0.5
+    assert 0 <= report['early_exit_share'] <= 1
+
+    # Reported on the windows the threshold was not chosen on
+    assert report['n_samples'] == round(len(y) * 0.4)
+    assert report['n_samples'] + calibration['n_samples'] == len(y)
+
+    predictor.cascade = Cascade(report)
+    items = [(x[:, 0].tolist(), float(x[-1, 1])) for x in X[:50]]
+    preds = predictor.predict_batch(items)
+    early = [p for p in preds if p['method'] == 'early_exit']
+    assert len(early) == predictor._batcher.last_stats['early_exits']
+    assert all('lstm_prediction' not in p for p in early)
+    assert predictor.cascade.info()['early_exits'] == len(early)
+
+    # Uncertainty estimates need the LSTM for every prediction
+    assert all(p['method'] != 'early_exit' for p in predictor.predict_batch(items, uncertainty=5))
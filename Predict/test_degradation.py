@@ -0,0 +1,70 @@
+"""
+Test script to verify latency-budget tier selection
+"""
+import time
+
+from config import DEGRADATION_CONFIG
+from degradation import TIERS, LatencyGovernor, request_start_delay
+
+
+def _governor():
+    return LatencyGovernor({**DEGRADATION_CONFIG, 'enabled': True, 'cooldown_seconds': 0.0,
+                            'latency_budget_ms': {'default': 100}})
+
+
+def test_steps_down_under_load_and_back_up():
+    governor = _governor()
+    seen = []
+    for _ in range(30):
+        seen.append(governor.choose('/api/predict/class'))
+        governor.record('/api/predict/class', 0.5)
+    assert seen[0] == 'ensemble'
+    assert seen[-1] == 'simple_average'
+    assert governor.info()['step_downs'] == 2  # One tier at a time
+
+    for _ in range(30):
+        tier = governor.choose('/api/predict/class')
+        governor.record('/api/predict/class', 0.01)
+    assert tier == 'ensemble'
+    info = governor.info()
+    assert info['step_downs'] == 2 and info['step_ups'] == 2 and info['in_flight'] == 0
+
+
+def test_queue_delay_degrades_single_request():
+    governor = _governor()
+    assert governor.choose('/x', queue_delay=0.06) == 'gb_only'
+    assert governor.choose('/x', queue_delay=0.09) == 'simple_average'
+    assert governor.choose('/x') == TIERS[0]
+
+
+def test_request_start_header_units():
+    now = 1_700_000_000.0
+    for header in ['t=1699999999.5', 't=1699999999500', '1699999999500000']:
+        assert abs(request_start_delay(header, now=now) - 0.5) < 1e-6
+    assert request_start_delay(None) == 0.0
+    assert request_start_delay('garbage') == 0.0
+
+
+def test_server_backlog_degrades_new_requests():
+    """Requests waiting for a worker thread count as queueing without any proxy header"""
+    governor = LatencyGovernor({**_governor().config, 'server_threads': 2})
+    governor.choose('/x')
+    governor.record('/x', 0.04)
+    backlog = [0]
+    governor.watch_queue(lambda: backlog[0])
+
+    tiers = []
+    for waiting in (2, 3, 5):
+        backlog[0] = waiting
+        tiers.append(governor.choose('/x'))
+    assert tiers == ['ensemble', 'gb_only', 'simple_average']
+    assert abs(governor.info()['backlog_delay_ms'] - 100) < 1e-6
+
+
+def test_requests_in_flight_beyond_the_server_threads_count_as_backlog():
+    governor = LatencyGovernor({**_governor().config, 'server_threads': 2})
+    governor.choose('/x')
+    governor.record('/x', 0.045)
+    # Without a queue probe, every request beyond the two threads waits for one
+    tiers = [governor.choose('/x') for _ in range(7)]
+    assert tiers == ['ensemble'] * 4 + ['gb_only'] + ['simple_average'] * 2
@@ -0,0 +1,39 @@
+"""
+Test script to verify ensemble calibration from cached out-of-fold predictions
+"""
+import numpy as np
+
+from ensemble import (
+    DEFAULT_ENSEMBLE, ensemble_mark, fit_ensemble, fit_weights, load_ensemble, load_oof, save_ensemble, save_oof
+)
+from train_model import OLGradePredictor
+
+
+def test_default_ensemble_is_the_original_blend():
+    lstm, gb, factor = np.array([70.0, 40.0]), np.array([60.0, 50.0]), np.array([1.0, 0.5])
+    expected = np.clip((lstm * 0.6 + gb * 0.4) * (0.8 + 0.2 * factor), 0, 100)
+    assert np.allclose(OLGradePredictor().blend(lstm, gb, factor), expected)
+    assert np.allclose(ensemble_mark(DEFAULT_ENSEMBLE, None, gb, factor), gb * (0.8 + 0.2 * factor))
+
+
+def test_refit_from_oof_cache(tmp_path):
+    rng = np.random.default_rng(0)
+    y = rng.uniform(30, 90, 2000)
+    lstm = y + rng.normal(0, 2, len(y))
+    gb = y + rng.normal(0, 6, len(y))
+    factors = rng.uniform(0.5, 1.0, len(y))
+    save_oof(str(tmp_path), lstm, gb, factors, y, ['holdout'] * len(y))
+
+    oof = load_oof(str(tmp_path))
+    assert fit_weights(oof['lstm'], oof['gb'], oof['attendance_factor'], oof['y'])['lstm_weight'] > 0.8
+
+    params, report = fit_ensemble(oof, modes=['default', 'weights', 'stacking'])
+    assert report['chosen'] != 'default'
+    assert report['cv_mae'][report['chosen']] < report['cv_mae']['default']
+
+    save_ensemble(str(tmp_path), params, report)
+    predictor = OLGradePredictor()
+    default_version = predictor.model_version
+    predictor.ensemble = load_ensemble(str(tmp_path))
+    assert predictor.ensemble == params
+    assert predictor.model_version != default_version
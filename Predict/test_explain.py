@@ -0,0 +1,45 @@
+"""
+Test script to verify batched per-mark explanations of predictions
+"""
+import numpy as np
+
+from ensemble import DEFAULT_ENSEMBLE, ensemble_coefficients, ensemble_mark
+
+
+def test_ensemble_coefficients_reproduce_ensemble_mark():
+    lstm, gb, factors = np.array([55.0, 72.0]), np.array([60.0, 70.0]), np.array([0.8, 1.0])
+    stacking = {**DEFAULT_ENSEMBLE, 'mode': 'stacking', 'coef': [2.0, 0.5, 0.4, -1.0, 0.05, 0.02]}
+    for params in (DEFAULT_ENSEMBLE, stacking):
+        k, a_lstm, a_gb = ensemble_coefficients(params, factors)
+        assert np.allclose(k + a_lstm * lstm + a_gb * gb, ensemble_mark(params, lstm, gb, factors))
+    k, a_lstm, a_gb = ensemble_coefficients(stacking, factors, has_gb=False)
+    assert np.allclose(k + a_lstm * lstm, ensemble_mark(stacking, lstm, None, factors))
+    assert np.all(a_gb == 0)
+
+
+def test_explanations_add_up_to_the_prediction(tiny_predictor):
+    predictor, X, _ = tiny_predictor
+    from explain import PredictionExplainer
+
+    # GB path attribution is exact
+    explainer = PredictionExplainer(predictor)
+    X_flat = X[:20].reshape(20, -1)
+    base, contributions = explainer.gb_attributions(X_flat)
+    assert np.allclose(base + contributions.sum(axis=1), predictor.gb_model.predict(X_flat))
+
+    items = [(x[:, 0].tolist(), float(x[-1, 1])) for x in X[:20]] + [([70, 75], 90.0)]
+    preds = predictor.predict_batch(items, explain=8)
+    stats = predictor._explainer.last_stats
+    assert stats['items'] == len(items) and stats['explained'] == len(items) - 1
+    assert stats['model_calls'] == 1 and stats['steps'] == 8
+
+    for (marks, _), pred in zip(items[:-1], preds):
+        explanation = pred['explanation']
+        assert [m['mark'] for m in explanation['marks']] == marks[-len(explanation['marks']):]
+        assert explanation['marks'][-1]['exams_ago'] == 1
+        explained = explanation['base_value'] + explanation['attendance'] + sum(
+            m['contribution'] for m in explanation['marks'])
+        assert abs(explained + explanation['residual'] - pred['predicted_mark']) < 1e-6
+        assert abs(explanation['residual']) < 2.0
+    # Too short for the model window: no model output to explain
+    assert 'explanation' not in preds[-1]
@@ -0,0 +1,78 @@
+"""
+Test script to verify batched multi-horizon forecasts against step-by-step predictions
+"""
+import numpy as np
+import pytest
+
+from forecast import forecast_horizon, forecast_students, rollout
+from train_model import OLGradePredictor
+
+
+def test_trajectories_match_repeated_predictions():
+    predictor = OLGradePredictor()
+    students = [
+        {'subjects': [{'name': 'Mathematics', 'marks': [60, 65, 70]}, {'name': 'ICT', 'marks': [40, 45]}],
+         'attendance': 70},
+        {'subjects': []},
+        {'subjects': [{'name': 'Mathematics', 'marks': [80, 85]}]}
+    ]
+    result = forecast_students(predictor, students, horizon=4, tier='simple_average')
+
+    assert result['steps'] == [1, 2, 3, 4]
+    assert result['total_predictions'] == 3 * 4 and result['batched_calls'] == 4
+    for s, student in enumerate(students):
+        trajectories = []
+        for subject in student['subjects']:
+            history, expected = list(subject['marks']), []
+            for _ in range(4):
+                mark = predictor.simple_average_prediction(history, student.get('attendance', 100))['predicted_mark']
+                expected.append(mark)
+                history.append(mark)
+            forecast = result['students'][s]['subjects'][subject['name']]
+            assert np.allclose(forecast['predicted_mark'], expected)
+            assert forecast['predicted_grade'] == [predictor.mark_to_grade(m) for m in expected]
+            trajectories.append(expected)
+        expected_avg = np.mean(trajectories, axis=0) if trajectories else np.zeros(4)
+        assert np.allclose(result['students'][s]['overall_average'], expected_avg)
+    assert result['students'][1]['risk_level'] == ['HIGH'] * 4
+
+
+def test_ensemble_trajectories_match_repeated_predictions(loaded_predictor):
+    students = [
+        {'subjects': [{'name': 'Mathematics', 'marks': [60, 65, 70, 72, 75, 78]},
+                      {'name': 'ICT', 'marks': [40, 45]}], 'attendance': 70},
+        {'subjects': [{'name': 'Science', 'marks': [80, 85, 83, 88, 90]}]}
+    ]
+    result = forecast_students(loaded_predictor, students, horizon=3, tier='ensemble')
+
+    for s, student in enumerate(students):
+        trajectories = []
+        for subject in student['subjects']:
+            history, expected = list(subject['marks']), []
+            for _ in range(3):
+                mark = loaded_predictor.predict_next_mark(history, student.get('attendance', 100))['predicted_mark']
+                expected.append(mark)
+                history.append(mark)
+            forecast = result['students'][s]['subjects'][subject['name']]
+            assert np.allclose(forecast['predicted_mark'], expected, atol=1e-3)
+            trajectories.append(forecast['predicted_mark'])
+        assert np.allclose(result['students'][s]['overall_average'], np.mean(trajectories, axis=0))
+
+
+def test_rollout_makes_one_batched_call_per_step():
+    calls = []
+
+    def predict(batch):
+        calls.append(len(batch))
+        return [{'predicted_mark': marks[-1] + 1.0} for marks, _ in batch]
+
+    marks, _ = rollout(predict, [([50], 90), ([70, 71], 80)], 3)
+    assert calls == [2, 2, 2]
+    assert marks.tolist() == [[51, 52, 53], [72, 73, 74]]
+
+
+def test_horizon_validation():
+    assert forecast_horizon(None) >= 1
+    for horizon in (0, 2.5, True, 1000):
+        with pytest.raises(ValueError):
+            forecast_horizon(horizon)
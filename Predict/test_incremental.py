@@ -0,0 +1,52 @@
+"""
+Test script to verify incremental fine-tuning of saved models
+"""
+import os
+import shutil
+
+import joblib
+import numpy as np
+from sklearn.ensemble import GradientBoostingRegressor
+
+from cascade import CALIBRATION_FILE
+from config import INCREMENTAL_CONFIG
+from ensemble import DEFAULT_ENSEMBLE, ENSEMBLE_FILE, save_ensemble
+from train_model import OLGradePredictor
+
+
+def test_incremental_run_starts_clean_and_drops_stale_calibrations(tmp_path, monkeypatch):
+    """Fine-tuning ignores other runs' checkpoints and invalidates what was fit to the old weights"""
+    monkeypatch.setitem(INCREMENTAL_CONFIG, 'epochs', 1)
+    monkeypatch.setitem(INCREMENTAL_CONFIG, 'new_synthetic_students', 30)
+    save_path = str(tmp_path / 'models') + '/'
+    shutil.copytree('models', save_path)
+    save_ensemble(save_path, {**DEFAULT_ENSEMBLE, 'lstm_weight': 0.5, 'gb_weight': 0.5})
+    with open(os.path.join(save_path, CALIBRATION_FILE), 'w') as f:
+        f.write('{"threshold": 1.0, "model_version": "old"}')
+    checkpoint_root = os.path.join(save_path, INCREMENTAL_CONFIG['checkpoint_dir'])
+    os.makedirs(os.path.join(checkpoint_root, 'other_run'))
+    n_features = joblib.load(os.path.join(save_path, 'gb_model.pkl')).n_features_in_
+    rng = np.random.default_rng(0)
+    X_old, y_old = rng.uniform(0, 1, (40, n_features)), rng.uniform(30, 90, 40)
+    joblib.dump({alpha: GradientBoostingRegressor(loss='quantile', alpha=alpha, n_estimators=5).fit(X_old, y_old)
+                 for alpha in (0.1, 0.9)}, os.path.join(save_path, 'gb_quantiles.pkl'))
+
+    predictor = OLGradePredictor()
+    stats = predictor.train_incremental(save_path=save_path)
+
+    assert stats['mode'] == 'incremental'
+    assert stats['epochs_run'] == 1
+    assert 'estimated_time_saved_seconds' in stats
+    assert os.listdir(checkpoint_root) == []
+    assert predictor.ensemble == DEFAULT_ENSEMBLE and predictor.cascade is None
+    for name in (ENSEMBLE_FILE, CALIBRATION_FILE):
+        assert not os.path.exists(os.path.join(save_path, name))
+    assert os.path.exists(os.path.join(save_path, 'replay_buffer.npz'))
+
+    reloaded = OLGradePredictor()
+    assert reloaded.load_models(save_path)
+    assert reloaded.gb_model.n_estimators == stats['gb_trees']
+    assert reloaded.model_version == predictor.model_version
+    assert sorted(reloaded.gb_quantile_models) == [0.1, 0.9]
+    for model in reloaded.gb_quantile_models.values():
+        assert model.n_estimators == 5 + INCREMENTAL_CONFIG['extra_trees']
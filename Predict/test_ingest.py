@@ -0,0 +1,134 @@
+"""
+Test script to verify chunked ingestion of historical exports
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+import ingest
+from config import INGEST_CONFIG, MODEL_CONFIG
+from train_model import OLGradePredictor
+
+
+def _write_exports(tmp_path, shuffle=False):
+    rng = np.random.default_rng(7)
+    rows = []
+    attendance_rows = []
+    for s in range(30):
+        student_id = f"stu{s:03d}"
+        for subject in ('Mathematics', 'Science', 'English'):
+            for exam_id in range(rng.integers(3, 12)):
+                rows.append({
+                    'studentId': student_id,
+                    'subject': subject,
+                    'marks': int(rng.integers(20, 100)),
+                    'year': 2020 + exam_id // 3,
+                    'term': exam_id % 3 + 1,
+                    'examId': exam_id
+                })
+        for day in range(20):
+            attendance_rows.append({
+                'studentId': student_id,
+                'status': 'ABSENT' if day < s % 10 else 'PRESENT'
+            })
+
+    marks = pd.DataFrame(rows)
+    if shuffle:
+        marks = marks.sample(frac=1, random_state=1)
+    marks_path = tmp_path / 'marks.csv'
+    attendance_path = tmp_path / 'attendance.csv'
+    marks.to_csv(marks_path, index=False)
+    pd.DataFrame(attendance_rows).to_csv(attendance_path, index=False)
+    return pd.DataFrame(rows), str(marks_path), str(attendance_path)
+
+
+def _expected_windows(rows, attendance, variable_length=False):
+    predictor = OLGradePredictor()
+    prepare = predictor.prepare_variable_sequences if variable_length else predictor.prepare_sequences
+    X_all, y_all = [], []
+    for (student_id, subject), group in rows.groupby(['studentId', 'subject'], sort=False):
+        marks = group.sort_values(['year', 'term', 'examId'])['marks'].tolist()
+        X, y = prepare(marks, attendance[student_id])
+        if len(X):
+            X_all.append(X)
+            y_all.append(y)
+    return np.concatenate(X_all), np.concatenate(y_all)
+
+
+def _sorted_rows(X, y):
+    flat = np.column_stack([X.reshape(len(X), -1), y])
+    return flat[np.lexsort(flat.T[::-1])]
+
+
+def test_chunked_windows_match_prepare_sequences(tmp_path, monkeypatch):
+    monkeypatch.setitem(INGEST_CONFIG, 'cache_dir', str(tmp_path / 'cache'))
+    rows, marks_path, attendance_path = _write_exports(tmp_path, shuffle=True)
+
+    attendance = ingest.load_attendance(attendance_path, chunk_size=37)
+    assert attendance['stu000'] == 100
+    assert attendance['stu005'] == 75
+
+    X, y = ingest.build_windowed_dataset(marks_path, attendance_path, chunk_size=50)
+    X_expected, y_expected = _expected_windows(rows, attendance)
+
+    assert X.shape == X_expected.shape
+    np.testing.assert_allclose(_sorted_rows(X, y), _sorted_rows(X_expected, y_expected), rtol=1e-5)
+
+
+def test_presorted_export_streams_same_dataset(tmp_path, monkeypatch):
+    monkeypatch.setitem(INGEST_CONFIG, 'cache_dir', str(tmp_path / 'cache'))
+    monkeypatch.setitem(INGEST_CONFIG, 'presorted', True)
+    rows, marks_path, attendance_path = _write_exports(tmp_path)
+
+    X, y = ingest.build_windowed_dataset(marks_path, attendance_path, chunk_size=23, use_cache=False)
+    X_expected, y_expected = _expected_windows(rows, ingest.load_attendance(attendance_path))
+
+    np.testing.assert_allclose(_sorted_rows(X, y), _sorted_rows(X_expected, y_expected), rtol=1e-5)
+
+
+def test_unsorted_export_spills_to_disk_partitions(tmp_path, monkeypatch):
+    """An unsorted export larger than spill_rows is windowed from disk partitions"""
+    monkeypatch.setitem(INGEST_CONFIG, 'spill_rows', 100)
+    monkeypatch.setitem(INGEST_CONFIG, 'spill_partitions', 4)
+    monkeypatch.setattr(ingest.tempfile, 'tempdir', str(tmp_path))
+    rows, marks_path, attendance_path = _write_exports(tmp_path, shuffle=True)
+    attendance = ingest.load_attendance(attendance_path)
+
+    for variable_length in (False, True):
+        builder = ingest.HistoryWindowBuilder(MODEL_CONFIG['sequence_length'], attendance, variable_length=variable_length)
+        for chunk in ingest.iter_chunks(marks_path, chunk_size=37):
+            builder.add_chunk(chunk)
+            assert builder._pending_rows <= 100 + 37
+        assert builder._spills > 1
+        spill_dir = builder._spill_dir
+        X, y = builder.finish()
+        X_expected, y_expected = _expected_windows(rows, attendance, variable_length)
+
+        assert not os.path.exists(spill_dir)
+        assert builder.n_histories == rows.groupby(['studentId', 'subject']).ngroups
+        np.testing.assert_allclose(_sorted_rows(X, y), _sorted_rows(X_expected, y_expected), rtol=1e-5)
+
+
+def test_variable_length_windows_match_prepare_variable_sequences(tmp_path, monkeypatch):
+    monkeypatch.setitem(INGEST_CONFIG, 'cache_dir', str(tmp_path / 'cache'))
+    rows, marks_path, attendance_path = _write_exports(tmp_path, shuffle=True)
+
+    X, y = ingest.build_windowed_dataset(marks_path, attendance_path, chunk_size=50, variable_length=True)
+    X_expected, y_expected = _expected_windows(rows, ingest.load_attendance(attendance_path), variable_length=True)
+
+    assert X.shape == X_expected.shape
+    np.testing.assert_allclose(_sorted_rows(X, y), _sorted_rows(X_expected, y_expected), rtol=1e-5)
+
+
+def test_windowed_dataset_is_cached_by_source_hash(tmp_path, monkeypatch):
+    monkeypatch.setitem(INGEST_CONFIG, 'cache_dir', str(tmp_path / 'cache'))
+    _, marks_path, attendance_path = _write_exports(tmp_path)
+
+    X1, _ = ingest.build_windowed_dataset(marks_path, attendance_path)
+    cached = list((tmp_path / 'cache').iterdir())
+    assert len(cached) == 1
+
+    X2, _ = ingest.build_windowed_dataset(marks_path, attendance_path)
+    np.testing.assert_array_equal(X1, X2)
+    assert list((tmp_path / 'cache').iterdir()) == cached
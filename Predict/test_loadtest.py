@@ -0,0 +1,145 @@
+"""
+Test script to verify load test payloads, statistics and the saturation search
+"""
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pytest
+
+from config import LOADTEST_CONFIG, OL_SUBJECTS
+from loadtest import (
+    ENDPOINTS, LoadGenerator, PayloadFactory, find_saturation, is_saturated, summarize, time_series
+)
+
+
+def _result(finished, latency=0.1, ok=True, kind='student', cache='MISS'):
+    return {'kind': kind, 'scheduled': finished - latency, 'finished': finished, 'latency': latency,
+            'status': 200 if ok else 500, 'ok': ok, 'error': None, 'cache': cache}
+
+
+_SMALL = {**LOADTEST_CONFIG, 'class_size': 2, 'classes_per_bulk': 1, 'payload_pool': 2}
+
+
+def test_payloads_are_seeded_and_shaped_like_the_dashboard():
+    config = {**LOADTEST_CONFIG, 'class_size': 4, 'classes_per_bulk': 2, 'payload_pool': 3}
+    pool = PayloadFactory(config).pool()
+    assert pool == PayloadFactory(config).pool()
+    assert set(pool) == set(ENDPOINTS) and all(len(bodies) == 3 for bodies in pool.values())
+
+    bulk = json.loads(pool['bulk'][0])
+    assert [c['class_id'] for c in bulk['classes']] == ['C000', 'C001']
+    students = [s for c in bulk['classes'] for s in c['students']]
+    assert len(students) == 8 and len({s['student_id'] for s in students}) == 8
+    for student in students:
+        names = [subject['name'] for subject in student['subjects']]
+        assert len(set(names)) == len(names) and set(names) <= set(OL_SUBJECTS)
+        for subject in student['subjects']:
+            assert 3 <= len(subject['marks']) <= 12 and all(0 <= m <= 100 for m in subject['marks'])
+        assert 0 <= student['attendance'] <= 100
+
+    subject = json.loads(pool['subject'][0])
+    assert subject['subject_name'] in OL_SUBJECTS and len(subject['students']) == 4
+    assert set(json.loads(pool['student'][0])) == {'subjects', 'attendance'}
+    with pytest.raises(ValueError):
+        PayloadFactory(config).build('teacher')
+
+
+def test_summarize_percentiles_and_rates():
+    latencies = np.arange(1, 101) / 1000
+    results = [_result(1.0, latency, ok=i >= 5, cache='HIT' if i % 4 == 0 else 'MISS')
+               for i, latency in enumerate(latencies)]
+    summary = summarize(results, duration=10)
+
+    assert summary['requests'] == 100
+    assert summary['cache_hit_rate'] == pytest.approx(0.25)
+    assert summary['throughput'] == pytest.approx(9.5)
+    assert summary['error_rate'] == pytest.approx(0.05)
+    assert summary['p50_ms'] == pytest.approx(50.5)
+    assert summary['p95_ms'] == pytest.approx(95.05)
+    assert summary['p99_ms'] == pytest.approx(99.01)
+    assert summary['max_ms'] == pytest.approx(100)
+    assert summarize([], 10)['p95_ms'] is None
+
+
+def test_requests_are_unique_unless_repeats_are_asked_for():
+    """Bodies repeat only for the configured cache-hit share, so the response cache cannot answer them"""
+    unique = LoadGenerator('http://127.0.0.1:1', {**_SMALL, 'cache_hit_ratio': 0.0})
+    bodies = [unique._next_request()[1] for _ in range(200)]
+    assert len(set(bodies)) == 200
+    assert all(isinstance(json.loads(body), dict) for body in bodies)
+
+    repeated = LoadGenerator('http://127.0.0.1:1', {**_SMALL, 'cache_hit_ratio': 1.0})
+    pooled = {body for kind_bodies in repeated.bodies.values() for body in kind_bodies}
+    assert all(repeated._next_request()[1] in pooled for _ in range(50))
+
+
+def test_send_records_the_cache_header():
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            self.rfile.read(int(self.headers['Content-Length']))
+            self.send_response(200)
+            self.send_header('X-Cache', 'HIT')
+            self.send_header('Content-Length', '2')
+            self.end_headers()
+            self.wfile.write(b'{}')
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        generator = LoadGenerator(f'http://127.0.0.1:{server.server_port}', _SMALL)
+        result = generator.send('student', b'{}', 0.0)
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert result['ok'] and result['cache'] == 'HIT'
+
+
+def test_time_series_buckets_by_completion_time():
+    results = [_result(0.5, 0.2), _result(1.5, 0.4), _result(1.9, 0.6, ok=False), _result(4.2, 0.1)]
+    series = time_series(0.0, results, interval=1)
+
+    assert [row['t'] for row in series] == [0, 1, 2, 3, 4]
+    assert [row['requests'] for row in series] == [1, 2, 0, 0, 1]
+    assert series[1]['throughput'] == 1 and series[1]['error_rate'] == 0.5
+    assert series[1]['p50_ms'] == pytest.approx(500)
+    assert time_series(0.0, [], 1) == []
+
+
+def test_saturation_limits():
+    config = {**LOADTEST_CONFIG, 'max_error_rate': 0.01, 'latency_slo_ms': 500, 'min_throughput_ratio': 0.9}
+    healthy = {'requests': 100, 'error_rate': 0.0, 'p95_ms': 200, 'throughput': 10.0}
+    assert not is_saturated(healthy, 10, config)
+    assert is_saturated({**healthy, 'error_rate': 0.02}, 10, config)
+    assert is_saturated({**healthy, 'p95_ms': 600}, 10, config)
+    assert is_saturated({**healthy, 'throughput': 8.5}, 10, config)
+    assert is_saturated({**healthy, 'requests': 0}, 10, config)
+
+
+class _FakeGenerator:
+    """Server that answers up to capacity requests per second and fails the rest"""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.rates = []
+
+    def run_open(self, rate, duration):
+        self.rates.append(rate)
+        n = int(round(rate * duration))
+        served = int(self.capacity * duration)
+        return 0.0, [_result(duration * (i + 1) / n, 0.05, ok=i < served) for i in range(n)]
+
+
+def test_find_saturation_steps_up_then_bisects():
+    config = {**LOADTEST_CONFIG, 'start_rate': 1.0, 'rate_growth': 2.0, 'step_duration': 10}
+    generator = _FakeGenerator(capacity=5.3)
+    result = find_saturation(generator, config)
+
+    assert generator.rates == [1.0, 2.0, 4.0, 8.0, 6.0, 5.0, 5.5]
+    assert result['max_sustainable_rate'] == 5.0
+    assert result['first_saturated_rate'] == 5.5
+    assert [step['saturated'] for step in result['steps']] == [False, False, False, True, True, False, True]
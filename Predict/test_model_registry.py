@@ -0,0 +1,57 @@
+"""
+Test script to verify model set resolution, lazy loading and LRU eviction
+"""
+import os
+import shutil
+
+import numpy as np
+
+from config import MODEL_REGISTRY_CONFIG
+from model_registry import DEFAULT_MODEL, ModelRegistry
+from train_model import OLGradePredictor
+
+MODELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models')
+
+
+def _registry(tmp_path, names, **config):
+    for name in names:
+        os.makedirs(tmp_path / name)
+        for artifact in ('lstm_model.keras', 'gb_model.pkl', 'scaler.pkl'):
+            shutil.copy(os.path.join(MODELS_DIR, artifact), tmp_path / name / artifact)
+    default = OLGradePredictor()
+    default.load_models(MODELS_DIR)
+    return ModelRegistry(default, {**MODEL_REGISTRY_CONFIG, 'variants_dir': str(tmp_path), 'preload': [],
+                                   **config})
+
+
+def test_resolution_prefers_most_specific_model_set(tmp_path):
+    registry = _registry(tmp_path, ['subject=Mathematics', 'school=S01,subject=Mathematics', 'grade=10'])
+    assert registry.resolve('Mathematics') == 'subject=Mathematics'
+    assert registry.resolve('Mathematics', school='S01') == 'school=S01,subject=Mathematics'
+    assert registry.resolve('Mathematics', grade=10, school='S02') == 'subject=Mathematics'
+    assert registry.resolve('Science', grade=10) == 'grade=10'
+    assert registry.resolve('Science', grade=11) == DEFAULT_MODEL
+    assert registry.info()['loaded'] == []  # Nothing is loaded until used
+
+
+def test_lazy_loading_and_lru_eviction(tmp_path):
+    registry = _registry(tmp_path, ['subject=Mathematics', 'subject=Science'], max_loaded=1)
+    students = [{'subjects': [{'name': 'Mathematics', 'marks': [60, 65, 70, 72, 75]},
+                              {'name': 'Science', 'marks': [50, 55, 58, 60, 62]},
+                              {'name': 'ICT', 'marks': [80, 82, 85, 84, 86]}],
+                 'attendance': 90}]
+
+    routed = registry.predict_students(students)[0]['subject_predictions']
+    assert [p['model'] for p in routed] == ['subject=Mathematics', 'subject=Science', DEFAULT_MODEL]
+
+    # Identical artifacts, so routing must not change the predictions
+    direct = registry.default.predict_students(students)[0]['subject_predictions']
+    assert np.allclose([p['predicted_mark'] for p in routed], [p['predicted_mark'] for p in direct])
+
+    info = registry.info()
+    assert info['loaded'] == ['subject=Science']
+    assert info['models']['subject=Mathematics']['evictions'] == 1
+    assert info['models']['subject=Science']['loads'] == 1
+
+    registry.predict_students(students)
+    assert registry.info()['models']['subject=Mathematics']['loads'] == 2
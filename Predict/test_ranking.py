@@ -0,0 +1,51 @@
+"""
+Test script to verify the percentile ranking index
+"""
+import numpy as np
+
+from ranking import OVERALL, RankingIndex
+
+
+def brute_force_rank(values, value):
+    return int(np.sum(np.asarray(values) > value)) + 1
+
+
+def test_ranks_match_sorting_and_follow_updates():
+    rng = np.random.default_rng(0)
+    index = RankingIndex()
+    marks = {}
+    for i in range(300):
+        marks[i] = (f'C{i % 3}', float(rng.integers(30, 95)))
+        index.update(i, {OVERALL: marks[i][1], 'Mathematics': 100 - marks[i][1]}, marks[i][0], 'S01')
+
+    def check(student):
+        result = index.rank(student)
+        class_key, value = marks[student]
+        class_values = [v for c, v in marks.values() if c == class_key]
+        school_values = [v for _, v in marks.values()]
+        overall = result['rankings'][OVERALL]
+        assert result['class_id'] == class_key
+        assert overall['class']['rank'] == brute_force_rank(class_values, value)
+        assert overall['school']['rank'] == brute_force_rank(school_values, value)
+        assert overall['school']['of'] == 300
+        below = sum(v < value for v in school_values) + 0.5 * sum(v == value for v in school_values)
+        assert overall['school']['percentile'] == round(100 * below / 300, 2)
+        # Reversed subject marks reverse the order
+        assert result['rankings']['Mathematics']['school']['rank'] == 300 - (
+            brute_force_rank(school_values, value) - 1) - (sum(v == value for v in school_values) - 1)
+
+    for student in (0, 7, 150):
+        check(student)
+
+    # A new prediction, and a class change, replace the old values
+    marks[7] = ('C2', 99.0)
+    index.update(7, {OVERALL: 99.0, 'Mathematics': 1.0}, 'C2', 'S01')
+    assert index.rank(7)['rankings'][OVERALL]['school']['rank'] == 1
+    for student in (0, 7, 150):
+        check(student)
+    assert index.info()['students'] == 300
+
+    assert index.rank('unknown') is None
+    assert index.position_of(100, OVERALL, school='S01')['rank'] == 1
+    assert index.position_of(0, OVERALL, 'C0', 'S01')['rank'] == 101
+    assert index.rank(7, 'Mathematics')['rankings'].keys() == {'Mathematics'}
@@ -0,0 +1,65 @@
+"""
+Test script to verify the hierarchical rollup engine against naive counters
+"""
+import numpy as np
+
+from rollup import GRADES, grade_codes, rollup
+from train_model import OLGradePredictor
+
+
+def _random_school(seed=3):
+    rng = np.random.default_rng(seed)
+    student_classes, row_students, row_subjects, row_marks = [], [], [], []
+    for s in range(120):
+        student_classes.append(f"11-{'ABCD'[s % 4]}")
+        # Some students have no predicted subjects at all
+        for subject in rng.choice(['Mathematics', 'Science', 'English', 'ICT'], size=rng.integers(0, 5), replace=False):
+            row_students.append(s)
+            row_subjects.append(str(subject))
+            row_marks.append(float(rng.uniform(0, 100)))
+    return student_classes, row_students, row_subjects, row_marks
+
+
+def test_grade_codes_match_mark_to_grade():
+    predictor = OLGradePredictor()
+    marks = np.array([0, 20, 34.99, 35, 49.9, 50, 64.99, 65, 74.5, 75, 99, 100])
+    assert [GRADES[c] for c in grade_codes(marks)] == [predictor.mark_to_grade(m) for m in marks]
+
+
+def test_rollup_matches_per_student_counters():
+    student_classes, row_students, row_subjects, row_marks = _random_school()
+    result = rollup(student_classes, row_students, row_subjects, row_marks)
+
+    # Naive per-student computation, as the endpoints used to do it
+    per_student = {}
+    for s, mark in zip(row_students, row_marks):
+        per_student.setdefault(s, []).append(mark)
+    averages = [np.mean(per_student[s]) if s in per_student else 0 for s in range(len(student_classes))]
+
+    for class_key in set(student_classes):
+        members = [s for s, c in enumerate(student_classes) if c == class_key]
+        class_avgs = [averages[s] for s in members]
+        summary = result['classes'][class_key]
+        assert summary['total_students'] == len(members)
+        assert np.isclose(summary['average'], np.mean(class_avgs))
+        assert summary['high_risk_count'] == sum(1 for a in class_avgs if a < 50)
+        assert summary['medium_risk_count'] == sum(1 for a in class_avgs if 50 <= a < 65)
+        assert summary['low_risk_count'] == sum(1 for a in class_avgs if a >= 65)
+
+    for subject in set(row_subjects):
+        marks = [m for m, sub in zip(row_marks, row_subjects) if sub == subject]
+        summary = result['subjects'][subject]
+        assert np.isclose(summary['average_predicted'], np.mean(marks))
+        assert summary['grade_distribution']['W'] == sum(1 for m in marks if m < 35)
+        assert np.isclose(summary['pass_rate'], sum(1 for m in marks if m >= 35) / len(marks) * 100)
+
+    assert result['school']['total_students'] == len(student_classes)
+    assert np.isclose(result['school']['average'], np.mean(averages))
+    assert sum(result['school']['grade_distribution'].values()) == len(row_marks)
+
+
+def test_class_subject_cells_sum_to_subject_totals():
+    result = rollup(*_random_school())
+    for subject, summary in result['subjects'].items():
+        cells = [c['subjects'][subject] for c in result['classes'].values() if subject in c['subjects']]
+        assert sum(c['total_predictions'] for c in cells) == summary['total_predictions']
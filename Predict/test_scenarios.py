@@ -0,0 +1,79 @@
+"""
+Test script to verify what-if scenario surfaces against per-scenario predictions
+"""
+import numpy as np
+import pytest
+
+from config import SCENARIO_CONFIG
+from scenarios import attendance_grid, predict_scenarios
+from train_model import OLGradePredictor
+
+
+def test_surfaces_match_individual_predictions():
+    predictor = OLGradePredictor()
+    students = [
+        {'subjects': [{'name': 'Mathematics', 'marks': [60, 65, 70]}, {'name': 'ICT', 'marks': [40, 45]}]},
+        {'subjects': []},
+        {'subjects': [{'name': 'Mathematics', 'marks': [80, 85]}]}
+    ]
+    futures = [[], [70, 70], [30]]
+    result = predict_scenarios(predictor, students, attendance=[35, 70, 95], future_marks=futures,
+                               tier='simple_average')
+
+    assert result['total_predictions'] == 3 * 3 * 3
+    for s, student in enumerate(students):
+        subject_marks = []
+        for subject in student['subjects']:
+            surface = result['students'][s]['subjects'][subject['name']]['predicted_mark']
+            expected = [[predictor.simple_average_prediction(subject['marks'] + f, a)['predicted_mark']
+                         for a in result['attendance']] for f in futures]
+            assert np.allclose(surface, expected)
+            subject_marks.append(expected)
+        expected_avg = np.mean(subject_marks, axis=0) if subject_marks else np.zeros((3, 3))
+        assert np.allclose(result['students'][s]['overall_average'], expected_avg)
+    assert result['students'][1]['risk_level'][0][0] == 'HIGH'
+
+
+def test_ensemble_surfaces_match_individual_predictions(loaded_predictor):
+    students = [
+        {'subjects': [{'name': 'Mathematics', 'marks': [60, 65, 70, 72, 75]}, {'name': 'ICT', 'marks': [40, 45]}]},
+        {'subjects': [{'name': 'Science', 'marks': [80, 85, 83, 88, 90, 91]}]}
+    ]
+    futures = [[], [55, 60]]
+    result = predict_scenarios(loaded_predictor, students, attendance=[35, 95], future_marks=futures,
+                               tier='ensemble')
+
+    for s, student in enumerate(students):
+        surfaces = []
+        for subject in student['subjects']:
+            surface = result['students'][s]['subjects'][subject['name']]
+            expected = [[loaded_predictor.predict_next_mark(subject['marks'] + f, a) for a in result['attendance']]
+                        for f in futures]
+            assert np.allclose(surface['predicted_mark'], [[p['predicted_mark'] for p in row] for row in expected],
+                               atol=1e-4)
+            assert surface['predicted_grade'] == [[p['predicted_grade'] for p in row] for row in expected]
+            surfaces.append(surface['predicted_mark'])
+        assert np.allclose(result['students'][s]['overall_average'], np.mean(surfaces, axis=0))
+
+
+def test_attendance_grid_validation():
+    assert attendance_grid({'start': 60, 'stop': 100, 'steps': 5}).tolist() == [60, 70, 80, 90, 100]
+    with pytest.raises(ValueError):
+        attendance_grid([50, 120])
+    # Oversized grids are rejected before anything is allocated
+    for steps in (1e9, 0, 2.5, True, 'many'):
+        with pytest.raises(ValueError):
+            attendance_grid({'steps': steps})
+    with pytest.raises(ValueError):
+        attendance_grid([80] * (SCENARIO_CONFIG['max_scenarios'] + 1))
+
+
+def test_expansion_is_checked_before_histories_are_expanded(monkeypatch):
+    class NoPredictions(OLGradePredictor):
+        def predict_batch(self, items, **kwargs):
+            raise AssertionError('expanded an oversized grid')
+
+    monkeypatch.setitem(SCENARIO_CONFIG, 'max_items', 50)
+    students = [{'subjects': [{'name': 'Mathematics', 'marks': [60, 65]}, {'name': 'ICT', 'marks': [50]}]}] * 2
+    with pytest.raises(ValueError, match='expands to 84'):
+        predict_scenarios(NoPredictions(), students, attendance={'start': 60, 'stop': 100, 'steps': 21})
@@ -0,0 +1,97 @@
+"""
+Test script to verify the cross-process shared prediction cache
+"""
+import os
+import subprocess
+import sys
+import threading
+
+from config import CASCADE_CONFIG, SHARED_CACHE_CONFIG
+import shared_cache
+from shared_cache import SharedCache, serving_version, stored_model_version
+
+
+def _cache(tmp_path, **overrides):
+    return SharedCache({**SHARED_CACHE_CONFIG, 'path': str(tmp_path / 'cache.sqlite3'), **overrides})
+
+
+def test_entries_survive_restarts_and_other_processes(tmp_path):
+    cache = _cache(tmp_path)
+    assert cache.get('a') is None
+    assert cache.put('a', b'{"x": 1}')
+    assert _cache(tmp_path).get('a') == b'{"x": 1}'
+
+    # Written by another process, read here
+    path = str(tmp_path / 'cache.sqlite3')
+    subprocess.run([sys.executable, '-c', (
+        'from config import SHARED_CACHE_CONFIG; from shared_cache import SharedCache; '
+        f'SharedCache({{**SHARED_CACHE_CONFIG, "path": {path!r}}}).put("b", "from child")'
+    )], check=True)
+    assert cache.get('b') == b'from child'
+    assert cache.info()['stored'] == {'entries': 2, 'bytes': len(b'{"x": 1}') + len(b'from child')}
+
+
+def test_eviction_keeps_recently_used_entries_within_limits(tmp_path):
+    cache = _cache(tmp_path, max_entries=10, max_bytes=1000, touch_interval=0.0)
+    for i in range(10):
+        cache.put(f'k{i}', b'x' * 50)
+    cache.get('k0')
+    cache.put('k10', b'x' * 50)
+
+    stored = cache.info()['stored']
+    assert stored['entries'] <= 10 and stored['bytes'] <= 1000
+    assert cache.get('k0') is not None and cache.get('k10') is not None
+    assert cache.get('k1') is None
+
+    cache.put('big', b'y' * 900)
+    assert cache.info()['stored']['bytes'] <= 1000
+    assert not cache.put('huge', b'z' * (SHARED_CACHE_CONFIG['max_body_bytes'] + 1))
+
+
+def test_concurrent_writers_keep_totals_consistent(tmp_path):
+    cache = _cache(tmp_path, max_entries=50)
+
+    def write(worker):
+        for i in range(40):
+            cache.put(f'{worker}-{i}', b'v' * (i + 1))
+            cache.get(f'{worker}-{i // 2}')
+
+    threads = [threading.Thread(target=write, args=(w,)) for w in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    info = cache.info()
+    assert info['errors'] == 0 and info['writes'] == 160
+    conn = cache._connection()
+    assert info['stored'] == dict(zip(('entries', 'bytes'), conn.execute(
+        'SELECT COUNT(*), SUM(size) FROM entries').fetchone()))
+    assert info['stored']['entries'] <= 50
+
+
+def test_stored_model_version_matches_loaded_models():
+    from train_model import OLGradePredictor
+
+    predictor = OLGradePredictor()
+    assert predictor.load_models()
+    assert stored_model_version() == predictor.model_version
+
+
+def test_serving_version_follows_calibration_and_settings(tmp_path, monkeypatch):
+    models, variants = tmp_path / 'models', tmp_path / 'variants'
+    models.mkdir()
+    base = serving_version(str(models), str(variants))
+    assert serving_version(str(models), str(variants)) == base
+
+    (models / 'cascade.json').write_text('{"threshold": 1.0}')
+    calibrated = serving_version(str(models), str(variants))
+    (models / 'cascade.json').write_text('{"threshold": 2.0}')
+    recalibrated = serving_version(str(models), str(variants))
+    (variants / 'subject=ICT').mkdir(parents=True)
+    (variants / 'subject=ICT' / 'cascade.json').write_text('{"threshold": 1.0}')
+    with_variant = serving_version(str(models), str(variants))
+    assert len({base, calibrated, recalibrated, with_variant}) == 4
+
+    monkeypatch.setitem(CASCADE_CONFIG, 'enabled', not CASCADE_CONFIG['enabled'])
+    assert serving_version(str(models), str(variants)) != with_variant
@@ -0,0 +1,61 @@
+"""
+Test script to verify single-flight coalescing of concurrent identical calls
+"""
+import threading
+import time
+
+import pytest
+
+from single_flight import SingleFlight
+
+
+def _run_concurrently(flight, key, fn, n):
+    results = [None] * n
+
+    def call(i):
+        try:
+            results[i] = flight.do(key, fn)
+        except Exception as e:
+            results[i] = e
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+
+def test_concurrent_calls_share_one_computation():
+    flight = SingleFlight()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.2)
+        return b'body'
+
+    results = _run_concurrently(flight, 'key', compute, 8)
+    assert len(calls) == 1
+    assert all(body == b'body' for body, _ in results)
+    assert sum(shared for _, shared in results) == 7
+    info = flight.info()
+    assert info['computations'] == 1 and info['coalesced'] == 7 and info['in_flight'] == 0
+
+    # Once finished, the next call computes again
+    assert flight.do('key', compute) == (b'body', False)
+    assert len(calls) == 2
+
+
+def test_leader_error_reaches_followers():
+    flight = SingleFlight()
+
+    def fail():
+        time.sleep(0.2)
+        raise ValueError('boom')
+
+    results = _run_concurrently(flight, 'key', fail, 4)
+    assert all(isinstance(r, ValueError) for r in results)
+    assert flight.info()['errors'] == 1
+    with pytest.raises(ValueError):
+        flight.do('key', fail)
@@ -0,0 +1,50 @@
+"""
+Test script to verify the sweep runner trials, trial cache and keys
+"""
+import os
+
+import config
+import sweep
+
+
+def _tuning(tmp_path):
+    return {
+        **config.TUNING_CONFIG,
+        'search': 'grid',
+        'n_folds': 2,
+        'epochs': 1,
+        'n_students': 60,
+        'workers': 1,
+        'threads_per_worker': 1,
+        'cache_dir': str(tmp_path / 'sweep_cache'),
+        'leaderboard_path': str(tmp_path / 'sweep_cache' / 'leaderboard.json'),
+        'space': {'lstm_units': [8, 16]}
+    }
+
+
+def test_sweep_runs_and_resumes_from_cache(tmp_path, capsys):
+    """Two one-epoch trials on synthetic data; a second run is served from the trial cache"""
+    tuning = _tuning(tmp_path)
+    leaderboard = sweep.run_sweep(tuning=tuning)
+
+    assert sorted(entry['params']['lstm_units'] for entry in leaderboard) == [8, 16]
+    assert leaderboard[0]['ensemble_mae'] <= leaderboard[1]['ensemble_mae']
+    for entry in leaderboard:
+        assert len(entry['fold_ensemble_maes']) == 2
+        assert os.path.exists(os.path.join(tuning['cache_dir'], f"trial_{entry['key']}.json"))
+    assert os.path.exists(tuning['leaderboard_path'])
+
+    capsys.readouterr()
+    assert sweep.run_sweep(tuning=tuning) == leaderboard
+    assert '2 cached, 0 to run' in capsys.readouterr().out
+
+
+def test_trial_key_covers_settings_outside_the_space(tmp_path, monkeypatch):
+    """Changing a setting the sweep does not vary must not reuse old trials"""
+    tuning = _tuning(tmp_path)
+    params = {'lstm_units': 8}
+    key = sweep.trial_key(params, 'data', tuning)
+    assert sweep.trial_key(params, 'data', tuning) == key
+
+    monkeypatch.setitem(config.MODEL_CONFIG, 'dropout_rate', config.MODEL_CONFIG['dropout_rate'] + 0.1)
+    assert sweep.trial_key(params, 'data', tuning) != key
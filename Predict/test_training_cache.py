@@ -0,0 +1,48 @@
+"""
+Test script to verify training fingerprints and artifact cache hits
+"""
+import json
+
+import pytest
+
+from config import ENSEMBLE_CONFIG, INFERENCE_CONFIG, UNCERTAINTY_CONFIG
+from train_model import OLGradePredictor
+from training_cache import TrainingCache
+
+
+def _store(cache, save_path, fingerprint):
+    save_path.mkdir(exist_ok=True)
+    with open(save_path / 'model_config.json', 'w') as f:
+        json.dump({'fingerprint': fingerprint, 'metrics': {'lstm_mae': 5.0}}, f)
+    cache.store_artifacts(fingerprint, str(save_path))
+
+
+@pytest.mark.parametrize('config, key, value', [
+    (UNCERTAINTY_CONFIG, 'gb_quantiles', not UNCERTAINTY_CONFIG['gb_quantiles']),
+    (ENSEMBLE_CONFIG, 'auto_fit', not ENSEMBLE_CONFIG['auto_fit']),
+    (INFERENCE_CONFIG, 'max_history', INFERENCE_CONFIG['max_history'] + 1)
+])
+def test_changed_settings_miss_the_artifact_cache(tmp_path, monkeypatch, config, key, value):
+    cache = TrainingCache(str(tmp_path / 'cache'))
+    _, fingerprint = OLGradePredictor().training_fingerprint()
+    _store(cache, tmp_path / 'trained', fingerprint)
+    assert cache.restore_artifacts(fingerprint, str(tmp_path / 'models')) == {'lstm_mae': 5.0}
+
+    monkeypatch.setitem(config, key, value)
+    _, changed = OLGradePredictor().training_fingerprint()
+    assert changed != fingerprint
+    assert cache.restore_artifacts(changed, str(tmp_path / 'models')) is None
+
+
+def test_restore_removes_artifacts_the_stored_set_lacks(tmp_path):
+    """Optional artifacts of another run left in save_path are not served under the restored fingerprint"""
+    cache = TrainingCache(str(tmp_path / 'cache'))
+    _store(cache, tmp_path / 'trained', 'run-a')
+    models = tmp_path / 'models'
+    models.mkdir()
+    for name in ('gb_quantiles.pkl', 'ensemble.json', 'oof_predictions.npz', 'replay_buffer.npz'):
+        (models / name).write_text('other run')
+    (models / 'model_config.json').write_text('{"fingerprint": "run-b"}')
+
+    assert cache.restore_artifacts('run-a', str(models)) == {'lstm_mae': 5.0}
+    assert sorted(p.name for p in models.iterdir()) == ['model_config.json']
@@ -0,0 +1,29 @@
+"""
+Test script to verify the parallel training pipeline
+"""
+import numpy as np
+
+from config import TRAINING_CONFIG
+from training_pipeline import TrainingPipeline
+
+
+def test_worker_fit_matches_inline_fit():
+    rng = np.random.default_rng(0)
+    X, y = rng.uniform(0, 100, (300, 10)), rng.uniform(0, 100, 300)
+    params = {'n_estimators': 20, 'max_depth': 3, 'random_state': 42}
+
+    fitted = {}
+    for parallel in (True, False):
+        pipeline = TrainingPipeline({**TRAINING_CONFIG, 'parallel': parallel, 'gb_workers': 1})
+        try:
+            job = pipeline.submit_gb('gb', X, y, params)
+            with pipeline.stage('lstm'):
+                pass
+            fitted[parallel] = pipeline.gb_result(job)
+        finally:
+            pipeline.close()
+        report = pipeline.report()
+        assert set(report['stages']) >= {'gb', 'lstm'} and report['parallel'] == parallel
+        assert ('gb_wait' in report['stages']) == parallel
+
+    assert np.allclose(fitted[True].predict(X), fitted[False].predict(X))
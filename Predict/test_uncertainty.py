@@ -0,0 +1,26 @@
+"""
+Test script to verify batched MC dropout uncertainty estimates
+"""
+import numpy as np
+
+
+def test_uncertainty_in_one_tiled_batch(tiny_predictor):
+    predictor, _, _ = tiny_predictor
+    rng = np.random.default_rng(0)
+    items = [(rng.uniform(30, 90, n).tolist(), 80.0) for n in [2, 5, 6, 8, 10]]
+
+    point = predictor.predict_batch(items)
+    preds = predictor.predict_batch(items, uncertainty=20)
+    stats = predictor._uncertainty.last_stats
+
+    # Point predictions are unchanged; only model-based ones get an estimate
+    assert [p['predicted_mark'] for p in preds] == [p['predicted_mark'] for p in point]
+    assert 'uncertainty' not in preds[0]
+    assert stats['model_calls'] == 1 and stats['model_rows'] == 4 * 20
+
+    for pred in preds[1:]:
+        estimate = pred['uncertainty']
+        assert estimate['samples'] == 20
+        assert 0 <= estimate['interval']['lower'] <= estimate['interval']['upper'] <= 100
+        assert estimate['gb_interval']['lower'] <= estimate['gb_interval']['upper']
+        assert np.isclose(sum(estimate['grade_probabilities'].values()), 1.0)
@@ -12,16 +12,55 @@ from sklearn.ensemble import GradientBoostingRegressor
 from sklearn.preprocessing import StandardScaler
 from sklearn.model_selection import train_test_split
 import joblib
+import hashlib
 import json
 import os
-from config import MODEL_CONFIG, GRADE_BOUNDARIES, ATTENDANCE_WEIGHTS
+import shutil
+import time
+from config import (
+    MODEL_CONFIG, GB_CONFIG, GRADE_BOUNDARIES, ATTENDANCE_WEIGHTS,
+    TUNING_CONFIG, INCREMENTAL_CONFIG, TRAINING_CACHE_CONFIG, INFERENCE_CONFIG,
+    UNCERTAINTY_CONFIG, ENSEMBLE_CONFIG, INGEST_CONFIG
+)
+from training_cache import TrainingCache, artifact_digest, code_version, data_source_hash, digest
+from training_pipeline import TrainingPipeline, print_report as print_pipeline_report
+from cascade import CALIBRATION_FILE, Cascade
+from ensemble import (
+    DEFAULT_ENSEMBLE, OOF_FILE, ensemble_mark, fit_ensemble, kfold_oof, load_ensemble,
+    print_report as print_ensemble_report, save_ensemble, save_oof
+)
 
 class OLGradePredictor:
-    def __init__(self):
+    def __init__(self, model_config=None, gb_config=None):
         self.lstm_model = None
         self.gb_model = None
+        self.gb_quantile_models = {}
+        self.ensemble = dict(DEFAULT_ENSEMBLE)
         self.scaler = StandardScaler()
-        self.sequence_length = MODEL_CONFIG['sequence_length']
+
+        # Explicit overrides win over a promoted tuned config, which wins over config.py
+        tuned = self._load_tuned_config()
+        self.model_config = {**MODEL_CONFIG, **tuned.get('model', {}), **(model_config or {})}
+        self.gb_config = {**GB_CONFIG, **tuned.get('gb', {}), **(gb_config or {})}
+        self.sequence_length = self.model_config['sequence_length']
+
+        # Identity of the training run that produced the current artifacts
+        self.fingerprint = None
+        self.metrics = {}
+        self._artifact_version = None
+        self._batcher = None
+        self._uncertainty = None
+        self._explainer = None
+        self.cascade = None
+
+    @staticmethod
+    def _load_tuned_config():
+        """Load hyperparameters promoted by the sweep runner, if any"""
+        path = TUNING_CONFIG['promoted_config_path']
+        if not os.path.exists(path):
+            return {}
+        with open(path) as f:
+            return json.load(f)
         
     def mark_to_grade(self, mark):
         """Convert numerical mark to O/L grade"""
@@ -43,22 +82,52 @@ class OLGradePredictor:
                 return weight
         return 0.5  # Critical default
     
+    @property
+    def model_version(self):
+        """Identifier of the current artifacts: training fingerprint, else a file digest"""
+        version = self.fingerprint or self._artifact_version
+        if self.ensemble != DEFAULT_ENSEMBLE:
+            # A refit ensemble changes predictions without retraining
+            return digest([version, self.ensemble])
+        return version
+
+    @staticmethod
+    def _artifact_digest(model_path):
+        return artifact_digest(model_path)
+
+    @property
+    def input_length(self):
+        """Timesteps per training window (padded length for variable-length models)"""
+        if self.model_config.get('variable_length'):
+            return INFERENCE_CONFIG['max_history']
+        return self.sequence_length
+
     def create_lstm_model(self, input_shape):
         """Create LSTM-based neural network"""
-        model = models.Sequential([
-            layers.LSTM(MODEL_CONFIG['lstm_units'], 
-                       return_sequences=True, 
-                       input_shape=input_shape),
-            layers.Dropout(MODEL_CONFIG['dropout_rate']),
+        if self.model_config.get('variable_length'):
+            # Any number of timesteps, left padding is skipped by the mask
+            input_layers = [
+                layers.Masking(mask_value=INFERENCE_CONFIG['pad_value'],
+                               input_shape=(None, input_shape[-1])),
+                layers.LSTM(self.model_config['lstm_units'], return_sequences=True)
+            ]
+        else:
+            input_layers = [
+                layers.LSTM(self.model_config['lstm_units'], 
+                           return_sequences=True, 
+                           input_shape=input_shape)
+            ]
+        model = models.Sequential(input_layers + [
+            layers.Dropout(self.model_config['dropout_rate']),
             layers.LSTM(64, return_sequences=False),
-            layers.Dropout(MODEL_CONFIG['dropout_rate']),
+            layers.Dropout(self.model_config['dropout_rate']),
             layers.Dense(32, activation='relu'),
             layers.Dense(16, activation='relu'),
             layers.Dense(1, activation='linear')
         ])
         
         model.compile(
-            optimizer=keras.optimizers.Adam(learning_rate=MODEL_CONFIG['learning_rate']),
+            optimizer=keras.optimizers.Adam(learning_rate=self.model_config['learning_rate']),
             loss='mse',
             metrics=['mae']
         )
@@ -80,6 +149,26 @@ class OLGradePredictor:
         
         return np.array(sequences), np.array(targets)
     
+    def prepare_variable_sequences(self, marks_history, attendance):
+        """Prepare full-history prefixes, left-padded to max_history, for a masked LSTM"""
+        min_history = INFERENCE_CONFIG['min_history']
+        max_history = INFERENCE_CONFIG['max_history']
+        pad = INFERENCE_CONFIG['pad_value']
+        sequences = []
+        targets = []
+        
+        for t in range(min_history, len(marks_history)):
+            seq = marks_history[max(0, t - max_history):t]
+            padded = [[pad, pad]] * (max_history - len(seq)) + [[mark, attendance] for mark in seq]
+            sequences.append(padded)
+            targets.append(marks_history[t])
+        
+        return np.array(sequences), np.array(targets)
+    
+    def gb_features(self, X):
+        """Flatten the last sequence_length timesteps into GB features"""
+        return X[:, -self.sequence_length:, :].reshape(len(X), -1)
+    
     def generate_synthetic_data(self, n_students=1000):
         """Generate synthetic training data for model training"""
         print("Generating synthetic training data...")
@@ -115,29 +204,449 @@ class OLGradePredictor:
                 marks.append(mark)
             
             # Create sequences
-            if len(marks) > self.sequence_length:
+            if self.model_config.get('variable_length'):
+                seqs, targets = self.prepare_variable_sequences(marks, attendance)
+                all_sequences.extend(seqs)
+                all_targets.extend(targets)
+            elif len(marks) > self.sequence_length:
                 seqs, targets = self.prepare_sequences(marks, attendance)
                 all_sequences.extend(seqs)
                 all_targets.extend(targets)
         
         return np.array(all_sequences), np.array(all_targets)
     
-    def train_models(self, save_path='models/'):
-        """Train both LSTM and Gradient Boosting models"""
+    def load_training_data(self, marks_path=None, attendance_path=None):
+        """Load real historical exports if given, otherwise synthetic data"""
+        if marks_path:
+            from ingest import build_windowed_dataset
+            X, y = build_windowed_dataset(
+                marks_path, attendance_path, sequence_length=self.sequence_length,
+                variable_length=bool(self.model_config.get('variable_length'))
+            )
+            if len(X) == 0:
+                raise ValueError(
+                    f"No histories longer than {self.sequence_length} marks found in {marks_path}"
+                )
+            return X, y
+        return self.generate_synthetic_data(n_students=self.model_config['synthetic_students'])
+
+    def attendance_factors(self, X):
+        """Attendance factor of each window's latest attendance"""
+        return np.array([self.calculate_attendance_factor(a) for a in X[:, -1, 1]])
+
+    def training_fingerprint(self, marks_path=None, attendance_path=None):
+        """Fingerprint of config + data source + code version for a training run"""
+        data_hash = data_source_hash(
+            marks_path, attendance_path,
+            n_students=self.model_config['synthetic_students'],
+            seed=self.model_config['seed']
+        )
+        return data_hash, digest({
+            'model': self.model_config,
+            'gb': self.gb_config,
+            # Other settings that shape the artifacts: quantile models, ensemble
+            # fit, variable-length windows, export parsing, attendance factors
+            'settings': {
+                'uncertainty': UNCERTAINTY_CONFIG,
+                'ensemble': ENSEMBLE_CONFIG,
+                'inference': INFERENCE_CONFIG,
+                'ingest': INGEST_CONFIG,
+                'attendance_weights': ATTENDANCE_WEIGHTS
+            },
+            'data': data_hash,
+            'code': code_version()
+        })
+
+    def train_models(self, save_path='models/', marks_path=None, attendance_path=None,
+                     use_cache=None):
+        """
+        Train both LSTM and Gradient Boosting models
+
+        Training is seeded, so a run whose fingerprint matches stored
+        artifacts returns them without retraining. The generated dataset and
+        the GB model are cached separately and reused when only other parts
+        of the config change. GB models fit in worker processes while the
+        LSTM trains (TRAINING_CONFIG); stage times go to training_stats.json.
+
+        Args:
+            save_path: Directory to write the trained models to
+            marks_path: Optional CSV/Parquet export of real exam results
+            attendance_path: Optional CSV/Parquet export of attendance records
+            use_cache: Override TRAINING_CACHE_CONFIG['enabled']
+
+        Returns:
+            tuple: (history, lstm_mae, gb_score); history is None on a cache hit
+        """
         print("Training O/L Grade Prediction Models...")
+        start = time.time()
+
+        if use_cache is None:
+            use_cache = TRAINING_CACHE_CONFIG['enabled']
+        cache = TrainingCache() if use_cache else None
+        seed = self.model_config['seed']
+        data_hash, self.fingerprint = self.training_fingerprint(marks_path, attendance_path)
+
+        if cache:
+            metrics = cache.restore_artifacts(self.fingerprint, save_path)
+            if metrics is not None and self.load_models(save_path):
+                print(f"Artifacts for fingerprint {self.fingerprint[:12]} already exist, skipping training")
+                return None, metrics['lstm_mae'], metrics['gb_r2_score']
+
+        # GB workers start now so their start-up overlaps data preparation
+        pipeline = TrainingPipeline()
+        try:
+            history, lstm_mae, gb_score, n_samples = self._train_stages(
+                pipeline, cache, save_path, seed, data_hash, marks_path, attendance_path
+            )
+        finally:
+            pipeline.close()
         
-        # Generate training data
-        X, y = self.generate_synthetic_data(n_students=2000)
+        report = pipeline.report()
+        print_pipeline_report(report)
+        self._save_training_stats(save_path, {
+            'mode': 'full',
+            'n_samples': n_samples,
+            'epochs_run': len(history.history['loss']),
+            'seconds': time.time() - start,
+            'pipeline': report
+        })
         
-        print(f"Training data shape: {X.shape}, Target shape: {y.shape}")
+        print(f"\nModels saved to {save_path}")
         
-        # Split data
-        X_train, X_test, y_train, y_test = train_test_split(
-            X, y, test_size=0.2, random_state=42
-        )
+        return history, lstm_mae, gb_score
+
+    def _train_stages(self, pipeline, cache, save_path, seed, data_hash, marks_path, attendance_path):
+        """Timed stages of train_models; GB fits run in pipeline workers during the LSTM fit"""
+        # Seed every source of randomness so identical inputs give identical models
+        np.random.seed(seed)
+        keras.utils.set_random_seed(seed)
+
+        with pipeline.stage('data'):
+            # Load training data (exports are already cached by ingest)
+            dataset_key = digest({
+                'data': data_hash,
+                'sequence_length': self.sequence_length,
+                # Variable-length windows are padded histories, not fixed windows
+                'variable_length': bool(self.model_config.get('variable_length')),
+                'windows': {key: INFERENCE_CONFIG[key] for key in ('min_history', 'max_history', 'pad_value')},
+                'code': code_version()
+            })
+            cached = cache.load_dataset(dataset_key) if cache and not marks_path else None
+            if cached is not None:
+                print("Reusing cached training dataset")
+                X, y = cached
+            else:
+                X, y = self.load_training_data(marks_path, attendance_path)
+                if cache and not marks_path:
+                    cache.save_dataset(dataset_key, X, y)
+            
+            print(f"Training data shape: {X.shape}, Target shape: {y.shape}")
+            
+            # Split data
+            X_train, X_test, y_train, y_test = train_test_split(
+                X, y, test_size=0.2, random_state=seed
+            )
+            # Without k-fold OOF predictions the ensemble is fit on a validation
+            # split the base models do not train on; the test split only measures
+            X_fit, y_fit, X_val, y_val = X_train, y_train, None, None
+            if ENSEMBLE_CONFIG['oof_folds'] <= 1 and ENSEMBLE_CONFIG['validation_split']:
+                X_fit, X_val, y_fit, y_val = train_test_split(
+                    X_train, y_train, test_size=ENSEMBLE_CONFIG['validation_split'], random_state=seed
+                )
+            X_flat_train = self.gb_features(X_fit)
+            X_flat_test = self.gb_features(X_test)
+        
+        # Gradient Boosting models (flattened features) start first, so they
+        # fit in the workers while the LSTM trains below
+        gb_key = digest({
+            'dataset': dataset_key,
+            'gb': self.gb_config,
+            'split_seed': seed,
+            'fit_rows': len(y_fit),
+            'code': code_version()
+        })
+        self.gb_model = cache.load_gb(gb_key) if cache else None
+        gb_job = None
+        if self.gb_model is not None:
+            print("Reusing cached Gradient Boosting model")
+        else:
+            print("\nTraining Gradient Boosting Model...")
+            gb_job = pipeline.submit_gb('gb', X_flat_train, y_fit, self.gb_config)
+        
+        # Quantile GB models for prediction interval bounds
+        self.gb_quantile_models = {}
+        quantile_jobs = {}
+        if UNCERTAINTY_CONFIG['gb_quantiles']:
+            quantile_key = digest({'gb': gb_key, 'interval': UNCERTAINTY_CONFIG['interval']})
+            cached_quantiles = cache.load_gb(quantile_key) if cache else None
+            if cached_quantiles is not None:
+                self.gb_quantile_models = cached_quantiles
+            else:
+                print("\nTraining Gradient Boosting quantile models...")
+                quantile_jobs = {
+                    alpha: pipeline.submit_gb(f'gb_quantile_{alpha:g}', X_flat_train, y_fit, params)
+                    for alpha, params in self.gb_quantile_params().items()
+                }
         
         # Train LSTM Model
         print("\nTraining LSTM Model...")
+        if pipeline.parallel and not pipeline.limit_lstm_threads():
+            print("TensorFlow already running, LSTM keeps its thread pool")
+        with pipeline.stage('lstm'):
+            history = self.fit_lstm(X_fit, y_fit)
+            
+            # Evaluate LSTM
+            lstm_loss, lstm_mae = self.lstm_model.evaluate(X_test, y_test, verbose=0)
+        print(f"LSTM Test MAE: {lstm_mae:.2f}")
+        
+        if gb_job:
+            self.gb_model = pipeline.gb_result(gb_job)
+            if cache:
+                cache.save_gb(gb_key, self.gb_model)
+        gb_score = self.gb_model.score(X_flat_test, y_test)
+        print(f"Gradient Boosting R² Score: {gb_score:.4f}")
+        if quantile_jobs:
+            self.gb_quantile_models = {alpha: pipeline.gb_result(job) for alpha, job in quantile_jobs.items()}
+            if cache:
+                cache.save_gb(quantile_key, self.gb_quantile_models)
+        
+        with pipeline.stage('ensemble'):
+            # Base model predictions on rows they were not trained on, cached so the
+            # ensemble combination can be refit without retraining (see ensemble.py)
+            oof = None
+            if ENSEMBLE_CONFIG['oof_folds'] > 1:
+                fold_lstm, fold_gb = kfold_oof(self, X_train, y_train, seed=seed)
+                oof = {'lstm': fold_lstm, 'gb': fold_gb, 'X': X_train, 'y': y_train,
+                       'source': ['kfold'] * len(y_train)}
+            elif X_val is not None:
+                oof = {
+                    'lstm': self.lstm_model.predict(X_val, verbose=0).ravel(),
+                    'gb': self.gb_model.predict(self.gb_features(X_val)),
+                    'X': X_val,
+                    'y': y_val,
+                    'source': ['validation'] * len(y_val)
+                }
+            if oof is not None:
+                oof['attendance_factor'] = self.attendance_factors(oof.pop('X'))
+            self.ensemble, ensemble_report = dict(DEFAULT_ENSEMBLE), None
+            if ENSEMBLE_CONFIG['auto_fit'] and oof is not None:
+                self.ensemble, ensemble_report = fit_ensemble(oof, seed=seed)
+            
+            # Measured on the test split, which neither the base models nor the combination saw
+            test_lstm = self.lstm_model.predict(X_test, verbose=0).ravel()
+            test_gb = self.gb_model.predict(X_flat_test)
+            test_factors = self.attendance_factors(X_test)
+            test_mae = {
+                name: float(np.mean(np.abs(ensemble_mark(params, test_lstm, test_gb, test_factors) - y_test)))
+                for name, params in (('chosen', self.ensemble), ('default', DEFAULT_ENSEMBLE))
+            }
+            if ensemble_report:
+                ensemble_report['test_mae'] = test_mae
+                print_ensemble_report(self.ensemble, ensemble_report)
+            print(f"Ensemble Test MAE: {test_mae['chosen']:.2f}")
+        
+        with pipeline.stage('save'):
+            self.metrics = {'lstm_mae': float(lstm_mae), 'gb_r2_score': float(gb_score),
+                            'ensemble_mae': test_mae['chosen']}
+            self.save_models(save_path)
+            if oof is not None:
+                save_oof(save_path, **oof)
+            if ensemble_report:
+                save_ensemble(save_path, self.ensemble, ensemble_report)
+            self._save_replay_buffer(X_train, y_train, save_path)
+            if cache:
+                cache.store_artifacts(self.fingerprint, save_path)
+        
+        return history, lstm_mae, gb_score, int(len(X))
+
+    def train_incremental(self, save_path='models/', marks_path=None, attendance_path=None):
+        """
+        Fine-tune the saved models on new windows instead of retraining from scratch
+
+        The LSTM is warm-started from lstm_model.keras and trained for a few
+        epochs at a reduced learning rate on the new windows plus a replay
+        sample of earlier training data. The GB ensemble keeps its trees and
+        gets INCREMENTAL_CONFIG['extra_trees'] more via warm start. LSTM
+        epochs are checkpointed so an interrupted run on the same models and
+        data resumes. GB quantile models, if any, are extended the same way.
+        The ensemble combination and cascade calibration fit to the old
+        weights are dropped (refit with ensemble.py / cascade.py).
+
+        Returns:
+            dict: Metrics plus the estimated time saved compared to a full retrain
+        """
+        print("Fine-tuning O/L Grade Prediction Models...")
+        start = time.time()
+
+        if not self.load_models(save_path):
+            raise FileNotFoundError(f"No trained models in {save_path} to fine-tune")
+
+        # New windows: a term's export, or a small seeded synthetic batch
+        if marks_path:
+            X_new, y_new = self.load_training_data(marks_path, attendance_path)
+        else:
+            np.random.seed(INCREMENTAL_CONFIG['seed'])
+            X_new, y_new = self.generate_synthetic_data(
+                n_students=INCREMENTAL_CONFIG['new_synthetic_students']
+            )
+
+        # Mix in a replay sample of earlier data so old patterns are not forgotten
+        X_old, y_old = self._load_replay_buffer(save_path)
+        rng = np.random.default_rng(INCREMENTAL_CONFIG['seed'])
+        n_replay = min(len(X_old), int(len(X_new) * INCREMENTAL_CONFIG['replay_ratio']))
+        replay_idx = rng.choice(len(X_old), size=n_replay, replace=False) if n_replay else []
+        X = np.concatenate([X_new, X_old[replay_idx]]) if n_replay else X_new
+        y = np.concatenate([y_new, y_old[replay_idx]]) if n_replay else y_new
+        print(f"Fine-tuning on {len(X_new)} new + {n_replay} replayed windows")
+
+        X_train, X_test, y_train, y_test = train_test_split(
+            X, y, test_size=0.2, random_state=INCREMENTAL_CONFIG['seed']
+        )
+
+        # Fine-tune LSTM from its current weights
+        print("\nFine-tuning LSTM Model...")
+        learning_rate = self.model_config['learning_rate'] * INCREMENTAL_CONFIG['learning_rate_scale']
+        self.lstm_model.compile(
+            optimizer=keras.optimizers.Adam(learning_rate=learning_rate),
+            loss='mse',
+            metrics=['mae']
+        )
+        # One checkpoint directory per run (models, data, settings); backups
+        # of other runs would restore weights this run never trained
+        checkpoint_root = os.path.join(save_path, INCREMENTAL_CONFIG['checkpoint_dir'])
+        run_key = digest({
+            'model': self.model_version,
+            'data': hashlib.sha256(np.ascontiguousarray(X_train).tobytes()
+                                   + np.ascontiguousarray(y_train).tobytes()).hexdigest(),
+            'model_config': self.model_config,
+            'incremental': INCREMENTAL_CONFIG
+        })
+        checkpoint_dir = os.path.join(checkpoint_root, run_key[:16])
+        if os.path.isdir(checkpoint_root):
+            for entry in os.scandir(checkpoint_root):
+                if entry.path != checkpoint_dir:
+                    shutil.rmtree(entry.path, ignore_errors=True)
+        checkpoints = keras.callbacks.BackupAndRestore(backup_dir=checkpoint_dir)
+        early_stopping = keras.callbacks.EarlyStopping(
+            monitor='val_loss',
+            patience=3,
+            restore_best_weights=True
+        )
+        history = self.lstm_model.fit(
+            X_train, y_train,
+            validation_split=self.model_config['validation_split'],
+            epochs=INCREMENTAL_CONFIG['epochs'],
+            batch_size=self.model_config['batch_size'],
+            callbacks=[checkpoints, early_stopping],
+            verbose=1
+        )
+        shutil.rmtree(checkpoint_dir, ignore_errors=True)
+        lstm_loss, lstm_mae = self.lstm_model.evaluate(X_test, y_test, verbose=0)
+        print(f"LSTM Test MAE: {lstm_mae:.2f}")
+
+        # Extend the GB ensemble with additional trees fit on the residuals
+        print("\nExtending Gradient Boosting Model...")
+        n_trees = self.gb_model.n_estimators + INCREMENTAL_CONFIG['extra_trees']
+        self.gb_model.set_params(warm_start=True, n_estimators=n_trees)
+        self.gb_model.fit(self.gb_features(X_train), y_train)
+        self.gb_model.set_params(warm_start=False)
+        self.gb_config['n_estimators'] = n_trees
+        gb_score = self.gb_model.score(self.gb_features(X_test), y_test)
+        print(f"Gradient Boosting R² Score: {gb_score:.4f} ({n_trees} trees)")
+
+        # The quantile models bound the point model's intervals; extend them
+        # the same way so they follow the new data too
+        for model in self.gb_quantile_models.values():
+            model.set_params(warm_start=True,
+                             n_estimators=model.n_estimators + INCREMENTAL_CONFIG['extra_trees'])
+            model.fit(self.gb_features(X_train), y_train)
+            model.set_params(warm_start=False)
+
+        # The ensemble combination and cascade threshold were fit to the old
+        # models' outputs; fall back to the default blend and no early exit
+        self.ensemble = dict(DEFAULT_ENSEMBLE)
+        self.cascade = None
+        for name in (OOF_FILE, CALIBRATION_FILE):
+            path = os.path.join(save_path, name)
+            if os.path.exists(path):
+                os.remove(path)
+        
+        # Fine-tuned artifacts no longer match any full-training fingerprint
+        self.fingerprint = None
+        self.metrics = {'lstm_mae': float(lstm_mae), 'gb_r2_score': float(gb_score)}
+        self.save_models(save_path)
+        self._save_replay_buffer(
+            np.concatenate([X_old, X_new]) if len(X_old) else X_new,
+            np.concatenate([y_old, y_new]) if len(y_old) else y_new,
+            save_path
+        )
+
+        # Estimate (not measured) what a full retrain on all data would have
+        # cost, scaling the last full run by the number of samples
+        seconds = time.time() - start
+        full = self._load_training_stats(save_path).get('last_full')
+        estimated_full = None
+        if full and full['n_samples']:
+            n_total = full['n_samples'] + len(X_new)
+            estimated_full = full['seconds'] * n_total / full['n_samples']
+
+        stats = {
+            'mode': 'incremental',
+            'new_samples': int(len(X_new)),
+            'replay_samples': int(n_replay),
+            'epochs_run': len(history.history['loss']),
+            'lstm_mae': float(lstm_mae),
+            'gb_r2_score': float(gb_score),
+            'gb_trees': int(n_trees),
+            'seconds': seconds,
+            'estimated_full_retrain_seconds': estimated_full,
+            'estimated_time_saved_seconds': estimated_full - seconds if estimated_full else None
+        }
+        self._save_training_stats(save_path, stats)
+
+        if estimated_full:
+            print(f"\nFine-tuned in {seconds:.0f}s vs an estimated ~{estimated_full:.0f}s for a full retrain "
+                  f"(~{estimated_full - seconds:.0f}s saved, extrapolated from the last full run)")
+        return stats
+
+    def _save_replay_buffer(self, X, y, save_path):
+        """Keep a bounded random sample of training windows for later fine-tuning"""
+        size = INCREMENTAL_CONFIG['replay_buffer_size']
+        if len(X) > size:
+            idx = np.random.default_rng(INCREMENTAL_CONFIG['seed']).choice(len(X), size=size, replace=False)
+            X, y = X[idx], y[idx]
+        np.savez(os.path.join(save_path, 'replay_buffer.npz'),
+                 X=np.asarray(X, dtype=np.float32), y=np.asarray(y, dtype=np.float32))
+
+    def _load_replay_buffer(self, save_path):
+        path = os.path.join(save_path, 'replay_buffer.npz')
+        if os.path.exists(path):
+            with np.load(path) as buffer:
+                if buffer['X'].shape[1] == self.input_length:
+                    return buffer['X'], buffer['y']
+        # Artifacts predating the replay buffer: replay seeded synthetic data
+        np.random.seed(INCREMENTAL_CONFIG['seed'] + 1)
+        X, y = self.generate_synthetic_data(n_students=INCREMENTAL_CONFIG['new_synthetic_students'])
+        return X.astype(np.float32), y.astype(np.float32)
+
+    def _load_training_stats(self, save_path):
+        path = os.path.join(save_path, 'training_stats.json')
+        if not os.path.exists(path):
+            return {}
+        with open(path) as f:
+            return json.load(f)
+
+    def _save_training_stats(self, save_path, run):
+        """Record the latest run; the last full retrain is kept as the cost baseline"""
+        stats = self._load_training_stats(save_path)
+        stats['last_run'] = run
+        if run['mode'] == 'full':
+            stats['last_full'] = run
+        with open(os.path.join(save_path, 'training_stats.json'), 'w') as f:
+            json.dump(stats, f, indent=2)
+    
+    def fit_lstm(self, X_train, y_train, epochs=None, verbose=1):
+        """Build and fit a fresh LSTM model with early stopping"""
         self.lstm_model = self.create_lstm_model((X_train.shape[1], X_train.shape[2]))
         
         early_stopping = keras.callbacks.EarlyStopping(
@@ -153,44 +662,59 @@ class OLGradePredictor:
             min_lr=0.00001
         )
         
-        history = self.lstm_model.fit(
+        return self.lstm_model.fit(
             X_train, y_train,
-            validation_split=MODEL_CONFIG['validation_split'],
-            epochs=MODEL_CONFIG['epochs'],
-            batch_size=MODEL_CONFIG['batch_size'],
+            validation_split=self.model_config['validation_split'],
+            epochs=epochs or self.model_config['epochs'],
+            batch_size=self.model_config['batch_size'],
             callbacks=[early_stopping, reduce_lr],
-            verbose=1
-        )
-        
-        # Evaluate LSTM
-        lstm_loss, lstm_mae = self.lstm_model.evaluate(X_test, y_test, verbose=0)
-        print(f"LSTM Test MAE: {lstm_mae:.2f}")
-        
-        # Train Gradient Boosting Model (using flattened features)
-        print("\nTraining Gradient Boosting Model...")
-        X_flat_train = X_train.reshape(X_train.shape[0], -1)
-        X_flat_test = X_test.reshape(X_test.shape[0], -1)
-        
-        self.gb_model = GradientBoostingRegressor(
-            n_estimators=100,
-            learning_rate=0.1,
-            max_depth=5,
-            random_state=42
+            verbose=verbose
         )
+    
+    def fit_gb(self, X_train, y_train):
+        """Fit a fresh Gradient Boosting model on flattened sequences"""
+        X_flat_train = self.gb_features(X_train)
+        self.gb_model = GradientBoostingRegressor(**self.gb_config)
         self.gb_model.fit(X_flat_train, y_train)
-        
-        gb_score = self.gb_model.score(X_flat_test, y_test)
-        print(f"Gradient Boosting R² Score: {gb_score:.4f}")
-        
-        # Save models
+        return self.gb_model
+    
+    def gb_quantile_params(self):
+        """GB parameters for the lower and upper quantile of the configured interval"""
+        tail = (1 - UNCERTAINTY_CONFIG['interval']) / 2
+        return {
+            round(alpha, 6): {**self.gb_config, 'loss': 'quantile', 'alpha': alpha}
+            for alpha in (tail, 1 - tail)
+        }
+    
+    def fit_gb_quantiles(self, X_train, y_train):
+        """Fit GB models for the lower and upper quantile of the configured interval"""
+        X_flat_train = self.gb_features(X_train)
+        self.gb_quantile_models = {
+            alpha: GradientBoostingRegressor(**params).fit(X_flat_train, y_train)
+            for alpha, params in self.gb_quantile_params().items()
+        }
+        return self.gb_quantile_models
+    
+    def save_models(self, save_path='models/'):
+        """Save models together with the configuration they were trained with"""
         os.makedirs(save_path, exist_ok=True)
         self.lstm_model.save(os.path.join(save_path, 'lstm_model.keras'))
         joblib.dump(self.gb_model, os.path.join(save_path, 'gb_model.pkl'))
         joblib.dump(self.scaler, os.path.join(save_path, 'scaler.pkl'))
-        
-        print(f"\nModels saved to {save_path}")
-        
-        return history, lstm_mae, gb_score
+        quantiles_path = os.path.join(save_path, 'gb_quantiles.pkl')
+        if self.gb_quantile_models:
+            joblib.dump(self.gb_quantile_models, quantiles_path)
+        elif os.path.exists(quantiles_path):
+            os.remove(quantiles_path)
+        save_ensemble(save_path, self.ensemble)
+        with open(os.path.join(save_path, 'model_config.json'), 'w') as f:
+            json.dump({
+                'model': self.model_config,
+                'gb': self.gb_config,
+                'fingerprint': self.fingerprint,
+                'metrics': self.metrics
+            }, f, indent=2)
+        self._artifact_version = self._artifact_digest(save_path)
     
     def load_models(self, model_path='models/'):
         """Load trained models"""
@@ -214,12 +738,91 @@ class OLGradePredictor:
                 
             self.gb_model = joblib.load(os.path.join(model_path, 'gb_model.pkl'))
             self.scaler = joblib.load(os.path.join(model_path, 'scaler.pkl'))
+            quantiles_path = os.path.join(model_path, 'gb_quantiles.pkl')
+            self.gb_quantile_models = joblib.load(quantiles_path) if os.path.exists(quantiles_path) else {}
+            self.ensemble = load_ensemble(model_path)
+
+            # Serve with the window length the artifacts were trained with
+            config_path = os.path.join(model_path, 'model_config.json')
+            if os.path.exists(config_path):
+                with open(config_path) as f:
+                    saved = json.load(f)
+                self.model_config.update(saved.get('model', {}))
+                self.gb_config.update(saved.get('gb', {}))
+                self.sequence_length = self.model_config['sequence_length']
+                self.fingerprint = saved.get('fingerprint')
+                self.metrics = saved.get('metrics', {})
+
+            self._artifact_version = self._artifact_digest(model_path)
+            self._batcher = None
+            self._uncertainty = None
+            self._explainer = None
+            self.cascade = Cascade.load(model_path, self.model_version)
             print("Models loaded successfully!")
             return True
         except Exception as e:
             print(f"Error loading models: {e}")
             return False
     
+    def simple_average_prediction(self, marks_history, attendance_percentage):
+        """Fallback for histories too short for the models"""
+        avg_mark = np.mean(marks_history) if len(marks_history) else 50
+        attendance_factor = self.calculate_attendance_factor(attendance_percentage)
+        predicted_mark = avg_mark * (0.7 + 0.3 * attendance_factor)
+        
+        return {
+            'predicted_mark': float(np.clip(predicted_mark, 0, 100)),
+            'predicted_grade': self.mark_to_grade(predicted_mark),
+            'confidence': 0.6,
+            'method': 'simple_average'
+        }
+    
+    def blend(self, lstm_pred, gb_pred, attendance_factor):
+        """
+        Final mark from base model outputs (scalars or arrays)
+        
+        Combination of the models present, scaled by the attendance factor
+        and clipped to the valid range; by default (0.6 * LSTM + 0.4 * GB) *
+        (0.8 + 0.2 * attendance factor), or as refit by ensemble.py.
+        """
+        return ensemble_mark(self.ensemble, lstm_pred, gb_pred, attendance_factor)
+    
+    def combine_predictions(self, marks_history, attendance_percentage, lstm_pred, gb_pred=None):
+        """
+        Combine base model outputs into the final prediction
+        
+        Without a GB prediction (history shorter than the GB window) the
+        LSTM output is used on its own, and without an LSTM prediction
+        (degraded 'gb_only' tier) the GB output is.
+        """
+        if lstm_pred is None:
+            method = 'gb_only'
+        elif gb_pred is None:
+            method = 'lstm_variable'
+        else:
+            method = 'ensemble'
+        
+        attendance_factor = self.calculate_attendance_factor(attendance_percentage)
+        final_pred = self.blend(lstm_pred, gb_pred, attendance_factor)
+        
+        # Calculate confidence based on recent performance consistency
+        recent_marks = marks_history[-self.sequence_length:]
+        recent_std = np.std(recent_marks)
+        confidence = 1.0 - min(recent_std / 50, 0.4)  # Lower std = higher confidence
+        
+        result = {
+            'predicted_mark': float(final_pred),
+            'predicted_grade': self.mark_to_grade(final_pred),
+            'confidence': float(confidence),
+            'attendance_factor': float(attendance_factor),
+            'method': method
+        }
+        if lstm_pred is not None:
+            result['lstm_prediction'] = float(lstm_pred)
+        if gb_pred is not None:
+            result['gb_prediction'] = float(gb_pred)
+        return result
+    
     def predict_next_mark(self, marks_history, attendance_percentage):
         """
         Predict next exam mark using ensemble of models
@@ -233,16 +836,7 @@ class OLGradePredictor:
         """
         if len(marks_history) < self.sequence_length:
             # If not enough history, use simple average with attendance factor
-            avg_mark = np.mean(marks_history) if marks_history else 50
-            attendance_factor = self.calculate_attendance_factor(attendance_percentage)
-            predicted_mark = avg_mark * (0.7 + 0.3 * attendance_factor)
-            
-            return {
-                'predicted_mark': float(np.clip(predicted_mark, 0, 100)),
-                'predicted_grade': self.mark_to_grade(predicted_mark),
-                'confidence': 0.6,
-                'method': 'simple_average'
-            }
+            return self.simple_average_prediction(marks_history, attendance_percentage)
         
         # Prepare input for models
         recent_marks = marks_history[-self.sequence_length:]
@@ -256,31 +850,50 @@ class OLGradePredictor:
         X_flat = X.reshape(1, -1)
         gb_pred = self.gb_model.predict(X_flat)[0]
         
-        # Ensemble prediction (weighted average)
-        ensemble_pred = (lstm_pred * 0.6 + gb_pred * 0.4)
-        
-        # Apply attendance factor
-        attendance_factor = self.calculate_attendance_factor(attendance_percentage)
-        final_pred = ensemble_pred * (0.8 + 0.2 * attendance_factor)
-        
-        # Calculate confidence based on recent performance consistency
-        recent_std = np.std(recent_marks)
-        confidence = 1.0 - min(recent_std / 50, 0.4)  # Lower std = higher confidence
+        return self.combine_predictions(marks_history, attendance_percentage, lstm_pred, gb_pred)
+    
+    def predict_batch(self, items, tier='ensemble', uncertainty=None, explain=None):
+        """
+        Predict many (marks_history, attendance) pairs with length-bucketed batches
         
-        # Clip to valid range
-        final_pred = np.clip(final_pred, 0, 100)
+        Uses each student's full history when variable-length inference is
+        enabled (see INFERENCE_CONFIG), otherwise the same fixed window as
+        predict_next_mark, in one model call per bucket instead of per item.
+        Cheaper tiers ('gb_only', 'simple_average') skip models under load.
+        Once the cascade is calibrated (see cascade.py), confident GB
+        predictions exit early without running the LSTM.
         
-        return {
-            'predicted_mark': float(final_pred),
-            'predicted_grade': self.mark_to_grade(final_pred),
-            'confidence': float(confidence),
-            'lstm_prediction': float(lstm_pred),
-            'gb_prediction': float(gb_pred),
-            'attendance_factor': float(attendance_factor),
-            'method': 'ensemble'
-        }
+        With uncertainty (True, or a number of MC dropout samples) full
+        ensemble predictions also get an 'uncertainty' entry with a
+        prediction interval and grade probabilities (see uncertainty.py).
+        With explain (True, or a number of integrated gradient steps) they
+        get an 'explanation' of how much each past mark and attendance
+        contributed (see explain.py).
+        """
+        if self._batcher is None:
+            from batch_inference import LengthBucketedBatcher
+            self._batcher = LengthBucketedBatcher(self)
+        # MC dropout and explanations need every LSTM prediction, so no early exits
+        preds = self._batcher.predict(items, tier=tier, cascade=not (uncertainty or explain))
+        if uncertainty and tier == 'ensemble':
+            if self._uncertainty is None:
+                from uncertainty import UncertaintyEstimator
+                self._uncertainty = UncertaintyEstimator(self)
+            samples = None if uncertainty is True else int(uncertainty)
+            for pred, estimate in zip(preds, self._uncertainty.estimate(items, preds, samples)):
+                if estimate is not None:
+                    pred['uncertainty'] = estimate
+        if explain and tier == 'ensemble':
+            if self._explainer is None:
+                from explain import PredictionExplainer
+                self._explainer = PredictionExplainer(self)
+            steps = None if explain is True else int(explain)
+            for pred, explanation in zip(preds, self._explainer.explain(items, preds, steps)):
+                if explanation is not None:
+                    pred['explanation'] = explanation
+        return preds
     
-    def predict_all_subjects(self, student_data):
+    def predict_all_subjects(self, student_data, tier='ensemble', uncertainty=None, explain=None):
         """
         Predict O/L grades for all subjects
         
@@ -298,29 +911,74 @@ class OLGradePredictor:
         Returns:
             dict: Complete prediction results
         """
-        subjects = student_data.get('subjects', [])
-        attendance = student_data.get('attendance', 100)
+        return self.predict_students([student_data], tier=tier, uncertainty=uncertainty, explain=explain)[0]
+    
+    def predict_students(self, students, tier='ensemble', uncertainty=None, explain=None):
+        """
+        Predict O/L grades for all subjects of many students in one batch
+        
+        Args:
+            students: List of student_data dicts (see predict_all_subjects)
+            tier: Service tier, see predict_batch
+            uncertainty: Add prediction intervals, see predict_batch
+            explain: Add per-mark attributions, see predict_batch
+        
+        Returns:
+            list: Complete prediction results per student
+        """
+        items, owners = self.student_items(students)
+        preds = self.predict_batch(items, tier=tier, uncertainty=uncertainty, explain=explain)
+        return self.summarize_students(students, owners, preds)
+    
+    def student_items(self, students):
+        """
+        Flatten students into batch items
+        
+        Returns:
+            tuple: ((marks_history, attendance) items, (student index, subject) owners)
+        """
+        items = []
+        owners = []
+        for s, student_data in enumerate(students):
+            attendance = student_data.get('attendance', 100)
+            for subject in student_data.get('subjects', []):
+                if not subject['marks']:
+                    continue
+                items.append((subject['marks'], attendance))
+                owners.append((s, subject))
+        return items, owners
+    
+    def summarize_students(self, students, owners, preds):
+        """Per-student results from the batch predictions of student_items"""
+        per_student = [[] for _ in students]
+        for (s, subject), pred in zip(owners, preds):
+            per_student[s].append((subject, pred))
         
+        return [
+            self._summarize_student(subject_preds, student_data.get('attendance', 100))
+            for student_data, subject_preds in zip(students, per_student)
+        ]
+    
+    def _summarize_student(self, subject_preds, attendance):
+        """Build the per-student response from (subject, prediction) pairs"""
         predictions = []
         total_predicted = 0
         
-        for subject in subjects:
-            subject_name = subject['name']
+        for subject, pred in subject_preds:
             marks = subject['marks']
             
-            if not marks:
-                continue
-            
-            pred = self.predict_next_mark(marks, attendance)
-            
             predictions.append({
-                'subject': subject_name,
+                'subject': subject['name'],
                 'current_average': float(np.mean(marks)),
                 'predicted_mark': pred['predicted_mark'],
                 'predicted_grade': pred['predicted_grade'],
                 'confidence': pred['confidence'],
+                'method': pred['method'],
                 'trend': self._calculate_trend(marks)
             })
+            for key in ('model', 'uncertainty', 'explanation'):
+                if key in pred:
+                    predictions[-1][key] = pred[key]
             
             total_predicted += pred['predicted_mark']
         
@@ -425,9 +1083,31 @@ class OLGradePredictor:
 
 
 if __name__ == "__main__":
-    # Train the models
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Train O/L grade prediction models")
+    parser.add_argument('--marks', help="CSV/Parquet export of exam results (default: synthetic data)")
+    parser.add_argument('--attendance', help="CSV/Parquet export of attendance records")
+    parser.add_argument('--incremental', action='store_true',
+                        help="Fine-tune the saved models on new data instead of a full retrain")
+    parser.add_argument('--save-path', default='models/',
+                        help="Artifact directory, e.g. models/variants/subject=Mathematics "
+                             "for a specialized model set (see MODEL_REGISTRY_CONFIG)")
+    args = parser.parse_args()
+
     predictor = OLGradePredictor()
-    history, mae, r2 = predictor.train_models()
+
+    if args.incremental:
+        stats = predictor.train_incremental(
+            save_path=args.save_path, marks_path=args.marks, attendance_path=args.attendance
+        )
+        print(json.dumps(stats, indent=2))
+        raise SystemExit(0)
+
+    # Train the models
+    history, mae, r2 = predictor.train_models(
+        save_path=args.save_path, marks_path=args.marks, attendance_path=args.attendance
+    )
     
     print("\n" + "="*50)
     print("Model Training Complete!")
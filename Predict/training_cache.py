@@ -0,0 +1,157 @@
+"""
+Content-addressed Training Cache
+Fingerprints each training run by config, data source and code version so
+identical runs reuse stored artifacts, and caches intermediate stages
+(generated dataset, trained GB model) for runs that only partly differ
+"""
+
+import hashlib
+import json
+import os
+import shutil
+
+import joblib
+import numpy as np
+
+from config import TRAINING_CACHE_CONFIG
+
+# Source files whose changes invalidate cached results
+CODE_FILES = ('train_model.py', 'ingest.py', 'ensemble.py', 'training_pipeline.py', 'config.py')
+
+ARTIFACT_FILES = ('lstm_model.keras', 'gb_model.pkl', 'gb_quantiles.pkl', 'scaler.pkl', 'model_config.json',
+                  'ensemble.json', 'oof_predictions.npz', 'replay_buffer.npz')
+
+
+def digest(payload):
+    """Stable SHA-256 of a JSON-serializable payload"""
+    return hashlib.sha256(
+        json.dumps(payload, sort_keys=True, default=str).encode('utf-8')
+    ).hexdigest()
+
+
+def code_version(files=CODE_FILES):
+    """Hash of the training code itself (or of other source files next to it)"""
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    sha = hashlib.sha256()
+    for name in files:
+        with open(os.path.join(base_dir, name), 'rb') as f:
+            sha.update(f.read())
+    return sha.hexdigest()
+
+
+def data_source_hash(marks_path=None, attendance_path=None, n_students=None, seed=None):
+    """Hash of the training data: export file contents, or synthetic generation settings"""
+    if marks_path:
+        from ingest import file_hash
+        return file_hash([marks_path, attendance_path])
+    return digest({'synthetic': n_students, 'seed': seed})
+
+
+def artifact_digest(model_path):
+    """Digest of the model files' sizes and modification times (identifies untracked artifacts)"""
+    stamps = []
+    for name in ('lstm_model.keras', 'lstm_model.h5', 'gb_model.pkl', 'gb_quantiles.pkl', 'scaler.pkl'):
+        path = os.path.join(model_path, name)
+        if os.path.exists(path):
+            stat = os.stat(path)
+            stamps.append([name, stat.st_size, stat.st_mtime_ns])
+    return digest(stamps)
+
+
+class TrainingCache:
+    """
+    On-disk cache with three levels, from coarsest to finest:
+      artifacts/<fingerprint>/  complete model sets for a full training run
+      datasets/<key>.npz        generated training windows
+      gb/<key>.pkl              fitted Gradient Boosting models
+    """
+
+    def __init__(self, cache_dir=None):
+        self.cache_dir = cache_dir or TRAINING_CACHE_CONFIG['cache_dir']
+
+    def _path(self, *parts):
+        path = os.path.join(self.cache_dir, *parts)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return path
+
+    # Full artifact sets
+
+    @staticmethod
+    def read_fingerprint(model_path):
+        path = os.path.join(model_path, 'model_config.json')
+        if not os.path.exists(path):
+            return None, {}
+        with open(path) as f:
+            saved = json.load(f)
+        return saved.get('fingerprint'), saved.get('metrics', {})
+
+    def restore_artifacts(self, fingerprint, save_path):
+        """
+        Make the artifact set for `fingerprint` current in save_path
+
+        Returns:
+            dict or None: Stored metrics on a hit, None on a miss
+        """
+        current, metrics = self.read_fingerprint(save_path)
+        if current == fingerprint:
+            return metrics
+
+        stored = os.path.join(self.cache_dir, 'artifacts', fingerprint)
+        if not os.path.isdir(stored):
+            return None
+
+        os.makedirs(save_path, exist_ok=True)
+        # Optional artifacts the stored set lacks would otherwise be served
+        # under its fingerprint; model_config.json (the fingerprint) goes last
+        for name in sorted(ARTIFACT_FILES, key=lambda name: name == 'model_config.json'):
+            src = os.path.join(stored, name)
+            dst = os.path.join(save_path, name)
+            if os.path.exists(src):
+                shutil.copy2(src, dst + '.tmp')
+                os.replace(dst + '.tmp', dst)
+            elif os.path.exists(dst):
+                os.remove(dst)
+        os.utime(stored)
+        return self.read_fingerprint(save_path)[1]
+
+    def store_artifacts(self, fingerprint, save_path):
+        """Copy a freshly trained artifact set into the cache and evict old sets"""
+        stored = self._path('artifacts', fingerprint, '')
+        for name in ARTIFACT_FILES:
+            src = os.path.join(save_path, name)
+            if os.path.exists(src):
+                shutil.copy2(src, os.path.join(stored, name))
+
+        artifacts_dir = os.path.join(self.cache_dir, 'artifacts')
+        sets = sorted(
+            (os.path.join(artifacts_dir, d) for d in os.listdir(artifacts_dir)),
+            key=os.path.getmtime,
+            reverse=True
+        )
+        for old in sets[TRAINING_CACHE_CONFIG['max_artifact_sets']:]:
+            shutil.rmtree(old, ignore_errors=True)
+
+    # Intermediate stages
+
+    def load_dataset(self, key):
+        path = os.path.join(self.cache_dir, 'datasets', f'{key}.npz')
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as cached:
+            return cached['X'], cached['y']
+
+    def save_dataset(self, key, X, y):
+        path = self._path('datasets', f'{key}.npz')
+        tmp_path = path + '.tmp.npz'
+        np.savez(tmp_path, X=X, y=y)
+        os.replace(tmp_path, path)
+
+    def load_gb(self, key):
+        path = os.path.join(self.cache_dir, 'gb', f'{key}.pkl')
+        return joblib.load(path) if os.path.exists(path) else None
+
+    def save_gb(self, key, model):
+        path = self._path('gb', f'{key}.pkl')
+        tmp_path = path + '.tmp'
+        joblib.dump(model, tmp_path)
+        os.replace(tmp_path, path)
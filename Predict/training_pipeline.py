@@ -0,0 +1,159 @@
+"""
+Parallel Training Pipeline
+Runs the Gradient Boosting fits (point and quantile models) in worker
+processes while the LSTM trains in the main process, each side with its
+own thread budget, and records the wall-clock time of every stage.
+Workers are started before the training data is loaded, so process
+start-up overlaps data preparation.
+"""
+
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from contextlib import contextmanager
+
+from config import TRAINING_CONFIG
+
+
+def _init_gb_worker(threads):
+    """Bound BLAS threads of a GB worker; workers never import TensorFlow"""
+    for var in ('OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS'):
+        os.environ[var] = str(threads)
+
+
+@contextmanager
+def _main_module_hidden():
+    """
+    Spawned processes re-import the parent's __main__ (the training CLI or
+    the API server, with TensorFlow and loaded models); GB workers need
+    none of it, so it is hidden while they start
+    """
+    main = sys.modules['__main__']
+    saved_file, saved_spec = getattr(main, '__file__', None), getattr(main, '__spec__', None)
+    if saved_file is not None:
+        del main.__file__
+    main.__spec__ = None
+    try:
+        yield
+    finally:
+        if saved_file is not None:
+            main.__file__ = saved_file
+        main.__spec__ = saved_spec
+
+
+def _warm_up():
+    import sklearn.ensemble  # noqa: F401
+
+
+def fit_gb_job(X_flat, y, params):
+    """Fit one GradientBoostingRegressor; returns (model, seconds)"""
+    from sklearn.ensemble import GradientBoostingRegressor
+
+    start = time.perf_counter()
+    model = GradientBoostingRegressor(**params).fit(X_flat, y)
+    return model, time.perf_counter() - start
+
+
+def thread_budget(config=TRAINING_CONFIG):
+    """
+    Threads for each side of the pipeline
+
+    Returns:
+        tuple: (gb_workers, gb_threads, lstm_threads)
+    """
+    cpus = os.cpu_count() or 1
+    # GB fits are short next to the LSTM, so by default they share one core's worth
+    lstm_threads = config['lstm_threads'] or max(1, cpus - 1)
+    return config['gb_workers'], config['gb_threads'], lstm_threads
+
+
+class TrainingPipeline:
+    """Stage timer plus a pool of GB worker processes (inline fits when not parallel)"""
+
+    def __init__(self, config=TRAINING_CONFIG):
+        self.parallel = config['parallel']
+        self.gb_workers, self.gb_threads, self.lstm_threads = thread_budget(config)
+        self.stages = {}
+        self._start = time.perf_counter()
+        self._pool = None
+        if self.parallel:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.gb_workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_gb_worker,
+                initargs=(self.gb_threads,)
+            )
+            # Submitting starts the workers; warm-ups import sklearn while data loads
+            with _main_module_hidden():
+                for _ in range(self.gb_workers):
+                    self._pool.submit(_warm_up)
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start
+
+    def limit_lstm_threads(self):
+        """Apply the LSTM thread budget (only possible before TensorFlow starts executing)"""
+        import tensorflow as tf
+
+        try:
+            tf.config.threading.set_intra_op_parallelism_threads(self.lstm_threads)
+            return True
+        except RuntimeError:
+            return False
+
+    def submit_gb(self, name, X_flat, y, params):
+        """Start a GB fit; collect it with gb_result"""
+        if self._pool is not None:
+            return name, self._pool.submit(fit_gb_job, X_flat, y, params)
+        # Serial: fit now, timed as its own stage
+        future = Future()
+        with self.stage(name):
+            future.set_result(fit_gb_job(X_flat, y, params))
+        return name, future
+
+    def gb_result(self, job):
+        """Fitted model of a submitted GB fit, waiting for it if needed"""
+        name, future = job
+        with self.stage('gb_wait' if self._pool is not None else name + '_collect'):
+            model, seconds = future.result()
+        if self._pool is not None:
+            self.stages[name] = seconds
+        return model
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+    def report(self):
+        """Per-stage seconds, total wall clock and time saved by overlapping stages"""
+        total = time.perf_counter() - self._start
+        stages = {name: round(seconds, 3) for name, seconds in self.stages.items()
+                  if not name.endswith('_collect')}
+        return {
+            'parallel': self.parallel,
+            'threads': {'gb_workers': self.gb_workers, 'gb_threads': self.gb_threads,
+                        'lstm_threads': self.lstm_threads},
+            'stages': stages,
+            'total_seconds': round(total, 3),
+            # Stage times that ran concurrently with others
+            'overlapped_seconds': round(max(sum(s for n, s in stages.items() if n != 'gb_wait') - total, 0.0), 3)
+        }
+
+
+def print_report(report):
+    print("\n" + "="*60)
+    print("TRAINING STAGES" + (" (GB fits in worker processes)" if report['parallel'] else ""))
+    print("="*60)
+    for name, seconds in report['stages'].items():
+        print(f"  {name:24} {seconds:8.2f}s")
+    print(f"  {'total (wall clock)':24} {report['total_seconds']:8.2f}s")
+    if report['parallel']:
+        print(f"  {'overlapped':24} {report['overlapped_seconds']:8.2f}s")
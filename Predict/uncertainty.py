@@ -0,0 +1,149 @@
+"""
+Prediction Uncertainty for O/L Grade Prediction
+MC-dropout prediction intervals computed for many students at once: every
+history is tiled mc_samples times into a single dropout-enabled LSTM batch,
+the samples go through the same ensemble blend as the point prediction, and
+interval bounds and grade probabilities are read off the sample distribution.
+Quantile GB models, when trained, give the GB side's interval.
+"""
+
+import time
+
+import numpy as np
+import tensorflow as tf
+
+from config import UNCERTAINTY_CONFIG
+from rollup import GRADES, grade_codes
+
+
+class UncertaintyEstimator:
+    """Batched MC-dropout estimator wrapping a loaded OLGradePredictor"""
+
+    def __init__(self, predictor, config=UNCERTAINTY_CONFIG):
+        self.predictor = predictor
+        self.config = config
+        self._sample_fn = None
+        self.last_stats = {}
+
+    @property
+    def batcher(self):
+        predictor = self.predictor
+        if predictor._batcher is None:
+            from batch_inference import LengthBucketedBatcher
+            predictor._batcher = LengthBucketedBatcher(predictor)
+        return predictor._batcher
+
+    def _sample(self, X):
+        # Dropout layers stay active with training=True
+        if not self.batcher.variable_length:
+            return self.predictor.lstm_model(X, training=True)
+        if self._sample_fn is None:
+            model = self.batcher.model
+            self._sample_fn = tf.function(
+                lambda x: model(x, training=True),
+                input_signature=[tf.TensorSpec(shape=(None, None, 2), dtype=tf.float32)]
+            )
+        return self._sample_fn(tf.constant(X))
+
+    def lstm_samples(self, histories, attendances, samples):
+        """
+        Dropout-enabled LSTM outputs, shape (len(histories), samples)
+
+        Histories are sorted by length and tiled in chunks of at most
+        max_batch_rows rows, each padded to its longest history.
+        """
+        batcher = self.batcher
+        seq_len = self.predictor.sequence_length
+        lengths = np.array([len(h) if batcher.variable_length else seq_len for h in histories])
+        order = np.argsort(lengths, kind='stable')
+        per_call = max(1, self.config['max_batch_rows'] // samples)
+
+        out = np.empty((len(histories), samples), dtype=np.float64)
+        for start in range(0, len(order), per_call):
+            chunk = order[start:start + per_call]
+            pad_len = int(lengths[chunk[-1]])
+            X = batcher._pad([histories[p] for p in chunk], [attendances[p] for p in chunk], pad_len)
+            preds = self._sample(np.repeat(X, samples, axis=0))
+            out[chunk] = np.asarray(preds).reshape(len(chunk), samples)
+            self.last_stats['model_calls'] += 1
+            self.last_stats['model_rows'] += len(chunk) * samples
+        return out
+
+    def estimate(self, items, preds, samples=None):
+        """
+        Uncertainty of batch predictions
+
+        Args:
+            items: (marks_history, attendance_percentage) pairs given to predict_batch
+            preds: Its results; only model-based predictions get an estimate
+            samples: MC dropout samples per prediction (default mc_samples)
+
+        Returns:
+            list: Per item, None or {'samples', 'interval', 'std',
+                  'grade_probabilities'[, 'gb_interval']}
+        """
+        start = time.perf_counter()
+        samples = min(max(int(samples or self.config['mc_samples']), 2), self.config['max_samples'])
+        predictor = self.predictor
+        max_len = self.batcher.config['max_history'] if self.batcher.variable_length \
+            else predictor.sequence_length
+
+        rows = [i for i, pred in enumerate(preds) if 'lstm_prediction' in pred]
+        self.last_stats = {'items': len(items), 'model_items': len(rows), 'samples': samples,
+                           'model_calls': 0, 'model_rows': 0}
+        results = [None] * len(items)
+        if not rows:
+            self.last_stats['seconds'] = time.perf_counter() - start
+            return results
+
+        histories = [np.asarray(items[i][0][-max_len:], dtype=np.float64) for i in rows]
+        attendances = [float(items[i][1]) for i in rows]
+        factors = np.array([preds[i]['attendance_factor'] for i in rows])
+        gb_preds = np.array([preds[i].get('gb_prediction', np.nan) for i in rows])
+        has_gb = ~np.isnan(gb_preds)
+
+        # Sampled LSTM outputs through the same blend as the point prediction
+        lstm = self.lstm_samples(histories, attendances, samples)
+        marks = np.where(
+            has_gb[:, None],
+            predictor.blend(lstm, np.nan_to_num(gb_preds)[:, None], factors[:, None]),
+            predictor.blend(lstm, None, factors[:, None])
+        )
+
+        level = self.config['interval']
+        tail = (1 - level) / 2
+        lower, upper = np.quantile(marks, [tail, 1 - tail], axis=1)
+        std = marks.std(axis=1)
+        codes = grade_codes(marks.ravel()).reshape(marks.shape)
+        grade_counts = np.stack([(codes == g).sum(axis=1) for g in range(len(GRADES))], axis=1)
+
+        # GB side: quantile models over the same window features
+        gb_bounds = None
+        quantile_models = predictor.gb_quantile_models
+        gb_rows = np.flatnonzero(has_gb)
+        if quantile_models and len(gb_rows):
+            X_gb = self.batcher._pad([histories[p] for p in gb_rows], [attendances[p] for p in gb_rows],
+                                     predictor.sequence_length)
+            X_gb = X_gb.reshape(len(gb_rows), -1)
+            alphas = sorted(quantile_models)
+            gb_level = round(alphas[-1] - alphas[0], 6)
+            low = predictor.blend(None, quantile_models[alphas[0]].predict(X_gb), factors[gb_rows])
+            high = predictor.blend(None, quantile_models[alphas[-1]].predict(X_gb), factors[gb_rows])
+            gb_bounds = {int(pos): (low[n], high[n]) for n, pos in enumerate(gb_rows)}
+
+        for pos, i in enumerate(rows):
+            estimate = {
+                'samples': samples,
+                'interval': {'level': level, 'lower': float(lower[pos]), 'upper': float(upper[pos])},
+                'std': float(std[pos]),
+                'grade_probabilities': {
+                    grade: float(count / samples) for grade, count in zip(GRADES, grade_counts[pos])
+                }
+            }
+            if gb_bounds and pos in gb_bounds:
+                low_mark, high_mark = gb_bounds[pos]
+                estimate['gb_interval'] = {'level': gb_level, 'lower': float(low_mark), 'upper': float(high_mark)}
+            results[i] = estimate
+
+        self.last_stats['seconds'] = time.perf_counter() - start
+        return results